@@ -0,0 +1,88 @@
+# coding: utf-8
+"""Compare per-character `remove_nonascii_chars` / regex-based `normalize_unicode_to_ascii` against the
+batch and byte-buffer variants on newline-delimited mixed-script text (default 1 GB).
+
+    python -m benchmarks.bench_ascii_folding --size-mb 1024 --chunk-mb 64
+"""
+import argparse
+import random
+import re
+import time
+import unicodedata
+from nlp_utils.normalize import (
+    normalize_unicode_to_ascii_batch,
+    normalize_unicode_to_ascii_bytes,
+    remove_nonascii_bytes,
+    remove_nonascii_chars_batch,
+)
+
+WORDS = ["market", "Résumé", "naïve", "Straße", "東京", "данные", "café", "report", "ﬁnance", "2024", "😀", "déjà-vu"]
+
+
+def legacy_remove_nonascii_chars(text: str) -> str:
+    return "".join([l if ord(l) < 128 else " " for l in text]).strip()
+
+
+def legacy_normalize_unicode_to_ascii(text: str) -> str:
+    val = unicodedata.normalize("NFKD", text).encode("ASCII", "ignore").decode("utf-8").lower()
+    val = re.sub("[^A-Za-z0-9 ]+", " ", val)
+    return re.sub(" +", " ", val)
+
+
+def make_block(num_lines: int = 20000, seed: int = 7) -> bytes:
+    rng = random.Random(seed)
+    lines = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40))) for _ in range(num_lines)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def iter_buffer(size_mb: int, chunk_mb: int):
+    """Yield line-aligned chunks totalling roughly `size_mb`, built from one repeated block."""
+    block = make_block()
+    repeats = max(1, (chunk_mb << 20) // len(block))
+    chunk = block * repeats
+    produced = 0
+    while produced < size_mb << 20:
+        yield chunk
+        produced += len(chunk)
+
+
+def timed(func, chunks):
+    started = time.perf_counter()
+    for chunk in chunks:
+        func(chunk)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--chunk-mb", type=int, default=64)
+    args = parser.parse_args()
+
+    def chunks():
+        return iter_buffer(args.size_mb, args.chunk_mb)
+
+    candidates = {
+        "remove_nonascii_chars": {
+            "per-char (legacy)": lambda chunk: [legacy_remove_nonascii_chars(l) for l in chunk.decode().splitlines()],
+            "batch": lambda chunk: remove_nonascii_chars_batch(chunk.decode().splitlines()),
+            "bytes buffer": remove_nonascii_bytes,
+        },
+        "normalize_unicode_to_ascii": {
+            "regex (legacy)": lambda chunk: [legacy_normalize_unicode_to_ascii(l) for l in chunk.decode().splitlines()],
+            "batch": lambda chunk: normalize_unicode_to_ascii_batch(chunk.decode().splitlines()),
+            "bytes buffer": normalize_unicode_to_ascii_bytes,
+        },
+    }
+    for task, variants in candidates.items():
+        baseline = None
+        for name, func in variants.items():
+            elapsed = timed(func, chunks())
+            baseline = baseline or elapsed
+            print(
+                f"{task:>27} | {name:<18} {elapsed:8.2f}s {args.size_mb / elapsed:8.1f} MB/s x{baseline / elapsed:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# coding: utf-8
+"""Time clause classification (`SentComponents.define_clause_type`) and whole clause decomposition on a
+corpus of short sentences, against the former code that ran the pipeline once more on every verb to get
+its lemma, re-parsed "There is <text>" for verbless sentences and "are <subtree>" for participial
+modifiers; report clauses/sec and check that both give the same clauses.
+
+With a model the sentences are parsed up front (parsing is left out of the timings):
+
+    python -m benchmarks.bench_clause_decomposition --model en_core_web_sm --sentences 10000
+
+Without one (``--model blank``) the Docs are built directly with heads, deps and lemmas, and the former
+code runs a blank pipeline that only looks lemmas up and attaches every token to the first one, so its
+cost is understated and its clauses of re-parsed sentences differ.
+"""
+import argparse
+import random
+import time
+import spacy
+from spacy.language import Language
+from spacy.tokens import Doc
+from nlp_utils import clause_decomposition
+from nlp_utils.clause_decomposition import (
+    LIST_COMPLEX_TRANSITIVE,
+    LIST_COPULAR_VERB,
+    OPTIONAL_ADVERBIAL_TYPES,
+    SentComponents,
+    clause_record,
+)
+from nlp_utils.spacy_utils import get_spacy_model
+
+NOUNS = ["dog", "student", "manager", "river", "company", "teacher", "child", "engineer", "city", "garden"]
+ADVERBS = ["quickly", "there", "today", "carefully", "again", "outside"]
+# lemma -> past tense; a mix of copular, complex transitive and other verbs
+VERBS = {
+    "seem": "seemed",
+    "remain": "remained",
+    "stay": "stayed",
+    "look": "looked",
+    "walk": "walked",
+    "die": "died",
+    "put": "put",
+    "take": "took",
+    "bring": "brought",
+    "keep": "kept",
+    "place": "placed",
+    "see": "saw",
+    "write": "wrote",
+    "paint": "painted",
+    "visit": "visited",
+}
+PAST_TO_LEMMA = {past: verb for verb, past in VERBS.items()}
+
+
+def make_sentences(num_sentences: int, seed: int = 13):
+    """``(words, heads, deps, pos)`` of "The N V [the N] ADV ." sentences, with a few verbless
+    "The N , the N ." and "The N V-ing ADV ." ones."""
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(num_sentences):
+        subject, verb, adverb = rng.choice(NOUNS), rng.choice(list(VERBS)), rng.choice(ADVERBS)
+        kind = rng.random()
+        if kind < 0.1:
+            words = ["The", subject, ",", "the", rng.choice(NOUNS), "."]
+            heads = [1, 1, 1, 4, 1, 1]
+            deps = ["det", "ROOT", "punct", "det", "appos", "punct"]
+            pos = ["DET", "NOUN", "PUNCT", "DET", "NOUN", "PUNCT"]
+        elif kind < 0.2:
+            words = ["The", subject, "standing", adverb, "."]
+            heads = [1, 1, 1, 2, 1]
+            deps = ["det", "ROOT", "acl", "advmod", "punct"]
+            pos = ["DET", "NOUN", "VERB", "ADV", "PUNCT"]
+        elif kind < 0.6:
+            words = ["The", subject, VERBS[verb], "the", rng.choice(NOUNS), adverb, "."]
+            heads = [1, 2, 2, 4, 2, 2, 2]
+            deps = ["det", "nsubj", "ROOT", "det", "dobj", "advmod", "punct"]
+            pos = ["DET", "NOUN", "VERB", "DET", "NOUN", "ADV", "PUNCT"]
+        else:
+            words = ["The", subject, VERBS[verb], adverb, "."]
+            heads = [1, 2, 2, 2, 2]
+            deps = ["det", "nsubj", "ROOT", "advmod", "punct"]
+            pos = ["DET", "NOUN", "VERB", "ADV", "PUNCT"]
+        sentences.append((words, heads, deps, pos))
+    return sentences
+
+
+def lemmatize(word: str) -> str:
+    return PAST_TO_LEMMA.get(word.lower(), word.lower())
+
+
+@Language.component("bench_flat_parser")
+def flat_parser(doc):
+    words = [token.text for token in doc]
+    heads = [0] * len(words)
+    deps = ["ROOT"] + ["dep"] * (len(words) - 1)
+    return Doc(doc.vocab, words=words, heads=heads, deps=deps, lemmas=[lemmatize(word) for word in words])
+
+
+def make_docs(model: str, sentences):
+    if model == "blank":
+        nlp = spacy.blank("en")
+        nlp.add_pipe("bench_flat_parser")
+        docs = [
+            Doc(nlp.vocab, words=words, heads=heads, deps=deps, pos=pos, lemmas=[lemmatize(word) for word in words])
+            for words, heads, deps, pos in sentences
+        ]
+        return nlp, docs
+    nlp = get_spacy_model(model)
+    return nlp, list(nlp.pipe(" ".join(words[:-1]) + "." for words, _, _, _ in sentences))
+
+
+def extract_clauses(components: SentComponents, docs):
+    clauses = []
+    for doc in docs:
+        clause = components.empty_clause()
+        for token in doc:
+            clause = components.translate_clause(components.clause_token(token, clause))
+            if any(clause[comp_type] for comp_type in components.empty_clause()):
+                clauses.append(clause)
+                clause = components.empty_clause()
+    return clauses
+
+
+def legacy_has_known_non_ext_copular(nlp, clause):
+    return any(nlp(verb.text)[0].lemma_ in ["die", "walk"] for verb in clause["V"])
+
+
+def legacy_has_known_ext_copular(nlp, clause):
+    return any(nlp(verb.text)[0].lemma_ in LIST_COPULAR_VERB for verb in clause["V"])
+
+
+def legacy_has_potentially_complex_transitive(nlp, clause):
+    return any(nlp(verb.text)[0].lemma_ in LIST_COMPLEX_TRANSITIVE for verb in clause["V"])
+
+
+LEGACY_PREDICATES = {
+    "has_known_non_ext_copular": legacy_has_known_non_ext_copular,
+    "has_known_ext_copular": legacy_has_known_ext_copular,
+    "has_potentially_complex_transitive": legacy_has_potentially_complex_transitive,
+}
+
+
+def legacy_clause_token(components: SentComponents, token, clause):
+    if token.dep_ == "acl":
+        clause["S"].append(token.head)
+        new_sent = components.nlp("are {}".format(" ".join([t.text for t in token.subtree])))
+        clause["V"].append([t for t in new_sent if t.dep_ == "ROOT"][0])
+        return components.process_dependants(token, clause)
+    if token.dep_ == "ROOT":
+        return clause
+    return components.clause_token(token, clause)
+
+
+def legacy_decompose(components: SentComponents, doc):
+    clauses = []
+    root = [t for t in doc if t.dep_ == "ROOT"][0]
+    if root.pos_ != "VERB":
+        doc = components.nlp("There is " + doc.text)
+    clause = components.empty_clause()
+    for token in doc:
+        clause = components.translate_clause(legacy_clause_token(components, token, clause))
+        if any(clause[comp_type] for comp_type in components.empty_clause()):
+            clauses.append(clause)
+            clause = components.empty_clause()
+    for clause in clauses:
+        clause["type"] = components.define_clause_type(clause)
+        if clause["type"] in OPTIONAL_ADVERBIAL_TYPES:
+            clause["A?"] = clause.pop("A")
+    return [clause_record(clause) for clause in clauses]
+
+
+def with_legacy_predicates(func):
+    current = {name: getattr(clause_decomposition, name) for name in LEGACY_PREDICATES}
+    for name, predicate in LEGACY_PREDICATES.items():
+        setattr(clause_decomposition, name, predicate)
+    try:
+        return func()
+    finally:
+        for name, predicate in current.items():
+            setattr(clause_decomposition, name, predicate)
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+def report(stage: str, num_clauses: int, legacy, current):
+    (legacy_result, legacy_seconds), (result, seconds) = legacy, current
+    print(
+        f"{stage:<9} {num_clauses} clauses"
+        f" | before {num_clauses / legacy_seconds:,.0f} clauses/s ({legacy_seconds:.3f}s)"
+        f" | after {num_clauses / seconds:,.0f} clauses/s ({seconds:.3f}s)"
+        f" | speedup x{legacy_seconds / seconds:.1f} | same clauses {legacy_result == result}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="en_core_web_sm", help='spaCy model name, or "blank" for synthetic Docs')
+    parser.add_argument("--sentences", type=int, default=10000)
+    args = parser.parse_args()
+
+    nlp, docs = make_docs(args.model, make_sentences(args.sentences))
+    components = SentComponents(nlp)
+    print(f"{len(docs)} sentences")
+
+    clauses = extract_clauses(components, docs)
+
+    def classify():
+        return [components.define_clause_type(clause) for clause in clauses]
+
+    report("classify", len(clauses), with_legacy_predicates(lambda: timed(classify)), timed(classify))
+
+    def decompose():
+        return [[clause_record(clause) for clause in components.doc_clauses(doc)] for doc in docs]
+
+    def decompose_legacy():
+        return [legacy_decompose(components, doc) for doc in docs]
+
+    legacy, current = with_legacy_predicates(lambda: timed(decompose_legacy)), timed(decompose)
+    report("decompose", sum(map(len, current[0])), legacy, current)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# coding: utf-8
+"""Compare the cached `ContractionExpander` against the original per-call regex build of
+`expand_contractions`, on tweet-sized and document-sized inputs.
+
+    python -m benchmarks.bench_contractions --docs 20000
+"""
+import argparse
+import random
+import re
+import timeit
+from nlp_utils.contractions import CONTRACTION_MAP
+from nlp_utils.normalize import get_contraction_expander
+
+FILLER_WORDS = ["the", "market", "report", "said", "today", "we", "price", "team", "good", "launch", "new", "data"]
+
+
+def legacy_expand_contractions(text: str, contraction_mapping=CONTRACTION_MAP) -> str:
+    """The implementation before `ContractionExpander`: the alternation is rebuilt on every call."""
+    contractions_pattern = re.compile(
+        "({})".format("|".join(contraction_mapping.keys())), flags=re.IGNORECASE | re.DOTALL
+    )
+
+    def _expand_match(contraction):
+        match = contraction.group(0)
+        expanded_contraction = contraction_mapping.get(match) or contraction_mapping.get(match.lower())
+        return match[0] + expanded_contraction[1:]
+
+    return re.sub("'", "", contractions_pattern.sub(_expand_match, text))
+
+
+def make_corpus(num_docs: int, num_words: int, seed: int = 13):
+    rng = random.Random(seed)
+    contractions = list(CONTRACTION_MAP)
+    corpus = []
+    for _ in range(num_docs):
+        words = [rng.choice(contractions) if rng.random() < 0.1 else rng.choice(FILLER_WORDS) for _ in range(num_words)]
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    expander = get_contraction_expander()
+    for name, num_docs, num_words in [("tweet", args.docs, 25), ("document", max(1, args.docs // 50), 1500)]:
+        corpus = make_corpus(num_docs, num_words)
+        legacy = min(
+            timeit.repeat(lambda: [legacy_expand_contractions(doc) for doc in corpus], number=1, repeat=args.repeat)
+        )
+        cached = min(timeit.repeat(lambda: expander.expand_batch(corpus), number=1, repeat=args.repeat))
+        print(
+            f"{name:>8}: {num_docs} docs x {num_words} words | legacy {legacy:.3f}s "
+            f"({num_docs / legacy:,.0f} docs/s) | expander {cached:.3f}s ({num_docs / cached:,.0f} docs/s) "
+            f"| speedup x{legacy / cached:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
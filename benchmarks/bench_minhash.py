@@ -0,0 +1,95 @@
+# coding: utf-8
+"""Recall and precision of MinHash/LSH near-duplicate pairs against exact shingle Jaccard on a synthetic
+corpus of documents and perturbed copies, for a few band/row configurations, with signature and LSH
+throughput. Recall is given for the bucket candidates and for the pairs whose estimated Jaccard passes
+the threshold.
+
+Exact similarities come from a sparse product of the binary document-by-shingle matrix, so the baseline
+stays fast enough to check every pair.
+
+    python -m benchmarks.bench_minhash --docs 2000 --threshold 0.8 --bands 32x4 16x8 64x2
+"""
+import argparse
+import random
+import time
+import numpy
+from scipy import sparse
+from similarity.minhash import LSHIndex, MinHasher, jaccard_estimate
+
+
+def make_corpus(num_docs: int, vocab_size: int, seed: int = 11):
+    """Half original documents, half copies of a random original with 0-40% of their words replaced."""
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(vocab_size)]
+    weights = [1.0 / rank for rank in range(1, vocab_size + 1)]
+    originals = [rng.choices(vocabulary, weights=weights, k=rng.randint(50, 200)) for _ in range(num_docs // 2)]
+    docs = [" ".join(words) for words in originals]
+    while len(docs) < num_docs:
+        words = list(rng.choice(originals))
+        for position in rng.sample(range(len(words)), int(len(words) * rng.uniform(0.0, 0.4))):
+            words[position] = rng.choice(vocabulary)
+        docs.append(" ".join(words))
+    rng.shuffle(docs)
+    return docs
+
+
+def exact_pairs(hasher: MinHasher, docs, threshold: float):
+    hashes = [hasher.shingle_hashes(doc) for doc in docs]
+    columns, indices = numpy.unique(numpy.concatenate(hashes), return_inverse=True)
+    indptr = numpy.cumsum([0] + [len(row) for row in hashes])
+    matrix = sparse.csr_matrix((numpy.ones(len(indices)), indices, indptr), shape=(len(docs), len(columns)))
+    intersections = sparse.triu(matrix @ matrix.T, k=1).tocoo()
+    sizes = numpy.diff(indptr)
+    jaccard = intersections.data / (sizes[intersections.row] + sizes[intersections.col] - intersections.data)
+    keep = jaccard >= threshold
+    return set(zip(intersections.row[keep].tolist(), intersections.col[keep].tolist()))
+
+
+def lsh_pairs(signatures, bands: int, rows: int, threshold: float):
+    index = LSHIndex(num_perm=signatures.shape[1], bands=bands, rows=rows)
+    started = time.perf_counter()
+    candidates, pairs = set(), set()
+    for doc_id, signature in enumerate(signatures):
+        matches = index.candidates(signature)
+        candidates.update((match, doc_id) for match in matches)
+        if matches:
+            similar = jaccard_estimate(signature, index.store[matches]) >= threshold
+            pairs.update((match, doc_id) for match, keep in zip(matches, similar) if keep)
+        index.insert(signature)
+    return candidates, pairs, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--vocab-size", type=int, default=5000)
+    parser.add_argument("--num-perm", type=int, default=128)
+    parser.add_argument("--shingle-size", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--bands", nargs="+", default=["32x4", "16x8", "64x2"], help="BANDSxROWS configurations")
+    args = parser.parse_args()
+
+    docs = make_corpus(args.docs, args.vocab_size)
+    hasher = MinHasher(num_perm=args.num_perm, shingle_size=args.shingle_size)
+    started = time.perf_counter()
+    signatures = hasher.signatures(docs)
+    seconds = time.perf_counter() - started
+    print(f"{len(docs)} docs | signatures {len(docs) / seconds:,.0f} docs/s ({seconds:.3f}s)")
+
+    started = time.perf_counter()
+    exact = exact_pairs(hasher, docs, args.threshold)
+    print(f"exact Jaccard >= {args.threshold}: {len(exact)} pairs ({time.perf_counter() - started:.3f}s)")
+    for configuration in args.bands:
+        bands, rows = map(int, configuration.split("x"))
+        candidates, found, seconds = lsh_pairs(signatures, bands, rows, args.threshold)
+        true_positives = len(found & exact)
+        print(
+            f"{bands:>3} bands x {rows:>2} rows | {len(candidates)} candidates,"
+            f" recall {len(candidates & exact) / max(len(exact), 1):.3f}"
+            f" | {len(found)} pairs above threshold, recall {true_positives / max(len(exact), 1):.3f}"
+            f" precision {true_positives / max(len(found), 1):.3f} | LSH {len(docs) / seconds:,.0f} docs/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# coding: utf-8
+"""Time `SpacyWordSplitter.batch_split_words` across batch sizes: the full pipeline, the pipeline with
+the components tokenization does not need skipped, and the tokenizer-only fast path.
+
+Sentences are read one per line from `--input`, or generated from news-style templates.
+
+    python -m benchmarks.bench_spacy_splitter --model en_core_web_sm --sentences 20000 --batch-sizes 1 64 1000
+"""
+import argparse
+import random
+import time
+from unittest import mock
+from nlp_utils.word_splitter import SpacyWordSplitter
+
+SUBJECTS = ["The company", "Shares of Acme Corp.", "A U.S. regulator", "Analysts at the bank", "The new CEO", "She"]
+VERBS = ["reported", "didn't expect", "announced", "cut", "said it would review", "raised"]
+OBJECTS = [
+    "quarterly revenue of $4.2 billion",
+    "its full-year guidance",
+    "a 3.5% rise in operating costs",
+    "plans for a merger with Globex, Inc.",
+    "the interest-rate outlook for 2024",
+    "job cuts across its European offices",
+]
+TAILS = ["", " on Tuesday", ", according to a filing", " after markets closed", " (see chart)", ", sources say"]
+
+
+def make_sentences(num_sentences: int, seed: int = 13):
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}{rng.choice(TAILS)}."
+        for _ in range(num_sentences)
+    ]
+
+
+def make_splitter(nlp, **kwargs) -> SpacyWordSplitter:
+    # share one loaded model between the variants instead of loading it three times
+    with mock.patch("nlp_utils.word_splitter.get_spacy_model", return_value=nlp):
+        return SpacyWordSplitter(**kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="en_core_web_sm")
+    parser.add_argument("--input", help="text file with one sentence per line")
+    parser.add_argument("--sentences", type=int, default=20000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 128, 1000])
+    parser.add_argument("--n-process", type=int, default=1)
+    args = parser.parse_args()
+
+    import spacy
+
+    nlp = spacy.load(args.model)
+    if args.input:
+        with open(args.input, encoding="utf-8") as f:
+            sentences = [line.strip() for line in f if line.strip()][: args.sentences]
+    else:
+        sentences = make_sentences(args.sentences)
+    print(f"{len(sentences)} sentences, model {args.model}, pipes {nlp.pipe_names}, n_process {args.n_process}")
+
+    variants = [
+        ("full pipeline", make_splitter(nlp, disabled=[])),
+        ("skip unneeded", make_splitter(nlp)),
+        ("tokenizer only", make_splitter(nlp, tokens_only=True)),
+    ]
+    for batch_size in args.batch_sizes:
+        timings = []
+        for name, splitter in variants:
+            started = time.perf_counter()
+            splitter.batch_split_words(sentences, batch_size=batch_size, n_process=args.n_process)
+            elapsed = time.perf_counter() - started
+            timings.append(f"{name} {len(sentences) / elapsed:,.0f}/s")
+        print(f"batch_size {batch_size:>5}: " + " | ".join(timings))
+
+
+if __name__ == "__main__":
+    main()
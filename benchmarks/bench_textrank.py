@@ -0,0 +1,87 @@
+# coding: utf-8
+"""Time the TextRank stage of `PhraseExtractor` (word graph, PageRank, connected components) with the
+networkx and the SciPy sparse backends, on synthetic parsed documents of 1k, 10k and 100k tokens,
+and check that both rank the words identically.
+
+Documents are built directly as spaCy `Doc`s with Zipf-distributed words, random tags and a chain-shaped
+dependency tree per sentence, so no model is needed and parsing is left out of the timings.
+
+    python -m benchmarks.bench_textrank --tokens 1000 10000 100000
+"""
+import argparse
+import random
+import time
+import spacy
+from spacy.tokens import Doc
+from common.types import Word
+from extractor.phrase_extractor import PhraseExtractor
+
+TAGS = ["NN", "NNS", "NNP", "JJ", "VB", "VBD", "DT", "IN", "RB"]
+VALID_TAGS = {"NN", "NNS", "NNP", "NNPS", "JJ", "JJS"}
+
+
+def make_vocabulary(size: int, rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+
+def make_doc(nlp, num_tokens: int, vocab_size: int, seed: int = 13) -> Doc:
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocab_size, rng)
+    weights = [1.0 / rank for rank in range(1, vocab_size + 1)]
+    words = rng.choices(vocabulary, weights=weights, k=num_tokens)
+    heads = []
+    start = 0
+    while start < num_tokens:
+        length = min(rng.randint(8, 35), num_tokens - start)
+        root = start + rng.randrange(length)
+        heads.extend(i + 1 if i < root else (i - 1 if i > root else i) for i in range(start, start + length))
+        start += length
+    deps = ["ROOT" if head == i else "dep" for i, head in enumerate(heads)]
+    tags = rng.choices(TAGS, k=num_tokens)
+    return Doc(nlp.vocab, words=words, heads=heads, deps=deps, tags=tags, lemmas=words)
+
+
+def make_extractor(nlp, backend: str) -> PhraseExtractor:
+    # skip __init__, which loads the NLTK stopword list that the graph stage does not use
+    extractor = PhraseExtractor.__new__(PhraseExtractor)
+    extractor.nlp, extractor.doc_cache, extractor.backend, extractor.valid_tags = nlp, None, backend, VALID_TAGS
+    return extractor
+
+
+def rank_words(extractor: PhraseExtractor, nodes, window: int):
+    graph = extractor.build_graph(nodes, window, normalize=False)
+    keywords = extractor.get_keywords_orderby_rank_score(graph)
+    components = sorted(extractor.graph_components(graph), key=lambda c: c[0], reverse=True)
+    return keywords, [sorted(wordnums) for _, wordnums in components]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--vocab-size", type=int, default=5000)
+    parser.add_argument("--window", type=int, default=3)
+    parser.add_argument("--skip-networkx-above", type=int, default=None, help="only time scipy on larger docs")
+    args = parser.parse_args()
+
+    nlp = spacy.blank("en")
+    for num_tokens in args.tokens:
+        doc = make_doc(nlp, num_tokens, args.vocab_size)
+        nodes = [(Word(i, token.i, token), token.tag_ in VALID_TAGS) for i, sent in enumerate(doc.sents) for token in sent]
+        started = time.perf_counter()
+        scipy_result = rank_words(make_extractor(nlp, "scipy"), nodes, args.window)
+        scipy_seconds = time.perf_counter() - started
+        line = f"{num_tokens:>7} tokens, {len(scipy_result[0]):>5} nodes | scipy {scipy_seconds:.3f}s"
+        if args.skip_networkx_above is None or num_tokens <= args.skip_networkx_above:
+            started = time.perf_counter()
+            networkx_result = rank_words(make_extractor(nlp, "networkx"), nodes, args.window)
+            networkx_seconds = time.perf_counter() - started
+            line += (
+                f" | networkx {networkx_seconds:.3f}s | speedup x{networkx_seconds / scipy_seconds:.1f}"
+                f" | same ranking {networkx_result == scipy_result}"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
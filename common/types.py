@@ -9,6 +9,13 @@ Word = namedtuple("Word", ["sentnum", "wordnum", "token"])
 
 Phrase = namedtuple("Phrase", ["text", "text_lemma", "words", "lemmas", "pos", "start", "end"])
 
+ScoredPhrase = namedtuple("ScoredPhrase", ["phrase", "score"])
+
+# a decomposed clause as token texts; `adverbial` holds the optional adverbials (A?) of SV/SVO/SVC/SVOO/SVOC clauses
+ClauseRecord = namedtuple(
+    "ClauseRecord", ["type", "subject", "verb", "dobj", "iobj", "xcomp", "complement", "adverbial"]
+)
+
 # define a Phrase type--> modify the following to a namedupe type? or List of Word type
 
 ClassifierMetadata = namedtuple(
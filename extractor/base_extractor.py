@@ -1,3 +1,4 @@
+from typing import Iterable, Iterator
 from abc import ABCMeta, abstractmethod
 
 
@@ -14,3 +15,9 @@ class BaseExtractor(metaclass=ABCMeta):
     def extract(self, text):
         """Return a list of noun phrases (strings) for a body of text."""
         raise NotImplementedError
+
+    def extract_many(self, texts: Iterable[str], batch_size: int = 1000, n_process: int = 1, **kwargs) -> Iterator:
+        """Yield the ``extract`` result of every text, in order. The default calls ``extract`` text by text;
+        spaCy based extractors override it to parse the stream in batches with ``nlp.pipe``."""
+        for text in texts:
+            yield self.extract(text, **kwargs)
@@ -0,0 +1,138 @@
+# coding: utf-8
+"""Corpus-level keyphrases: per-document TextRank phrase scores reweighted by how many documents of the
+corpus seen so far contain the same phrase lemma.
+
+Document frequencies live in a small SQLite table (one row per phrase lemma plus the document count) that
+is updated as documents stream in, so the weighting never requires another pass over the history.
+Examples
+---------
+>>> store = DocumentFrequencyStore("keyphrase_df.sqlite3")
+>>> extractor = CorpusKeyphraseExtractor(PhraseExtractor(nlp), store)
+>>> for keyphrases in extractor.extract_many(postings, batch_size=500, top_n=10):
+...     print([(scored.phrase.text, round(scored.score, 3)) for scored in keyphrases])
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from collections import Counter
+import math
+import os
+import sqlite3
+from extractor.base_extractor import BaseExtractor
+from extractor.phrase_extractor import PhraseExtractor
+from common.types import ScoredPhrase
+from nlp_utils.doc_cache import parse_text, pipe_texts
+from utils.parallel import chunked
+
+# SQLite caps the number of bound parameters of a statement (999 in older builds)
+_MAX_SQL_PARAMS = 900
+
+
+class DocumentFrequencyStore:
+    """Document frequencies of phrase lemmas in a SQLite file (``":memory:"`` for a throwaway store)."""
+
+    def __init__(self, path: Union[str, os.PathLike] = ":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(str(path))
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS df (lemma TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('n_docs', 0)")
+
+    def update(self, documents: Iterable[Iterable[str]]) -> int:
+        """Count each document's distinct lemmas once, in a single transaction; return the number of documents."""
+        counts = Counter()
+        n_docs = 0
+        for lemmas in documents:
+            counts.update(set(lemmas))
+            n_docs += 1
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO df VALUES (?, ?) ON CONFLICT(lemma) DO UPDATE SET df = df + excluded.df", counts.items()
+            )
+            self._conn.execute("UPDATE meta SET value = value + ? WHERE key = 'n_docs'", (n_docs,))
+        return n_docs
+
+    def add_document(self, lemmas: Iterable[str]) -> None:
+        self.update([lemmas])
+
+    @property
+    def n_docs(self) -> int:
+        return self._conn.execute("SELECT value FROM meta WHERE key = 'n_docs'").fetchone()[0]
+
+    def df(self, lemma: str) -> int:
+        row = self._conn.execute("SELECT df FROM df WHERE lemma = ?", (lemma,)).fetchone()
+        return row[0] if row else 0
+
+    def dfs(self, lemmas: Iterable[str]) -> Dict[str, int]:
+        """Document frequencies of ``lemmas``, 0 for the unseen ones."""
+        unique_lemmas = list(set(lemmas))
+        counts = dict.fromkeys(unique_lemmas, 0)
+        for chunk in chunked(unique_lemmas, _MAX_SQL_PARAMS):
+            placeholders = ",".join("?" * len(chunk))
+            counts.update(self._conn.execute(f"SELECT lemma, df FROM df WHERE lemma IN ({placeholders})", chunk))
+        return counts
+
+    def idf(self, lemmas: Iterable[str]) -> Dict[str, float]:
+        """Smoothed inverse document frequency, ``ln((1 + N) / (1 + df)) + 1``, as in scikit-learn."""
+        n_docs = self.n_docs
+        return {lemma: math.log((1 + n_docs) / (1 + df)) + 1 for lemma, df in self.dfs(lemmas).items()}
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "DocumentFrequencyStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM df").fetchone()[0]
+
+
+class CorpusKeyphraseExtractor(BaseExtractor):
+    """Rank each document's TextRank phrases by ``score * idf(phrase lemma)`` against a
+    ``DocumentFrequencyStore``. With ``update=True`` the documents are counted into the store first,
+    a batch at a time, so each batch is weighted against the history plus itself."""
+
+    def __init__(self, phrase_extractor: PhraseExtractor, store: DocumentFrequencyStore, update: bool = True):
+        self.phrase_extractor = phrase_extractor
+        self.store = store
+        self.update = update
+
+    def rerank(self, scored_phrases: List[ScoredPhrase], top_n: Optional[int] = None) -> List[ScoredPhrase]:
+        idf = self.store.idf(scored.phrase.text_lemma for scored in scored_phrases)
+        reranked = sorted(
+            (ScoredPhrase(scored.phrase, scored.score * idf[scored.phrase.text_lemma]) for scored in scored_phrases),
+            key=lambda scored: scored.score,
+            reverse=True,
+        )
+        return reranked[:top_n] if top_n is not None else reranked
+
+    def _rerank_batch(self, batch: List[List[ScoredPhrase]], top_n: Optional[int]) -> List[List[ScoredPhrase]]:
+        if self.update:
+            self.store.update({scored.phrase.text_lemma for scored in scored_phrases} for scored_phrases in batch)
+        return [self.rerank(scored_phrases, top_n) for scored_phrases in batch]
+
+    def extract(self, text: str, top_n: Optional[int] = None, window=3, normalize=False) -> List[ScoredPhrase]:
+        extractor = self.phrase_extractor
+        doc = parse_text(extractor.nlp, text, extractor.doc_cache)
+        return self._rerank_batch([extractor.extract_scored_from_doc(doc, window, normalize)], top_n)[0]
+
+    def extract_many(
+        self,
+        texts: Iterable[str],
+        batch_size: int = 1000,
+        n_process: int = 1,
+        top_n: Optional[int] = None,
+        window=3,
+        normalize=False,
+    ) -> Iterator[List[ScoredPhrase]]:
+        """Lazily yield the reranked phrases of ``texts`` in order. Texts are parsed with ``nlp.pipe`` and the
+        store is updated once per ``batch_size`` documents."""
+        extractor = self.phrase_extractor
+        docs = pipe_texts(extractor.nlp, texts, batch_size, n_process, extractor.doc_cache)
+        scored = (extractor.extract_scored_from_doc(doc, window, normalize) for doc in docs)
+        for batch in chunked(scored, batch_size):
+            yield from self._rerank_batch(batch, top_n)
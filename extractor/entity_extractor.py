@@ -14,32 +14,137 @@ Examples
 >>> print([(ent, ent.label_) for ent in entities])
 [(Q4, 'DATE'), (Bank of America, 'ORG'), (23 million transactions, 'PLURAL_NOUN'), (7 billion, 'SHORT_MONEY'), (91 percent, 'PERCENT'), (the prior year, 'DATE')]
 """
-from typing import Tuple, List, Dict, Iterable, Union
+from typing import Tuple, List, Dict, Iterable, Iterator, Union
+from collections import defaultdict
+import json
+import os
 from extractor.base_extractor import BaseExtractor
+from extractor.keyword_trie import KeywordTrie
 from spacy.tokens import Doc, Span
 from spacy.matcher import Matcher, PhraseMatcher
 from spacy.pipeline import EntityRuler
 from spacy.util import filter_spans
+from nlp_utils.doc_cache import DocCache, check_doc_cache, parse_text, pipe_texts
+from nlp_utils.spacy_utils import resolve_spacy_model
+
+
+PHRASE_BACKENDS = ("matcher", "trie")
 
 
 class EntityExtractor(BaseExtractor):
     """ Extract an ordered sequence of named entities (PERSON, ORG, LOC, etc.) from a ``Doc``,
-    optionally filtering by entity types and frequencies"""
+    optionally filtering by entity types and frequencies.
+
+    Exact phrases from ``set_entity_patterns`` go to a spaCy ``PhraseMatcher`` by default, or, with
+    ``phrase_backend="trie"``, to a pure-Python ``KeywordTrie`` that needs no tokenization to compile and
+    can be run over raw text with ``match_phrases``. ``to_disk``/``from_disk`` save and restore the
+    compiled rule set.
+
+    The ``EntityRuler`` stays private to the extractor and is applied to a copy of each parsed doc, so
+    the pipeline, which may be shared through ``SPACY_MODELS``, and the docs of a ``DocCache`` are never
+    modified. ``compile()`` freezes the rule set: adding rules afterwards raises ``RuntimeError``, and a
+    compiled extractor only reads its matchers, so it can be shared by threads. ``extract`` compiles on
+    first use if it was not done explicitly."""
+
+    def __init__(self, nlp, doc_cache: DocCache = None, phrase_backend: str = "matcher", **kwargs) -> None:
+        if phrase_backend not in PHRASE_BACKENDS:
+            raise ValueError(f"phrase_backend={phrase_backend!r} is invalid; values must be one of {PHRASE_BACKENDS}")
+        # a loaded pipeline, or a model name shared through `nlp_utils.spacy_utils.SPACY_MODELS`
+        self.nlp = resolve_spacy_model(nlp)
+        self.doc_cache = check_doc_cache(self.nlp, doc_cache)
+        self.phrase_backend = phrase_backend
+        self.ruler = EntityRuler(self.nlp, overwrite_ents=True)
+        self.matcher = PhraseMatcher(self.nlp.vocab)
+        self.keyword_trie = KeywordTrie(case_sensitive=True)
+        # label -> pattern texts, kept to serialize the matcher, whose compiled state spaCy can't save
+        self.phrase_patterns: Dict[str, List[str]] = defaultdict(list)
+        self._label_hashes: Dict[str, int] = {}
+        self._compiled = False
+
+    @property
+    def is_compiled(self) -> bool:
+        return self._compiled
+
+    def compile(self) -> "EntityExtractor":
+        """Freeze the rule set. Safe to call more than once and from several threads."""
+        self._compiled = True
+        return self
+
+    def _check_mutable(self):
+        if self._compiled:
+            raise RuntimeError("EntityExtractor is compiled; rules can't be added after compile() or extract()")
 
-    def __init__(self, nlp, **kwargs) -> None:
-        self.nlp = nlp
-        self.ruler = EntityRuler(nlp, overwrite_ents=True)
-        self.matcher = PhraseMatcher(nlp.vocab)
+    def set_entity_patterns(self, patterns: Iterable[str], label: str, batch_size: int = 1000):
+        """Add exact phrase patterns for ``label``; they are tokenized in bulk with ``nlp.tokenizer.pipe``."""
+        self._check_mutable()
+        patterns = list(patterns)
+        self.phrase_patterns[label].extend(patterns)
+        self._label_hashes[label] = self.nlp.vocab.strings.add(label)
+        if self.phrase_backend == "trie":
+            self.keyword_trie.add_phrases(patterns, label)
+        else:
+            self.matcher.add(label, list(self.nlp.tokenizer.pipe(patterns, batch_size=batch_size)))
+
+    def match_phrases(self, text: str) -> List[Tuple[str, int, int]]:
+        """``(label, start_char, end_char)`` of the phrase patterns in raw ``text``, without running spaCy;
+        requires ``phrase_backend="trie"``."""
+        if self.phrase_backend != "trie":
+            raise ValueError("match_phrases needs phrase_backend='trie'")
+        return list(self.keyword_trie.iter_matches(text))
+
+    def _phrase_matches(self, doc: Doc) -> List[Tuple[int, int, int]]:
+        if self.phrase_backend == "matcher":
+            return self.matcher(doc)
+        matches = []
+        for label, start_char, end_char in self.keyword_trie.iter_matches(doc.text):
+            span = doc.char_span(start_char, end_char, alignment_mode="expand")
+            if span is not None:
+                matches.append((self._label_hashes[label], span.start, span.end))
+        return matches
+
+    def to_disk(self, path: Union[str, os.PathLike]) -> None:
+        """Save the phrase patterns, pre-tokenized or as the trie, and the ``EntityRuler`` rules."""
+        os.makedirs(path, exist_ok=True)
+        meta = {"phrase_backend": self.phrase_backend, "patterns": self.phrase_patterns}
+        if self.phrase_backend == "trie":
+            self.keyword_trie.to_disk(os.path.join(path, "keyword_trie.pkl"))
+        else:
+            # token texts rebuild the pattern docs with `Doc(vocab, words)`, several times faster than
+            # tokenizing again or reading a `DocBin`
+            meta["tokens"] = {
+                label: [[token.text for token in doc] for doc in self.nlp.tokenizer.pipe(patterns)]
+                for label, patterns in self.phrase_patterns.items()
+            }
+        with open(os.path.join(path, "phrase_patterns.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        if len(self.ruler) > 0:
+            self.ruler.to_disk(os.path.join(path, "entity_ruler"))
 
-    def set_entity_patterns(self, patterns: Union[str, List[Dict[str, str]]], label: str):
-        patterns = [self.nlp.make_doc(pattern) for pattern in patterns]
-        self.matcher.add(label, None, patterns)
+    @classmethod
+    def from_disk(cls, nlp, path: Union[str, os.PathLike], doc_cache: DocCache = None) -> "EntityExtractor":
+        """Restore an extractor saved with ``to_disk``, without tokenizing the phrase patterns again."""
+        with open(os.path.join(path, "phrase_patterns.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        extractor = cls(nlp, doc_cache=doc_cache, phrase_backend=meta["phrase_backend"])
+        extractor.phrase_patterns.update(meta["patterns"])
+        extractor._label_hashes = {label: extractor.nlp.vocab.strings.add(label) for label in meta["patterns"]}
+        if extractor.phrase_backend == "trie":
+            extractor.keyword_trie = KeywordTrie.from_disk(os.path.join(path, "keyword_trie.pkl"))
+        else:
+            vocab = extractor.nlp.vocab
+            for label, token_lists in meta["tokens"].items():
+                extractor.matcher.add(label, [Doc(vocab, words=words) for words in token_lists])
+        ruler_path = os.path.join(path, "entity_ruler")
+        if os.path.exists(ruler_path):
+            extractor.ruler.from_disk(ruler_path)
+        return extractor
 
     def set_entity_rules(self, patterns: Union[str, List[Dict[str, str]]], label: str):
         """e.g "pattern": "MyCorp Inc.", "pattern": [{"LOWER": "san"}, {"LOWER": "francisco"}]
         The EntityRuler lets you add spans to the `Doc.ents` using rules or exact phrase matches.
         It can be combined with the statistical `EntityRecognizer` to boost accuracy.
         """
+        self._check_mutable()
         if isinstance(patterns, list):
             if all(isinstance(item, str) for item in patterns):
                 pass
@@ -80,9 +185,21 @@ class EntityExtractor(BaseExtractor):
             Recognized entities from `rule`, `ner`, `matcher` component.
 
         """
-        if len(self.ruler) > 0 and not self.nlp.has_pipe("entity_ruler"):
-            self.nlp.add_pipe(self.ruler)
-        doc = self.nlp(text)
-        matches = self.matcher(doc)
+        self.compile()
+        doc = parse_text(self.nlp, text, self.doc_cache)
+        return self.extract_from_doc(doc)
+
+    def extract_from_doc(self, doc: Doc) -> List[Span]:
+        """Apply the entity rules and the phrase matcher to an already parsed ``doc`` and merge with its
+        entities. ``doc`` itself is left untouched."""
+        if len(self.ruler) > 0:
+            doc = self.ruler(doc.copy())
+        matches = self._phrase_matches(doc)
         entities = self.entity_spans(doc, matches)
         return entities
+
+    def extract_many(self, texts: Iterable[str], batch_size: int = 1000, n_process: int = 1) -> Iterator[List[Span]]:
+        """Lazily extract entities from ``texts`` in order, parsing them in batches with ``nlp.pipe``."""
+        self.compile()
+        for doc in pipe_texts(self.nlp, texts, batch_size, n_process, self.doc_cache):
+            yield self.extract_from_doc(doc)
@@ -0,0 +1,117 @@
+# coding: utf-8
+"""Exact-phrase matching over raw text with a character trie, in the spirit of FlashText: one left to
+right scan finds the longest gazetteer phrase starting at each word boundary, so the cost depends on the
+text length and not on the number of phrases, and no spaCy pipeline is involved.
+Examples
+---------
+>>> trie = KeywordTrie()
+>>> trie.add_phrases(["Bank of America", "Bank"], "ORG")
+>>> trie.extract("Bank of America and the bank of england")
+[KeywordMatch(label='ORG', start=0, end=15, text='Bank of America'), KeywordMatch(label='ORG', start=24, end=28, text='bank')]
+"""
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Union
+import os
+import pickle
+
+_END = ""  # key of the terminal entry of a node; never a character of the text
+
+
+class KeywordMatch(NamedTuple):
+    label: str
+    start: int
+    end: int
+    text: str
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class KeywordTrie:
+    """Character trie of phrases with labels. Matches are whole words only: a phrase must start and end
+    at a word boundary of the text, and the longest phrase wins at each position."""
+
+    def __init__(self, case_sensitive: bool = False):
+        self.case_sensitive = case_sensitive
+        self._root: Dict[str, dict] = {}
+        self._size = 0
+
+    def _fold(self, text: str) -> str:
+        if self.case_sensitive:
+            return text
+        folded = text.lower()
+        if len(folded) != len(text):
+            # a few characters (e.g. "İ") lower to several; keep those as is so offsets stay aligned
+            folded = "".join(char.lower() if len(char.lower()) == 1 else char for char in text)
+        return folded
+
+    def add(self, phrase: str, label: str) -> None:
+        phrase = self._fold(phrase.strip())
+        if not phrase:
+            return
+        node = self._root
+        for char in phrase:
+            node = node.setdefault(char, {})
+        if _END not in node:
+            self._size += 1
+        node[_END] = label
+
+    def add_phrases(self, phrases: Iterable[str], label: str) -> None:
+        for phrase in phrases:
+            self.add(phrase, label)
+
+    def get(self, phrase: str) -> Union[str, None]:
+        """Return the label of ``phrase``, or None if it is not in the trie."""
+        node = self._root
+        for char in self._fold(phrase.strip()):
+            node = node.get(char)
+            if node is None:
+                return None
+        return node.get(_END)
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[str, int, int]]:
+        """Yield ``(label, start, end)`` character offsets of the non-overlapping longest matches."""
+        folded = self._fold(text)
+        length = len(folded)
+        root = self._root
+        i = 0
+        while i < length:
+            if i > 0 and _is_word_char(folded[i - 1]) and _is_word_char(folded[i]):
+                i += 1
+                continue
+            node = root.get(folded[i])
+            match = None
+            j = i
+            while node is not None:
+                j += 1
+                if _END in node and (j == length or not (_is_word_char(folded[j - 1]) and _is_word_char(folded[j]))):
+                    match = (node[_END], i, j)
+                if j == length:
+                    break
+                node = node.get(folded[j])
+            if match is not None:
+                yield match
+                i = match[2]
+            else:
+                i += 1
+
+    def extract(self, text: str) -> List[KeywordMatch]:
+        return [KeywordMatch(label, start, end, text[start:end]) for label, start, end in self.iter_matches(text)]
+
+    def to_disk(self, path: Union[str, os.PathLike]) -> None:
+        with open(path, "wb") as f:
+            pickle.dump((self.case_sensitive, self._size, self._root), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def from_disk(cls, path: Union[str, os.PathLike]) -> "KeywordTrie":
+        with open(path, "rb") as f:
+            case_sensitive, size, root = pickle.load(f)
+        trie = cls(case_sensitive=case_sensitive)
+        trie._size, trie._root = size, root
+        return trie
+
+    def __contains__(self, phrase: str) -> bool:
+        return self.get(phrase) is not None
+
+    def __len__(self) -> int:
+        return self._size
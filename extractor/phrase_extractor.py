@@ -1,17 +1,37 @@
 # coding: utf-8
-from typing import List, Tuple, Iterable
+from typing import Dict, List, Optional, Tuple, Iterable, Iterator, Union
 from spacy.tokens import Token, Span, Doc
 from itertools import chain
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import string
 import networkx as nx
 from math import floor
 from nltk.metrics.distance import edit_distance
 from extractor.base_extractor import BaseExtractor
-from utils.constants import BRACKET_ESCAPES
-from utils.stopwords import NLPStopwords
-from utils.types import Word, Phrase
-from utils.misc import overlap_items, consecutive
+from extractor.textrank import WordGraph, build_word_graph, graph_components, pagerank
+from nlp_utils.doc_cache import DocCache, check_doc_cache, parse_text, pipe_texts
+from nlp_utils.spacy_utils import resolve_spacy_model
+from common.constants import BRACKET_ESCAPES
+from nlp_utils.stopwords import NLPStopwords
+from common.types import Word, Phrase, ScoredPhrase
+from utils.utils import overlap_items, consecutive
+from utils.parallel import chunked, imap_ordered
+
+
+TEXTRANK_BACKENDS = ("scipy", "networkx")
+
+_WORKER_EXTRACTOR: Optional["PhraseExtractor"] = None
+
+
+def _init_extract_worker(extractor: "PhraseExtractor"):
+    global _WORKER_EXTRACTOR
+    _WORKER_EXTRACTOR = extractor
+
+
+def _extract_chunk(texts: List[str], batch_size: int, kwargs: dict) -> List[List[Phrase]]:
+    return list(_WORKER_EXTRACTOR.extract_many(texts, batch_size=batch_size, **kwargs))
 
 
 class PhraseExtractor(BaseExtractor):
@@ -21,49 +41,117 @@ class PhraseExtractor(BaseExtractor):
     extract phrase that are most important in the text. Nodes are words of certain part-of-speech (nouns and adjectives)
     and edges represent occurrence of nodes (of span), controlled by two layer distance between nodes (window_layer=2).
     Nodes are ranked by TextRank graph-based ranking algorithm with the depth of tree as weight.
+    The graph is held in SciPy sparse matrices by default (``extractor.textrank``); ``backend="networkx"``
+    builds the equivalent ``networkx.Graph``, with the same ranking. Every extraction builds and drops its
+    own graph, so one extractor can serve concurrent callers.
     """
 
-    def __init__(self, nlp, **kwargs) -> None:
-        self.nlp = nlp
+    def __init__(self, nlp, doc_cache: DocCache = None, backend: str = "scipy", **kwargs) -> None:
+        if backend not in TEXTRANK_BACKENDS:
+            raise ValueError(f"backend={backend!r} is invalid; values must be one of {TEXTRANK_BACKENDS}")
+        # a loaded pipeline, or a model name shared through `nlp_utils.spacy_utils.SPACY_MODELS`
+        self.nlp = resolve_spacy_model(nlp)
+        self.doc_cache = check_doc_cache(self.nlp, doc_cache)
         self.stop_words = NLPStopwords().stopwords
         self.valid_tags = {"NN", "NNS", "NNP", "NNPS", "JJ", "JJS"}  # 'VBG', 'IN'
-        self.graph = nx.Graph()
+        self.backend = backend
         # self.weights = {} #Weight container (can be either word or candidate weights)
 
     def extract(self, text: str, window=3, normalize=False, top_percent=None, topN=10):
         """Return a list of noun phrases (strings) for a body of text."""
-        doc = self.nlp(text)
-        nodes = [
+        doc = parse_text(self.nlp, text, self.doc_cache)
+        return self.extract_from_doc(doc, window, normalize, top_percent, topN)
+
+    def extract_many(
+        self, texts: Iterable[str], batch_size: int = 1000, n_process: int = 1, n_threads: int = 1, **kwargs
+    ) -> Iterator[List[Phrase]]:
+        """Lazily extract noun phrases from ``texts`` in order; ``kwargs`` are the options of ``extract``.
+        Texts are parsed in batches with ``nlp.pipe``. With ``n_process > 1``, chunks of ``batch_size`` texts
+        are parsed and ranked end to end by a pool of worker processes, each holding a copy of this
+        extractor; with ``n_threads > 1``, docs are parsed here and ranked by a thread pool."""
+        if n_process > 1:
+            yield from chain.from_iterable(
+                imap_ordered(
+                    partial(_extract_chunk, batch_size=batch_size, kwargs=kwargs),
+                    chunked(texts, batch_size),
+                    n_jobs=n_process,
+                    initializer=_init_extract_worker,
+                    initargs=(self,),
+                )
+            )
+            return
+        docs = pipe_texts(self.nlp, texts, batch_size, 1, self.doc_cache)
+        if n_threads > 1:
+            with ThreadPoolExecutor(max_workers=n_threads) as executor:
+                yield from imap_ordered(partial(self.extract_from_doc, **kwargs), docs, executor=executor)
+            return
+        for doc in docs:
+            yield self.extract_from_doc(doc, **kwargs)
+
+    def doc_nodes(self, doc: Doc) -> List[Tuple[Word, bool]]:
+        return [
             (Word(sent_id, token.i, token), token.tag_ in self.valid_tags)
             for sent_id, sent in enumerate(doc.sents)
             for token in sent
         ]
-        weighted_keywords = self.get_keywords_orderby_rank_score(nodes, window, normalize)
+
+    def extract_from_doc(self, doc: Doc, window=3, normalize=False, top_percent=None, topN=10):
+        """Return a list of noun phrases for an already parsed ``doc``."""
+        graph = self.build_graph(self.doc_nodes(doc), window, normalize)
+        weighted_keywords = self.get_keywords_orderby_rank_score(graph)
         # combined keywords into phrase and get the weighted sum to rerank
-        keyphrases = self.get_combined_keywords(doc, window, normalize)
+        keyphrases = self.get_combined_keywords(doc, graph, window)
         # compute the number of top keywords
         if top_percent is not None:
-            num_nodes = self.graph.number_of_nodes()
+            num_nodes = self.number_of_nodes(graph)
             topN = int(min(floor(num_nodes * top_percent), num_nodes))
         return keyphrases
 
-    def get_keywords_orderby_rank_score(self, nodes: List[Tuple[Word, bool]], window: int, normalize: bool):
-        # build sentence word graph
-        self.build_weighted_undirected_word_graph(nodes, window=window, normalize=normalize)
+    def build_graph(self, nodes: List[Tuple[Word, bool]], window: int, normalize: bool) -> Union[WordGraph, nx.Graph]:
+        """Build the word graph of one doc with the configured backend."""
+        if self.backend == "scipy":
+            return build_word_graph(nodes, window=window, normalize=normalize)
+        return self.build_weighted_undirected_word_graph(nodes, window=window, normalize=normalize)
+
+    def extract_scored_from_doc(self, doc: Doc, window=3, normalize=False) -> List[ScoredPhrase]:
+        """Return the noun phrases of ``doc`` with their TextRank score, the sum of the PageRank scores of
+        the graph words they cover, best first."""
+        graph = self.build_graph(self.doc_nodes(doc), window, normalize)
+        word_scores = self.word_scores(graph)
+        position_scores = {
+            position: word_scores[key] for key, positions in self.node_positions(graph) for position in positions
+        }
+        scored_phrases = [
+            ScoredPhrase(phrase, sum(position_scores.get(i, 0.0) for i in range(phrase.start, phrase.end)))
+            for phrase in self.get_combined_keywords(doc, graph, window)
+        ]
+        return sorted(scored_phrases, key=lambda scored_phrase: scored_phrase.score, reverse=True)
+
+    @staticmethod
+    def word_scores(graph: Union[WordGraph, nx.Graph]) -> Dict[str, float]:
         # compute pagerank score
-        weighted_scores = nx.pagerank(self.graph, alpha=0.85, tol=0.0001, weight="weight")
+        if isinstance(graph, WordGraph):
+            scores = pagerank(graph.adjacency, alpha=0.85, tol=0.0001)
+            return dict(zip(graph.keys, scores.tolist()))
+        return nx.pagerank(graph, alpha=0.85, tol=0.0001, weight="weight")
+
+    def get_keywords_orderby_rank_score(self, graph: Union[WordGraph, nx.Graph]) -> List[str]:
+        weighted_scores = self.word_scores(graph)
         keywords = sorted(weighted_scores, key=weighted_scores.get, reverse=True)
         return keywords
 
-    def build_weighted_undirected_word_graph(self, nodes: List[Tuple[Word, bool]], window: int, normalize: bool):
+    def build_weighted_undirected_word_graph(
+        self, nodes: List[Tuple[Word, bool]], window: int, normalize: bool
+    ) -> nx.Graph:
+        graph = nx.Graph()
         # add nodes to the graph
         node_stat = lambda tok: tok.lemma_ if normalize else tok.text
         dict_attr = defaultdict(list)
         for node, is_valid in nodes:
             if is_valid:
                 dict_attr[node_stat(node.token)].append(node.wordnum)
-        self.graph.add_nodes_from(dict_attr.keys())
-        nx.set_node_attributes(self.graph, values=dict_attr, name="wordnum")
+        graph.add_nodes_from(dict_attr.keys())
+        nx.set_node_attributes(graph, values=dict_attr, name="wordnum")
         # add edge to the graph
         for i, (node, is_valid) in enumerate(nodes):
             node_token = node.token
@@ -76,7 +164,8 @@ class PhraseExtractor(BaseExtractor):
                 neighbor_token = neighbor_node.token
                 distance = self.calculate_dependency_distance(node_token, neighbor_token, normalize)
                 if is_neighbor_valid and node != neighbor_node:
-                    self.graph.add_edge(node_stat(node_token), node_stat(neighbor_token), weight=distance)
+                    graph.add_edge(node_stat(node_token), node_stat(neighbor_token), weight=distance)
+        return graph
 
     def calculate_dependency_distance(self, token: Token, neighbor_token: Token, normalize: bool) -> int:
         if normalize:
@@ -85,11 +174,11 @@ class PhraseExtractor(BaseExtractor):
             distance = edit_distance(token.text, neighbor_token.text)
         return distance
 
-    def get_combined_keywords(self, doc: Doc, window, normalize):
+    def get_combined_keywords(self, doc: Doc, graph: Union[WordGraph, nx.Graph], window):
         phrases = []
-        for component in sorted(nx.connected_components(self.graph), key=len, reverse=True):
-            component_wordnum = sum([self.graph.nodes[node]["wordnum"] for node in component], [])
-            if len(component) > 1:
+        components = sorted(self.graph_components(graph), key=lambda component: component[0], reverse=True)
+        for component_size, component_wordnum in components:
+            if component_size > 1:
                 for pos_range in consecutive(sorted(component_wordnum), stepsize=window):
                     multigram = self.build_phrase(doc, min(pos_range), max(pos_range) + 1)
                     phrases.append(multigram)
@@ -104,6 +193,31 @@ class PhraseExtractor(BaseExtractor):
         )
         return filtered_phrases
 
+    @staticmethod
+    def graph_components(graph: Union[WordGraph, nx.Graph]) -> List[Tuple[int, List[int]]]:
+        """Size and token positions of each connected component of the word graph."""
+        if isinstance(graph, WordGraph):
+            wordnums = graph.wordnums
+            return [
+                (len(component), list(chain.from_iterable(wordnums[node] for node in component)))
+                for component in graph_components(graph)
+            ]
+        return [
+            (len(component), sum([graph.nodes[node]["wordnum"] for node in component], []))
+            for component in nx.connected_components(graph)
+        ]
+
+    @staticmethod
+    def node_positions(graph: Union[WordGraph, nx.Graph]) -> Iterator[Tuple[str, List[int]]]:
+        """Each graph word with the token positions it stands for."""
+        if isinstance(graph, WordGraph):
+            return zip(graph.keys, graph.wordnums)
+        return ((node, wordnums) for node, wordnums in graph.nodes(data="wordnum"))
+
+    @staticmethod
+    def number_of_nodes(graph: Union[WordGraph, nx.Graph]) -> int:
+        return graph.num_nodes if isinstance(graph, WordGraph) else graph.number_of_nodes()
+
     def candidate_filtering(
         self,
         candidates: Iterable[Phrase],
@@ -0,0 +1,126 @@
+# coding: utf-8
+"""TextRank word graph on SciPy sparse matrices: the same graph ``PhraseExtractor`` builds with networkx
+(nodes are the distinct words of valid tokens, undirected edges join valid tokens inside the dependency
+window, weighted by edit distance), but the candidate pairs are generated with numpy, edit distances are
+computed once per distinct word pair, and PageRank is a power iteration over a CSR matrix that follows
+``networkx.pagerank`` step for step (same dangling-node handling and ``N * tol`` stopping rule).
+"""
+from typing import Callable, Dict, List, NamedTuple, Tuple
+import numpy
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from common.types import Word
+
+
+def levenshtein(source: str, target: str) -> int:
+    """Levenshtein distance, equal to ``nltk.metrics.distance.edit_distance`` with its defaults
+    but with a two-row table."""
+    if len(source) < len(target):
+        source, target = target, source
+    previous = list(range(len(target) + 1))
+    for i, source_char in enumerate(source, 1):
+        current = [i]
+        for j, target_char in enumerate(target, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (source_char != target_char)))
+        previous = current
+    return previous[-1]
+
+
+class WordGraph(NamedTuple):
+    keys: List[str]  # node words, in order of first occurrence like the nodes of the networkx graph
+    wordnums: List[List[int]]  # token positions of each node
+    adjacency: sparse.csr_matrix  # symmetric edge weights
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.keys)
+
+
+def build_word_graph(
+    nodes: List[Tuple[Word, bool]], window: int, normalize: bool, distance: Callable[[str, str], float] = levenshtein
+) -> WordGraph:
+    """Build the word graph of ``nodes``, the ``(Word, is_valid)`` pairs of every token of a doc."""
+    node_stat = (lambda tok: tok.lemma_) if normalize else (lambda tok: tok.text)
+    num_tokens = len(nodes)
+    key_ids: Dict[str, int] = {}
+    keys: List[str] = []
+    wordnums: List[List[int]] = []
+    node_ids = numpy.full(num_tokens, -1, dtype=numpy.int64)
+    starts = numpy.zeros(num_tokens, dtype=numpy.int64)
+    ends = numpy.zeros(num_tokens, dtype=numpy.int64)
+    for i, (node, is_valid) in enumerate(nodes):
+        if not is_valid:
+            continue
+        token = node.token
+        key = node_stat(token)
+        node_id = key_ids.get(key)
+        if node_id is None:
+            node_id = key_ids[key] = len(keys)
+            keys.append(key)
+            wordnums.append([])
+        wordnums[node_id].append(node.wordnum)
+        node_ids[i] = node_id
+        # the window bounds of `PhraseExtractor.build_weighted_undirected_word_graph`, quirks included
+        starts[i] = max(abs(i - window), token.left_edge.i)
+        ends[i] = min(i + window, num_tokens, token.right_edge.i + 1)
+
+    num_nodes = len(keys)
+    valid = numpy.flatnonzero(node_ids >= 0)
+    lengths = numpy.clip(ends[valid] - starts[valid], 0, None)
+    sources = numpy.repeat(valid, lengths)
+    # position of every candidate neighbour: start of its window plus its rank inside the window
+    targets = numpy.repeat(starts[valid], lengths) + (
+        numpy.arange(lengths.sum()) - numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+    )
+    keep = (node_ids[targets] >= 0) & (targets != sources)
+    u, v = node_ids[sources[keep]], node_ids[targets[keep]]
+    # the weight only depends on the two words, so each distinct pair is scored once
+    pairs = numpy.unique(numpy.minimum(u, v) * num_nodes + numpy.maximum(u, v))
+    low, high = numpy.divmod(pairs, num_nodes) if num_nodes else (pairs, pairs)
+    weights = numpy.array([distance(keys[a], keys[b]) for a, b in zip(low, high)], dtype=numpy.float64)
+    off_diagonal = low != high
+    adjacency = sparse.csr_matrix(
+        (
+            numpy.concatenate([weights, weights[off_diagonal]]),
+            (numpy.concatenate([low, high[off_diagonal]]), numpy.concatenate([high, low[off_diagonal]])),
+        ),
+        shape=(num_nodes, num_nodes),
+    )
+    return WordGraph(keys, wordnums, adjacency)
+
+
+def pagerank(
+    adjacency: sparse.spmatrix, alpha: float = 0.85, tol: float = 1.0e-4, max_iter: int = 100
+) -> numpy.ndarray:
+    """PageRank scores of a symmetric weighted adjacency matrix, computed as ``networkx.pagerank`` does:
+    rows are normalized to transition probabilities, the mass of nodes without edge weight is spread
+    uniformly, and iteration stops once the L1 change is below ``N * tol``."""
+    num_nodes = adjacency.shape[0]
+    if num_nodes == 0:
+        return numpy.zeros(0)
+    out_weight = numpy.asarray(adjacency.sum(axis=1)).ravel()
+    is_dangling = out_weight == 0
+    inverse = numpy.zeros(num_nodes)
+    inverse[~is_dangling] = 1.0 / out_weight[~is_dangling]
+    # the operations and their order are those of networkx, so scores agree to the last bit and ties
+    # between words rank the same way
+    transition = sparse.diags(inverse).tocsr() @ adjacency
+    uniform = numpy.full(num_nodes, 1.0 / num_nodes)
+    dangling = numpy.flatnonzero(is_dangling)
+    x = uniform
+    for _ in range(max_iter):
+        last = x
+        x = alpha * (last @ transition + sum(last[dangling]) * uniform) + (1 - alpha) * uniform
+        if numpy.absolute(x - last).sum() < num_nodes * tol:
+            return x
+    raise RuntimeError(f"pagerank failed to converge within {max_iter} iterations")
+
+
+def graph_components(graph: WordGraph) -> List[List[int]]:
+    """Node ids of each connected component, ordered like ``networkx.connected_components``
+    (by the first node of each component)."""
+    num_components, labels = connected_components(graph.adjacency, directed=False)
+    components: List[List[int]] = [[] for _ in range(num_components)]
+    for node_id, label in enumerate(labels):
+        components[label].append(node_id)
+    return components
@@ -1,6 +1,15 @@
 # further analysis, look int the following two repo
 # https://github.com/mmxgn/clausiepy/blob/master/clausiepy/clausiepy.py
 # https://github.com/NSchrading/intro-spacy-nlp/blob/master/subject_object_extraction.py
+from typing import Iterable, Iterator, List
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+import threading
+from spacy.strings import hash_string
+from common.types import ClauseRecord
+from nlp_utils.doc_cache import check_doc_cache, parse_text, pipe_texts
+from nlp_utils.spacy_utils import resolve_spacy_model
+
 LIST_COPULAR_VERB = [
     "act",
     "appear",
@@ -58,6 +67,7 @@ LIST_COMPLEX_TRANSITIVE = [
 ]
 LIST_APPOS = [
     "is",
+    "are",
     "his",
     "he",
     "has",
@@ -75,6 +85,45 @@ LIST_APPOS = [
     "they",
 ]
 
+VERBAL_POS = ("VERB", "AUX")
+# clause types whose adverbials are optional (A?)
+OPTIONAL_ADVERBIAL_TYPES = ("SVC", "SVOO", "SVOC", "SV", "SVO")
+
+# the verb lists as lemma hashes, compared against `Token.lemma` without going through the string store
+NON_EXT_COPULAR_LEMMAS = frozenset(hash_string(verb) for verb in ["die", "walk"])
+COPULAR_VERB_LEMMAS = frozenset(hash_string(verb) for verb in LIST_COPULAR_VERB)
+COMPLEX_TRANSITIVE_LEMMAS = frozenset(hash_string(verb) for verb in LIST_COMPLEX_TRANSITIVE)
+# distinct verb texts remembered per pipeline when a Doc comes without lemmas
+LEMMA_CACHE_SIZE = 4096
+
+# pipeline -> {verb text: lemma hash}; weakly keyed, so `SPACY_MODELS.evict` can still free a model
+_LEMMA_CACHES: "WeakKeyDictionary[object, OrderedDict]" = WeakKeyDictionary()
+_LEMMA_CACHE_LOCK = threading.Lock()
+
+
+def _lookup_lemma(nlp, text):
+    with _LEMMA_CACHE_LOCK:
+        cache = _LEMMA_CACHES.setdefault(nlp, OrderedDict())
+        lemma = cache.get(text)
+        if lemma is not None:
+            cache.move_to_end(text)
+            return lemma
+    # parsed outside the lock; two threads may parse the same text once each
+    lemma = hash_string(nlp(text)[0].lemma_)
+    with _LEMMA_CACHE_LOCK:
+        cache[text] = lemma
+        while len(cache) > LEMMA_CACHE_SIZE:
+            cache.popitem(last=False)
+    return lemma
+
+
+def verb_lemma(nlp, verb):
+    """Lemma hash of ``verb``: the one the pipeline assigned in its Doc, or, for a Doc parsed without a
+    lemmatizer, the lemma of the verb text on its own from a bounded cache."""
+    if verb.doc.has_annotation("LEMMA"):
+        return verb.lemma
+    return _lookup_lemma(nlp, verb.text)
+
 
 def tokenizer_appos_modifiers(nlp):
     dict_appos_mapping = {}
@@ -118,7 +167,7 @@ def has_candidate_adverbial(clause):
 
 def has_known_non_ext_copular(nlp, clause):
     for verb in clause["V"]:
-        if nlp(verb.text)[0].lemma_ in ["die", "walk"]:
+        if verb_lemma(nlp, verb) in NON_EXT_COPULAR_LEMMAS:
             return True
     else:
         return False
@@ -126,7 +175,7 @@ def has_known_non_ext_copular(nlp, clause):
 
 def has_known_ext_copular(nlp, clause):
     for verb in clause["V"]:
-        if nlp(verb.text)[0].lemma_ in LIST_COPULAR_VERB:
+        if verb_lemma(nlp, verb) in COPULAR_VERB_LEMMAS:
             return True
     else:
         return False
@@ -138,7 +187,7 @@ def is_known_copular(verb):
 
 def has_potentially_complex_transitive(nlp, clause):
     for verb in clause["V"]:
-        if nlp(verb.text)[0].lemma_ in LIST_COMPLEX_TRANSITIVE:
+        if verb_lemma(nlp, verb) in COMPLEX_TRANSITIVE_LEMMAS:
             return True
     else:
         return False
@@ -147,12 +196,20 @@ def has_potentially_complex_transitive(nlp, clause):
 class SentComponents(object):
     name = "sentence_decomposer"
 
-    def __init__(self, nlp, appos_mapping, conservative=True):
+    def __init__(self, nlp, appos_mapping=None, conservative=True, doc_cache=None):
         # maybe we want to pass in the merged doc after entity recognizer as well
-        self.nlp = nlp
-        self.appos_mapping = appos_mapping
+        self.nlp = resolve_spacy_model(nlp)
+        self.doc_cache = check_doc_cache(self.nlp, doc_cache)
+        self.appos_mapping = appos_mapping if appos_mapping is not None else tokenizer_appos_modifiers(self.nlp)
         self.being_conservative = conservative
 
+    def synthetic_token(self, word):
+        """Token of ``word`` parsed on its own, taken from the appos mapping (parsed once if it is missing)."""
+        token = self.appos_mapping.get(word)
+        if token is None:
+            token = self.appos_mapping[word] = self.nlp(word)[0]
+        return token
+
     def get_token_span(self, doc, token):
         return doc[token.left_edge.i : token.right_edge.i + 1]
 
@@ -212,7 +269,11 @@ class SentComponents(object):
 
     def clause_token(self, token, clause):
 
-        if token.dep_ in ["nsubj", "nsubjpass", "attr"]:
+        if token.dep_ == "ROOT" and token.pos_ not in VERBAL_POS:
+            # A sentence without a verb reads as "There is <sentence>": its root is the attribute of a synthetic "is"
+            clause["S"].append(token)
+            clause["V"].append(self.synthetic_token("is"))
+        elif token.dep_ in ["nsubj", "nsubjpass", "attr"]:
             clause["S"].append(token)
             clause["V"].append(token.head)
             self.process_dependants(token, clause)
@@ -227,43 +288,40 @@ class SentComponents(object):
         elif token.dep_ in ["appos"]:
             # Subjects without a verb E.g. Sam is my brother in: Sam, my brother.
             clause["S"].append(token.head)
-            clause["V"].append(self.appos_mapping["is"])
+            clause["V"].append(self.synthetic_token("is"))
             clause["C"].append(token)
         elif token.dep_ in ["poss"]:
             # Subjects declaring possesion e.g. my brother: in: Sam, my brother.
-            # !!! Next step is to move the Tokenization of the dictionary key words out of class
-            # Because it's costly to repeat the calling of spacy pipeline for Tokenization
             if token.text.lower() == "his":
-                clause["S"].append(self.appos_mapping["he"])
-                clause["V"].append(self.appos_mapping["has"])
+                clause["S"].append(self.synthetic_token("he"))
+                clause["V"].append(self.synthetic_token("has"))
             elif token.text.lower() == "her":
-                clause["S"].append(self.appos_mapping["she"])
-                clause["V"].append(self.appos_mapping["has"])
+                clause["S"].append(self.synthetic_token("she"))
+                clause["V"].append(self.synthetic_token("has"))
             elif token.text.lower() == "my":
-                clause["S"].append(self.appos_mapping["I"])
-                clause["V"].append(self.appos_mapping["have"])
+                clause["S"].append(self.synthetic_token("I"))
+                clause["V"].append(self.synthetic_token("have"))
             elif token.text.lower() == "its":
-                clause["S"].append(self.appos_mapping["it"])
-                clause["V"].append(self.appos_mapping["has"])
+                clause["S"].append(self.synthetic_token("it"))
+                clause["V"].append(self.synthetic_token("has"))
             elif token.text.lower() == "our":
-                clause["S"].append(self.appos_mapping["we"])
-                clause["V"].append(self.appos_mapping["have"])
+                clause["S"].append(self.synthetic_token("we"))
+                clause["V"].append(self.synthetic_token("have"))
             elif token.text.lower() == "your":
-                clause["S"].append(self.appos_mapping["you"])
-                clause["V"].append(self.appos_mapping["have"])
+                clause["S"].append(self.synthetic_token("you"))
+                clause["V"].append(self.synthetic_token("have"))
             elif token.text.lower() == "their":
-                clause["S"].append(self.appos_mapping["they"])
-                clause["V"].append(self.appos_mapping["have"])
+                clause["S"].append(self.synthetic_token("they"))
+                clause["V"].append(self.synthetic_token("have"))
             else:
                 clause["S"].append(token)
-                clause["V"].append(self.appos_mapping["has"])
+                clause["V"].append(self.synthetic_token("has"))
             clause["O"].append(token.head)
         elif token.dep_ in ["acl"]:
-            # Create a synthetic from participial modifiers (partmod).
+            # Create a synthetic from participial modifiers (partmod): the participle is the verb,
+            # a synthetic "are" stands in for a modifier without one.
             clause["S"].append(token.head)
-            new_sent = self.nlp("are {}".format(" ".join([t.text for t in token.subtree])))
-            r = [t for t in new_sent if t.dep_ == "ROOT"][0]
-            clause["V"].append(r)
+            clause["V"].append(token if token.pos_ in VERBAL_POS else self.synthetic_token("are"))
             self.process_dependants(token, clause)
         return clause
 
@@ -314,27 +372,51 @@ class SentComponents(object):
                                 type_ = "SVO"
         return type_
 
-    def decompose_clause(self, doc):
+    def doc_clauses(self, doc):
+        """Typed clauses of a parsed ``doc``, as dicts of tokens keyed by component."""
         clauses = []
-        # Check if root is not a verb
-        print([t for t in doc if t.dep_ == "ROOT"])
-        root = [t for t in doc if t.dep_ == "ROOT"][0]
-        if root.pos_ != "VERB":
-            doc = self.nlp("There is " + doc.text)
-
         clause = self.empty_clause()
-        # Subjects of a verb
         for token in doc:
             clause_tokens = self.clause_token(token, clause)
             clause = self.translate_clause(clause_tokens)
-            if any([len(clause[comp_type]) > 0 for comp_type in self.empty_clause()]):
+            if any(len(clause[comp_type]) > 0 for comp_type in clause):
                 clauses.append(clause)
                 clause = self.empty_clause()
         # Identify clause types
         for clause in clauses:
             clause_type = self.define_clause_type(clause)
             clause["type"] = clause_type
-            if clause_type in ["SVC", "SVOO", "SVOC", "SV", "SVO"]:
+            if clause_type in OPTIONAL_ADVERBIAL_TYPES:
                 clause["A?"] = clause["A"]
                 clause.pop("A", None)
         return clauses
+
+    def decompose_clause(self, doc):
+        if isinstance(doc, str):
+            doc = parse_text(self.nlp, doc, self.doc_cache)
+        return self.doc_clauses(doc)
+
+    def decompose_many(
+        self, texts: Iterable[str], batch_size: int = 1000, n_process: int = 1
+    ) -> Iterator[List[ClauseRecord]]:
+        """Lazily yield the clauses of each of ``texts``, in order, parsed in batches with ``nlp.pipe``."""
+        for doc in pipe_texts(self.nlp, texts, batch_size, n_process, self.doc_cache):
+            yield [clause_record(clause) for clause in self.doc_clauses(doc)]
+
+
+def clause_record(clause) -> ClauseRecord:
+    """Compact, picklable form of a typed clause dict: the texts of its tokens."""
+
+    def texts(tokens):
+        return tuple(token.text for token in tokens)
+
+    return ClauseRecord(
+        clause["type"],
+        texts(clause["S"]),
+        texts(clause["V"]),
+        texts(clause["O"]),
+        texts(clause["IO"]),
+        texts(clause["XCOMP"]),
+        texts(clause["C"]),
+        texts(clause["A?"] if "A?" in clause else clause["A"]),
+    )
@@ -0,0 +1,192 @@
+# coding: utf-8
+"""Content-addressed cache of parsed spaCy ``Doc`` objects, so every extractor in a pipeline run
+works on the same parse instead of running the model again.
+
+Docs are keyed by a sha1 over the pipeline identity (language, model name and version, spaCy version,
+enabled components) and the text; a model upgrade or a newly added component therefore never serves
+a stale parse. Recent docs live in an in-memory LRU tier; with a `directory`, every parse is also
+written there as `DocBin` bytes and survives the process.
+Examples
+---------
+>>> import spacy
+>>> nlp = spacy.blank("en")
+>>> doc_cache = DocCache(nlp, maxsize=2)
+>>> doc_cache("Parse me once.") is doc_cache("Parse me once.")
+True
+>>> doc_cache.stats
+DocCacheStats(memory_hits=1, disk_hits=0, misses=1, size=1)
+"""
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
+from collections import OrderedDict
+import hashlib
+import os
+import tempfile
+import threading
+import spacy
+from spacy.language import Language
+from spacy.tokens import Doc, DocBin
+from utils.parallel import chunked
+
+
+class DocCacheStats(NamedTuple):
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    size: int
+
+
+class DocCache:
+    """Parse texts with ``nlp`` at most once. Cached docs are shared between callers and must be
+    treated as read-only. The in-memory tier and the counters are guarded by a lock, so one cache can be
+    used from several threads; a text requested by two threads at once may be parsed twice."""
+
+    def __init__(self, nlp: Language, maxsize: int = 1024, directory: Optional[Union[str, os.PathLike]] = None):
+        self.nlp = nlp
+        self.maxsize = maxsize
+        self.directory = directory
+        self._docs: "OrderedDict[str, Doc]" = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __getstate__(self) -> dict:
+        # a copy sent to a worker process starts with an empty memory tier (still sharing `directory`)
+        # and a lock of its own; locks can't be pickled
+        state = self.__dict__.copy()
+        state["_docs"] = OrderedDict()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _pipeline_id(self) -> str:
+        meta = self.nlp.meta
+        # pipe_names is read on every call: adding a component (e.g. an entity ruler) changes the parse
+        return "|".join(
+            [meta.get("lang", ""), meta.get("name", ""), meta.get("version", ""), spacy.__version__]
+            + self.nlp.pipe_names
+        )
+
+    def key(self, text: str) -> str:
+        digest = hashlib.sha1(self._pipeline_id().encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".spacy")
+
+    def _remember(self, key: str, doc: Doc) -> None:
+        with self._lock:
+            self._docs[key] = doc
+            self._docs.move_to_end(key)
+            while len(self._docs) > self.maxsize:
+                self._docs.popitem(last=False)
+
+    def _count_misses(self, count: int) -> None:
+        with self._lock:
+            self.misses += count
+
+    def _lookup(self, key: str) -> Optional[Doc]:
+        with self._lock:
+            doc = self._docs.get(key)
+            if doc is not None:
+                self._docs.move_to_end(key)
+                self.memory_hits += 1
+                return doc
+        if self.directory is not None:
+            path = self._path(key)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    doc = next(DocBin(store_user_data=True).from_bytes(f.read()).get_docs(self.nlp.vocab))
+                self._remember(key, doc)
+                with self._lock:
+                    self.disk_hits += 1
+                return doc
+        return None
+
+    def _store(self, key: str, doc: Doc) -> None:
+        self._remember(key, doc)
+        if self.directory is not None:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            doc_bin = DocBin(store_user_data=True)
+            doc_bin.add(doc)
+            # write to a file of our own then rename, so a concurrent reader never sees a partial file
+            # and concurrent writers of the same key never share a temporary file
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+                f.write(doc_bin.to_bytes())
+            os.replace(f.name, path)
+
+    def get(self, text: str) -> Optional[Doc]:
+        """Return the cached doc for ``text`` without parsing it, or None."""
+        return self._lookup(self.key(text))
+
+    def __call__(self, text: str) -> Doc:
+        key = self.key(text)
+        doc = self._lookup(key)
+        if doc is None:
+            self._count_misses(1)
+            doc = self.nlp(text)
+            self._store(key, doc)
+        return doc
+
+    def pipe(self, texts: Iterable[str], batch_size: int = 1000, n_process: int = 1) -> Iterator[Doc]:
+        """Yield docs for ``texts`` in order; the misses of each batch are parsed together with ``nlp.pipe``."""
+        for batch in chunked(texts, batch_size):
+            keys = [self.key(text) for text in batch]
+            docs: List[Optional[Doc]] = [self._lookup(key) for key in keys]
+            missing = {}
+            for i, doc in enumerate(docs):
+                if doc is None:
+                    # repeated texts within a batch are parsed once
+                    missing.setdefault(keys[i], batch[i])
+            if missing:
+                self._count_misses(len(missing))
+                parsed = self.nlp.pipe(list(missing.values()), batch_size=batch_size, n_process=n_process)
+                for key, doc in zip(list(missing), parsed):
+                    self._store(key, doc)
+                    missing[key] = doc
+                docs = [doc if doc is not None else missing[key] for key, doc in zip(keys, docs)]
+            yield from docs
+
+    def clear(self) -> None:
+        """Empty the in-memory tier; files on disk are kept."""
+        with self._lock:
+            self._docs.clear()
+
+    @property
+    def stats(self) -> DocCacheStats:
+        with self._lock:
+            return DocCacheStats(self.memory_hits, self.disk_hits, self.misses, len(self._docs))
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+
+def parse_text(nlp: Language, text: str, doc_cache: Optional[DocCache] = None) -> Doc:
+    """Parse ``text`` through ``doc_cache`` when one is given, otherwise with ``nlp`` directly."""
+    if doc_cache is None:
+        return nlp(text)
+    return doc_cache(text)
+
+
+def pipe_texts(
+    nlp: Language, texts: Iterable[str], batch_size: int = 1000, n_process: int = 1, doc_cache: Optional[DocCache] = None
+) -> Iterator[Doc]:
+    """Batched counterpart of ``parse_text``: stream docs for ``texts`` in order through ``nlp.pipe``."""
+    if doc_cache is None:
+        return nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+    return doc_cache.pipe(texts, batch_size=batch_size, n_process=n_process)
+
+
+def check_doc_cache(nlp: Language, doc_cache: Optional[DocCache]) -> Optional[DocCache]:
+    """Validate a ``doc_cache`` handed to a component using ``nlp``: its docs must come from the same pipeline."""
+    if doc_cache is not None and doc_cache.nlp is not nlp:
+        raise ValueError("doc_cache was built for a different spaCy pipeline than the component's nlp")
+    return doc_cache
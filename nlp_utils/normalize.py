@@ -1,8 +1,13 @@
 # coding: utf-8
 from __future__ import unicode_literals
-from typing import Union, List, Iterable
+from typing import Union, List, Iterable, Iterator, Dict, Tuple, Callable, Optional, Pattern
+from dataclasses import dataclass
+from itertools import accumulate, chain, islice
+import logging
 import re
+import string
 import unicodedata
+import numpy
 from nlp_utils.contractions import CONTRACTION_MAP
 from nlp_utils.regex import (
     ENGLISH_PUNCTUATIONS,
@@ -10,7 +15,16 @@ from nlp_utils.regex import (
     REGEX_CONSECUTIVE_PUNCTUATION,
     REGEX_NEWLINE,
     REGEX_NONBREAKING_SPACE,
+    REGEX_STOCK_TICKER,
+    REGEX_RETWEET_PREFIX,
+    REGEX_HYPERLINK,
+    REGEX_HASHTAG_SIGN,
+    REGEX_MULTIPLE_SPACES_BYTES,
+    scoped_source,
 )
+from utils.parallel import ThroughputMeter, chunked, imap_ordered, resolve_n_jobs
+
+logger = logging.getLogger(__name__)
 
 
 def remove_consecutive_spaces(text: str) -> str:
@@ -41,8 +55,7 @@ def remove_recurring_chars(text):
 
 def remove_nonascii_chars(text: str) -> str:
     """Return string with NonAscii characters removed."""
-    letters = [l if ord(l) < 128 else " " for l in text]
-    return "".join(letters).strip()
+    return text.translate(_NONASCII_TABLE).strip()
 
 
 def remove_stopwords_from_text(text: str, tokenizer: callable, stopwords: Iterable[str], check_lower_case=False):
@@ -68,14 +81,13 @@ def normalize_arabic(text: str) -> str:
 
 
 def normalize_unicode_to_ascii(text: str) -> str:
-    normal = unicodedata.normalize("NFKD", data).encode("ASCII", "ignore")
-    val = normal.decode("utf-8")
-    val = val.lower()
-    # remove special characters
-    val = re.sub("[^A-Za-z0-9 ]+", " ", val)
-    # remove multiple spaces
-    val = re.sub(" +", " ", val)
-    return val
+    """Fold text to lowercase ASCII: decompose accents (NFKD), drop what has no ASCII form, replace
+    anything but letters, digits and spaces with a space, and compress repeated spaces."""
+    # NFKD leaves pure ASCII text unchanged, so skip it for the common case
+    normal = text if text.isascii() else unicodedata.normalize("NFKD", text)
+    # lowercase and special characters to space in one bytes.translate, then remove multiple spaces
+    val = normal.encode("ASCII", "ignore").translate(_ASCII_FOLD_TABLE)
+    return REGEX_MULTIPLE_SPACES_BYTES.sub(b" ", val).decode("ascii")
 
 
 def normalize_hyphenated_words(text: str, keep_hyphen: bool = True):
@@ -86,26 +98,92 @@ def normalize_hyphenated_words(text: str, keep_hyphen: bool = True):
         return REGEX_HYPHENATED_WORD.sub(r"\1\2", text)
 
 
+def _build_trie_pattern(words: Iterable[str]) -> str:
+    """Build a regex alternation from a character trie of `words`, so that the
+    engine follows a single branch per character and always prefers the longest key."""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def _node_to_regex(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + _node_to_regex(child) for char, child in node.items() if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:{})".format("|".join(branches))
+        if "" in node:
+            # a key ends here, but keep trying to extend the match first (greedy optional)
+            pattern = "(?:{})?".format(pattern)
+        return pattern
+
+    return _node_to_regex(trie)
+
+
+class ContractionExpander:
+    """Expand contractions with a pattern compiled once from a contraction mapping.
+    Keys are matched case-insensitively through a trie-shaped regex, so overlapping
+    contractions resolve to the longest form, e.g. `can't've` rather than `can't`.
+
+    >>> expander = ContractionExpander()
+    >>> expander.expand("He hasn't done it, can't've known")
+    'He has not done it, cannot have known'
+    """
+
+    def __init__(self, contraction_mapping: Dict[str, str] = CONTRACTION_MAP):
+        self._mapping = contraction_mapping
+        self._lower_mapping: Dict[str, str] = {}
+        for contraction, expansion in contraction_mapping.items():
+            self._lower_mapping.setdefault(contraction.lower(), expansion)
+        self._pattern = re.compile(_build_trie_pattern(self._lower_mapping), flags=re.IGNORECASE | re.DOTALL)
+
+    def _expand_match(self, match) -> str:
+        contraction = match.group(0)
+        expansion = self._mapping.get(contraction) or self._lower_mapping[contraction.lower()]
+        return contraction[0] + expansion[1:]
+
+    def expand(self, text: str) -> str:
+        return self._pattern.sub(self._expand_match, text).replace("'", "")
+
+    def expand_batch(self, texts: Iterable[str]) -> List[str]:
+        expand = self.expand
+        return [expand(text) for text in texts]
+
+
+_CONTRACTION_EXPANDERS: Dict[int, Tuple[Dict[str, str], ContractionExpander]] = {}
+_MAX_CACHED_EXPANDERS = 32
+
+
+def get_contraction_expander(contraction_mapping: Dict[str, str] = CONTRACTION_MAP) -> ContractionExpander:
+    """Return the `ContractionExpander` cached for this mapping object. The mapping is
+    keyed by identity, so it should not be mutated once an expander has been built from it."""
+    cached = _CONTRACTION_EXPANDERS.get(id(contraction_mapping))
+    if cached is None or cached[0] is not contraction_mapping:
+        if len(_CONTRACTION_EXPANDERS) >= _MAX_CACHED_EXPANDERS:
+            _CONTRACTION_EXPANDERS.pop(next(iter(_CONTRACTION_EXPANDERS)))
+        cached = (contraction_mapping, ContractionExpander(contraction_mapping))
+        _CONTRACTION_EXPANDERS[id(contraction_mapping)] = cached
+    return cached[1]
+
+
 def expand_contractions(text: str, contraction_mapping=CONTRACTION_MAP) -> str:
     """Expand constraction expression in sentence to multigrams, to better
     catch the meaning before tokenziation.
     e.g. `hasn't` to `has not` to realize the negation signal."""
-    contractions_pattern = re.compile(
-        "({})".format("|".join(contraction_mapping.keys())), flags=re.IGNORECASE | re.DOTALL
-    )
+    return get_contraction_expander(contraction_mapping).expand(text)
 
-    def _expand_match(contraction):
-        match = contraction.group(0)
-        first_char = match[0]
-        expanded_contraction = (
-            contraction_mapping.get(match) if contraction_mapping.get(match) else contraction_mapping.get(match.lower())
-        )
-        expanded_contraction = first_char + expanded_contraction[1:]
-        return expanded_contraction
 
-    expanded_text = contractions_pattern.sub(_expand_match, text)
-    expanded_text = re.sub("'", "", expanded_text)
-    return expanded_text
+TWEET_RULES = (
+    # remove stock market tickers like $GE
+    (REGEX_STOCK_TICKER, ""),
+    # remove old style retweet text "RT"
+    (REGEX_RETWEET_PREFIX, ""),
+    # remove hyperlinks
+    (REGEX_HYPERLINK, ""),
+    # remove hashtags, only removing the hash # sign from the word
+    (REGEX_HASHTAG_SIGN, ""),
+)
 
 
 def process_tweet(tweet: str) -> str:
@@ -116,13 +194,314 @@ def process_tweet(tweet: str) -> str:
         tweets_clean: a list of words containing the processed tweet
     
     """
-    # remove stock market tickers like $GE
-    tweet = re.sub(r"\$\w*", "", tweet)
-    # remove old style retweet text "RT"
-    tweet = re.sub(r"^RT[\s]+", "", tweet)
-    # remove hyperlinks
-    tweet = re.sub(r"https?:\/\/.*[\r\n]*", "", tweet)
-    # remove hashtags
-    # only removing the hash # sign from the word
-    tweet = re.sub(r"#", "", tweet)
+    for pattern, replacement in TWEET_RULES:
+        tweet = pattern.sub(replacement, tweet)
     return tweet
+
+
+class TranslationTable(dict):
+    """A `str.translate` table which resolves characters missing from `mapping` through
+    `default(ordinal)` and memoizes the answer, so open-ended classes such as "any non-ASCII
+    character" can be expressed as a table. Without `default`, missing characters are kept."""
+
+    def __init__(self, mapping: Optional[Dict] = None, default: Optional[Callable[[int], Optional[str]]] = None):
+        super().__init__(str.maketrans(mapping) if mapping else {})
+        self._default = default
+
+    def __missing__(self, ordinal: int) -> Optional[str]:
+        value = chr(ordinal) if self._default is None else self._default(ordinal)
+        self[ordinal] = value
+        return value
+
+    def then(self, other: "TranslationTable") -> "TranslationTable":
+        """Return a single table equivalent to translating with `self` and then with `other`."""
+
+        def _compose(ordinal: int) -> Optional[str]:
+            value = self[ordinal]
+            if value is None:
+                return None
+            return (chr(value) if isinstance(value, int) else value).translate(other)
+
+        return TranslationTable(default=_compose)
+
+
+@dataclass(frozen=True)
+class NormalizeStep:
+    """One step of a `Normalizer`. Exactly one of `rules` (regex substitutions applied in order),
+    `table` (a translation table) or `func` is set. `strip` strips the result of the step.
+    `fusable` marks regex steps whose rules can share a single alternation scan without changing the
+    output of the sequential substitutions, i.e. no substitution can create or hide a later match."""
+
+    name: str
+    rules: Tuple[Tuple[Pattern, str], ...] = ()
+    table: Optional[TranslationTable] = None
+    func: Optional[Callable[[str], str]] = None
+    strip: bool = False
+    fusable: bool = False
+
+
+def _whitespace_deletion(ordinal: int) -> Optional[str]:
+    char = chr(ordinal)
+    return None if char.isspace() else char
+
+
+def _nonascii_to_space(ordinal: int) -> str:
+    return chr(ordinal) if ordinal < 128 else " "
+
+
+_NONASCII_TABLE = TranslationTable(default=_nonascii_to_space)
+
+
+def _hyphenated_words_step(keep_hyphen: bool = True) -> NormalizeStep:
+    if keep_hyphen:
+        # joining the stripped pieces of `split_and_keep_punctuation` drops exactly the whitespace characters
+        return NormalizeStep("normalize_hyphenated_words", table=TranslationTable(default=_whitespace_deletion))
+    return NormalizeStep("normalize_hyphenated_words", rules=((REGEX_HYPHENATED_WORD, r"\1\2"),))
+
+
+NORMALIZE_STEPS: Dict[str, Callable[..., NormalizeStep]] = {
+    "remove_consecutive_spaces": lambda: NormalizeStep(
+        "remove_consecutive_spaces",
+        rules=((REGEX_NEWLINE, "\n"), (REGEX_NONBREAKING_SPACE, " ")),
+        strip=True,
+        fusable=True,
+    ),
+    "remove_punctuations": lambda punctuations=ENGLISH_PUNCTUATIONS: NormalizeStep(
+        "remove_punctuations", table=TranslationTable(dict.fromkeys(punctuations))
+    ),
+    "remove_consecutive_punctuation": lambda: NormalizeStep(
+        "remove_consecutive_punctuation", rules=((REGEX_CONSECUTIVE_PUNCTUATION, ""),), fusable=True
+    ),
+    "normalize_hyphenated_words": _hyphenated_words_step,
+    "remove_nonascii_chars": lambda: NormalizeStep(
+        "remove_nonascii_chars", table=TranslationTable(default=_nonascii_to_space), strip=True
+    ),
+    "process_tweet": lambda: NormalizeStep("process_tweet", rules=TWEET_RULES),
+    "remove_recurring_chars": lambda: NormalizeStep("remove_recurring_chars", func=remove_recurring_chars),
+    "normalize_arabic": lambda: NormalizeStep("normalize_arabic", func=normalize_arabic),
+    "expand_contractions": lambda: NormalizeStep("expand_contractions", func=expand_contractions),
+}
+
+StepConfig = Union[str, Tuple[str, Dict], NormalizeStep, Callable[[str], str]]
+
+_REGEX_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def resolve_step(step: StepConfig) -> NormalizeStep:
+    """Build a `NormalizeStep` from a registered step name, a `(name, kwargs)` pair, or a plain callable."""
+    if isinstance(step, NormalizeStep):
+        return step
+    if isinstance(step, str):
+        step = (step, {})
+    if isinstance(step, (tuple, list)):
+        name, kwargs = step
+        if name not in NORMALIZE_STEPS:
+            raise ValueError(f"Unknown normalize step: {name}; expected one of {sorted(NORMALIZE_STEPS)}")
+        return NORMALIZE_STEPS[name](**kwargs)
+    if callable(step):
+        return NormalizeStep(getattr(step, "__name__", repr(step)), func=step)
+    raise TypeError(f"step={step} is invalid; expected a step name, (name, kwargs), NormalizeStep or callable")
+
+
+def _is_fusable_rule(pattern: Pattern, replacement: str) -> bool:
+    return (
+        isinstance(replacement, str)
+        and "\\" not in replacement
+        and not _REGEX_BACKREFERENCE.search(pattern.pattern)
+    )
+
+
+def _compile_regex_pass(rules: List[Tuple[Pattern, str]], fuse: bool) -> Callable[[str], str]:
+    if len(rules) == 1:
+        pattern, replacement = rules[0]
+        return lambda text: pattern.sub(replacement, text)
+    if not fuse or not all(_is_fusable_rule(pattern, replacement) for pattern, replacement in rules):
+
+        def _sequential(text: str) -> str:
+            for pattern, replacement in rules:
+                text = pattern.sub(replacement, text)
+            return text
+
+        return _sequential
+    # every rule is wrapped in its own outermost named group, which is therefore the `lastgroup` of a match
+    combined = re.compile(
+        "|".join(f"(?P<_rule{i}>{scoped_source(p.pattern, p.flags)})" for i, (p, _) in enumerate(rules))
+    )
+    replacements = {f"_rule{i}": replacement for i, (_, replacement) in enumerate(rules)}
+    return lambda text: combined.sub(lambda match: replacements[match.lastgroup], text)
+
+
+def _translate_pass(table: TranslationTable) -> Callable[[str], str]:
+    return lambda text: text.translate(table)
+
+
+def _with_strip(func: Callable[[str], str], strip: bool) -> Callable[[str], str]:
+    return (lambda text: func(text).strip()) if strip else func
+
+
+class Normalizer:
+    """Run a declarative chain of normalization steps in as few passes over the text as possible,
+    with the same output as calling the step functions one by one.
+
+    Adjacent translate steps are folded into one translation table, and the rules of a fusable
+    regex step are merged into one alternation scanned once. Regex steps are not merged with each
+    other: a deletion made by one step can join text into a new match for the next one, e.g.
+    removing `...` before `process_tweet` looks for hyperlinks. A stripping step closes the current
+    translation table, since stripping in between can change what later steps see at the edges.
+
+    >>> normalizer = Normalizer(["remove_consecutive_spaces", "remove_punctuations", "remove_nonascii_chars"])
+    >>> normalizer.normalize("Café  au lait, s'il vous plaît!")
+    'Caf  au lait sil vous pla t'
+    >>> normalizer.num_passes
+    2
+    """
+
+    def __init__(self, steps: Iterable[StepConfig]):
+        self.steps = [resolve_step(step) for step in steps]
+        self._passes = self._plan_passes(self.steps)
+
+    @property
+    def num_passes(self) -> int:
+        return len(self._passes)
+
+    @staticmethod
+    def _plan_passes(steps: List[NormalizeStep]) -> List[Callable[[str], str]]:
+        passes: List[Callable[[str], str]] = []
+        table: Optional[TranslationTable] = None
+        for step in steps:
+            if step.table is not None:
+                table = step.table if table is None else table.then(step.table)
+                if step.strip:
+                    passes.append(_with_strip(_translate_pass(table), strip=True))
+                    table = None
+                continue
+            if table is not None:
+                passes.append(_translate_pass(table))
+                table = None
+            func = step.func if step.func is not None else _compile_regex_pass(list(step.rules), step.fusable)
+            passes.append(_with_strip(func, step.strip))
+        if table is not None:
+            passes.append(_translate_pass(table))
+        return passes
+
+    def normalize(self, text: str) -> str:
+        for apply in self._passes:
+            text = apply(text)
+        return text
+
+    def normalize_iter(self, texts: Iterable[str]) -> Iterator[str]:
+        normalize = self.normalize
+        for text in texts:
+            yield normalize(text)
+
+
+
+_WORKER_NORMALIZER: Optional[Normalizer] = None
+
+
+def _init_normalize_worker(steps: List[StepConfig]):
+    global _WORKER_NORMALIZER
+    _WORKER_NORMALIZER = Normalizer(steps)
+
+
+def _normalize_chunk(texts: List[str]) -> List[str]:
+    return [_WORKER_NORMALIZER.normalize(text) for text in texts]
+
+
+def normalize_corpus(
+    texts: Iterable[str],
+    steps: Iterable[StepConfig],
+    n_jobs: Optional[int] = None,
+    chunksize: int = 1000,
+    meter: Optional[ThroughputMeter] = None,
+) -> Iterator[str]:
+    """Normalize a corpus with a process pool, yielding the results in input order.
+
+    Args:
+        texts (Iterable[str]): any iterable of documents, e.g. a list, a generator or an open file.
+        steps (Iterable[StepConfig]): the `Normalizer` steps; they must be picklable (names or
+            `(name, kwargs)` pairs) to be sent to the workers.
+        n_jobs (int, optional): number of worker processes, defaults to the number of CPUs.
+        chunksize (int, optional): documents sent to a worker per task. Input shorter than one
+            chunk, or `n_jobs=1`, is normalized in-process without starting a pool.
+        meter (ThroughputMeter, optional): updated as documents are produced, to read docs/sec.
+    """
+    steps = list(steps)
+    n_jobs = resolve_n_jobs(n_jobs)
+    meter = meter if meter is not None else ThroughputMeter()
+    iterator = iter(texts)
+    head = list(islice(iterator, chunksize))
+    if n_jobs == 1 or len(head) < chunksize:
+        normalizer = Normalizer(steps)
+        chunks = (normalizer.normalize_iter(chunk) for chunk in chunked(chain(head, iterator), chunksize))
+    else:
+        chunks = imap_ordered(
+            _normalize_chunk,
+            chunked(chain(head, iterator), chunksize),
+            n_jobs=n_jobs,
+            initializer=_init_normalize_worker,
+            initargs=(steps,),
+        )
+    for chunk in chunks:
+        chunk = list(chunk)
+        meter.update(len(chunk))
+        yield from chunk
+    meter.stop()
+    logger.info(f"Normalized {meter.count} docs in {meter.elapsed:.2f}s ({meter.docs_per_sec:.1f} docs/sec)")
+
+
+def _ascii_fold_table(keep: bytes = b"") -> bytes:
+    """256-entry `bytes.translate` table: lowercase A-Z, keep a-z, 0-9, space and `keep`, map the rest to space."""
+    valid = set(string.ascii_lowercase.encode() + string.digits.encode() + b" " + keep)
+    return bytes(
+        code + 32 if 65 <= code <= 90 else code if code in valid else 32 for code in range(256)
+    )
+
+
+_ASCII_FOLD_TABLE = _ascii_fold_table()
+_ASCII_FOLD_LINES = numpy.frombuffer(_ascii_fold_table(keep=b"\n"), dtype=numpy.uint8)
+
+
+def remove_nonascii_chars_batch(texts: Iterable[str]) -> List[str]:
+    """`remove_nonascii_chars` over many strings (a list, a NumPy array of str, a generator). The texts
+    are joined into one buffer for `remove_nonascii_bytes`; as every character maps to exactly one
+    character, the results are sliced back by the original lengths."""
+    texts = list(texts)
+    folded = remove_nonascii_bytes("".join(texts).encode("utf-8")).decode("ascii")
+    ends = list(accumulate(len(text) for text in texts))
+    return [folded[start:end].strip() for start, end in zip(chain([0], ends), ends)]
+
+
+def normalize_unicode_to_ascii_batch(texts: Iterable[str]) -> List[str]:
+    """`normalize_unicode_to_ascii` over many strings, folded as one newline-delimited buffer by
+    `normalize_unicode_to_ascii_bytes`. A newline inside a text folds to a space either way, so
+    it is replaced beforehand to keep the line boundaries unambiguous."""
+    texts = list(texts)
+    if not texts:
+        return []
+    buffer = "\n".join(text.replace("\n", " ") if "\n" in text else text for text in texts)
+    return normalize_unicode_to_ascii_bytes(buffer.encode("utf-8")).decode("ascii").split("\n")
+
+
+def remove_nonascii_bytes(buffer: bytes) -> bytes:
+    """Replace every non-ASCII character of a UTF-8 buffer with a space using NumPy byte masks:
+    continuation bytes are dropped and each lead byte becomes one space, so every character maps
+    to exactly one space like `remove_nonascii_chars`. Unlike it, nothing is stripped."""
+    codes = numpy.frombuffer(buffer, dtype=numpy.uint8)
+    codes = codes[(codes < 0x80) | (codes >= 0xC0)]
+    codes[codes >= 0xC0] = 0x20
+    return codes.tobytes()
+
+
+def normalize_unicode_to_ascii_bytes(buffer: bytes) -> bytes:
+    """`normalize_unicode_to_ascii` for a newline-delimited UTF-8 buffer of documents, returning
+    one folded document per line. Case folding and special characters are resolved with a single
+    NumPy table lookup and repeated spaces are dropped with a shifted mask instead of regexes."""
+    text = buffer.decode("utf-8", errors="ignore")
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+    codes = _ASCII_FOLD_LINES[numpy.frombuffer(text.encode("ASCII", "ignore"), dtype=numpy.uint8)]
+    is_space = codes == 0x20
+    repeated_space = numpy.zeros_like(is_space)
+    repeated_space[1:] = is_space[1:] & is_space[:-1]
+    return codes[~repeated_space].tobytes()
@@ -0,0 +1,144 @@
+# coding: utf-8
+"""Find and redact personal data (emails, IPv4 addresses, SSNs, URLs) in one pass over the text.
+The patterns of `nlp_utils.regex` are joined into a single alternation of named groups, so a page
+is scanned once instead of once per pattern.
+Examples
+---------
+>>> scanner = PIIScanner()
+>>> [(span.label, span.text) for span in scanner.scan("Mail jane.doe@corp.com from 10.0.0.1, SSN 123-45-6789.")]
+[('EMAIL', 'jane.doe@corp.com'), ('IPV4', '10.0.0.1'), ('SSN', '123-45-6789')]
+>>> scanner.redact("Mail jane.doe@corp.com from 10.0.0.1")
+'Mail [EMAIL] from [IPV4]'
+"""
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+import re
+from nlp_utils.regex import REGISTRY, RegexRegistry, scoped_source
+
+
+class PIISpan(NamedTuple):
+    label: str
+    start: int
+    end: int
+    text: str
+
+
+# (label, registered pattern name); earlier entries win when several match at the same position,
+# e.g. the URL pattern would otherwise also accept the domain part of an email address
+DEFAULT_PII_PATTERNS = (
+    ("EMAIL", "REGEX_EMAIL"),
+    ("EMAIL", "REGEX_VALID_EMAIL"),
+    ("IPV4", "REGEX_IPV4_ADDRESS"),
+    ("SSN", "REGEX_SSN"),
+    ("URL", "REGEX_URL"),
+)
+# every default pattern needs at least one of these characters, so texts without them are skipped
+DEFAULT_TRIGGER_CHARS = "@.-"
+
+Replacement = Union[str, Callable[[PIISpan], str]]
+
+
+class PIIScanner:
+    """Scan text for personal data with one combined regex and return typed spans with offsets.
+
+    Args:
+        patterns (Sequence[Tuple[str, str]]): `(label, pattern name)` pairs looked up in `registry`.
+        labels (Iterable[str], optional): only keep the patterns of these labels.
+        trigger_chars (str, optional): prefilter; texts containing none of them are not scanned.
+            Pass an empty string to always scan, e.g. with custom patterns.
+        max_match_length (int): longest match expected by the streaming methods. Matches are only
+            reported once this many characters follow their start, so they cannot grow any further.
+    """
+
+    def __init__(
+        self,
+        patterns: Sequence[Tuple[str, str]] = DEFAULT_PII_PATTERNS,
+        labels: Optional[Iterable[str]] = None,
+        registry: RegexRegistry = REGISTRY,
+        trigger_chars: str = DEFAULT_TRIGGER_CHARS,
+        max_match_length: int = 1024,
+    ):
+        if labels is not None:
+            labels = set(labels)
+            patterns = [(label, name) for label, name in patterns if label in labels]
+        if not patterns:
+            raise ValueError("PIIScanner needs at least one pattern")
+        self._group_labels = {}
+        alternatives = []
+        for i, (label, name) in enumerate(patterns):
+            group = f"_{label}_{i}"
+            self._group_labels[group] = label
+            alternatives.append(f"(?P<{group}>{scoped_source(*registry.source(name))})")
+        # each pattern sits in its own outermost named group, so that group is the `lastgroup` of a match
+        self._pattern = re.compile("|".join(alternatives))
+        self.labels = sorted(set(self._group_labels.values()))
+        self.trigger_chars = trigger_chars
+        self.max_match_length = max_match_length
+        self._context_length = 16  # characters kept before a streaming scan, for lookbehinds and `\b`
+
+    def _may_contain_pii(self, text: str) -> bool:
+        return not self.trigger_chars or any(char in text for char in self.trigger_chars)
+
+    def iter_spans(self, text: str, offset: int = 0) -> Iterator[PIISpan]:
+        if not self._may_contain_pii(text):
+            return
+        for match in self._pattern.finditer(text):
+            label = self._group_labels[match.lastgroup]
+            yield PIISpan(label, match.start() + offset, match.end() + offset, match.group())
+
+    def scan(self, text: str) -> List[PIISpan]:
+        return list(self.iter_spans(text))
+
+    @staticmethod
+    def _replace(span: PIISpan, replacement: Replacement) -> str:
+        return replacement(span) if callable(replacement) else replacement.format(label=span.label)
+
+    def redact(self, text: str, replacement: Replacement = "[{label}]") -> str:
+        """Replace every span with `replacement`, a format string with `{label}` or a callable on `PIISpan`."""
+        return "".join(self._redact_segments(text, self.iter_spans(text), replacement, 0))
+
+    def _redact_segments(self, text: str, spans: Iterable[PIISpan], replacement: Replacement, offset: int):
+        position = 0
+        for span in spans:
+            yield text[position : span.start - offset]
+            yield self._replace(span, replacement)
+            position = span.end - offset
+        yield text[position:]
+
+    def _iter_committed(self, chunks: Iterable[str]) -> Iterator[Tuple[str, int, List[PIISpan]]]:
+        """Buffer `chunks` and yield `(text, offset, spans)` pieces of the stream that can no longer change:
+        a piece ends `max_match_length` characters before the end of the buffer, or after the last
+        match starting before that point. `spans` carry offsets into the whole stream."""
+        buffer, scan_from, offset = "", 0, 0  # `offset` is the stream position of buffer[0]
+        for chunk in chunks:
+            buffer += chunk
+            safe = len(buffer) - self.max_match_length
+            if safe <= scan_from:
+                continue
+            spans, commit = [], safe
+            if self._may_contain_pii(buffer[scan_from:]):
+                for match in self._pattern.finditer(buffer, scan_from):
+                    if match.start() >= safe:
+                        break
+                    label = self._group_labels[match.lastgroup]
+                    spans.append(PIISpan(label, offset + match.start(), offset + match.end(), match.group()))
+                    commit = max(commit, match.end())
+            yield buffer[scan_from:commit], offset + scan_from, spans
+            keep_from = max(0, commit - self._context_length)
+            buffer, scan_from, offset = buffer[keep_from:], commit - keep_from, offset + keep_from
+        spans = []
+        if self._may_contain_pii(buffer[scan_from:]):
+            for match in self._pattern.finditer(buffer, scan_from):
+                label = self._group_labels[match.lastgroup]
+                spans.append(PIISpan(label, offset + match.start(), offset + match.end(), match.group()))
+        yield buffer[scan_from:], offset + scan_from, spans
+
+    def scan_stream(self, chunks: Iterable[str]) -> Iterator[PIISpan]:
+        """Scan text arriving in chunks (e.g. an open file), with offsets into the whole stream.
+        Matches crossing chunk boundaries are found as long as they are at most `max_match_length` long."""
+        for _, _, spans in self._iter_committed(chunks):
+            yield from spans
+
+    def redact_stream(self, chunks: Iterable[str], replacement: Replacement = "[{label}]") -> Iterator[str]:
+        """Redact text arriving in chunks, yielding redacted pieces whose concatenation is the redacted stream."""
+        for text, offset, spans in self._iter_committed(chunks):
+            yield "".join(self._redact_segments(text, spans, replacement, offset))
@@ -1,39 +1,146 @@
 # coding: utf-8
+"""Regular expressions shared by the text utilities. Patterns are registered by name and compiled
+lazily on first use, so importing this module costs nothing for the patterns a process never touches.
+They are read as module attributes as before, e.g. ``from nlp_utils.regex import REGEX_URL``, or through
+``REGISTRY``, which also warms up a pool with ``REGISTRY.precompile([...])`` and reports compile costs."""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Pattern, Tuple, Union
 import re
 import string
+import time
 
 ARABIC_PUNCTUATIONS = """`÷×؛<>_()*&^%][ـ،/:"؟.,'{}~¦+|!”…“–ـ"""
 ENGLISH_PUNCTUATIONS = string.punctuation
 
-REGEX_NEWLINE = re.compile(r"(\r\n|[\n\v])+", flags=re.UNICODE | re.IGNORECASE)
-REGEX_NONBREAKING_SPACE = re.compile(r"[^\S\n\v]+", flags=re.UNICODE)
-REGEX_OWNERSHIP = re.compile(r"(\w|\s)\'s$", flags=re.UNICODE | re.IGNORECASE)
-REGEX_CONSECUTIVE_PUNCTUATION = re.compile(f"([{ENGLISH_PUNCTUATIONS}])[{ENGLISH_PUNCTUATIONS}]+")
-REGEX_HYPHENATED_WORD = re.compile(r"(\w{2,}(?<!\d))\s+-\s+((?!\d)\w{2,})", flags=re.UNICODE | re.IGNORECASE)
-REGEX_URL = re.compile(
-    r"\b(http(s)?:\/\/.)?(www\.)?[-a-zA-Z0-9@:%._\+~#=]{2,256}\.[a-z]{2,6}\b([-a-zA-Z0-9@:%_\+.~#?&//=]*)\b"
+
+_INLINE_FLAGS = ((re.ASCII, "a"), (re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"))
+
+
+def scoped_source(pattern: str, flags: int = 0) -> str:
+    """Wrap a pattern source in a non-capturing group carrying its flags inline, e.g. `(?i:...)`,
+    so patterns compiled with different flags can be joined into one alternation."""
+    letters = "".join(letter for flag, letter in _INLINE_FLAGS if flags & flag)
+    return "(?{}:{})".format(letters, pattern) if letters else "(?:{})".format(pattern)
+
+
+class RegexStat(NamedTuple):
+    name: str
+    compiled: bool
+    compile_seconds: Optional[float]
+
+
+class RegexRegistry:
+    """Keep pattern sources by name and compile each one once, on first use."""
+
+    def __init__(self):
+        self._sources: Dict[str, Tuple[Union[str, bytes], int]] = {}
+        self._compiled: Dict[str, Pattern] = {}
+        self._compile_seconds: Dict[str, float] = {}
+
+    def register(self, name: str, pattern: Union[str, bytes], flags: int = 0) -> None:
+        self._sources[name] = (pattern, flags)
+        self._compiled.pop(name, None)
+        self._compile_seconds.pop(name, None)
+
+    def source(self, name: str) -> Tuple[Union[str, bytes], int]:
+        """Return the uncompiled `(pattern, flags)` registered under `name`."""
+        return self._sources[name]
+
+    def get(self, name: str) -> Pattern:
+        compiled = self._compiled.get(name)
+        if compiled is None:
+            pattern, flags = self._sources[name]
+            started = time.perf_counter()
+            compiled = re.compile(pattern, flags)
+            self._compile_seconds[name] = time.perf_counter() - started
+            self._compiled[name] = compiled
+        return compiled
+
+    def precompile(self, names: Optional[Iterable[str]] = None) -> None:
+        """Compile `names` (default: every registered pattern) ahead of time, e.g. before forking workers."""
+        for name in self._sources if names is None else names:
+            self.get(name)
+
+    def stats(self) -> List[RegexStat]:
+        """List every pattern with whether it is compiled yet and how long compiling it took."""
+        return [RegexStat(name, name in self._compiled, self._compile_seconds.get(name)) for name in self._sources]
+
+    def __getitem__(self, name: str) -> Pattern:
+        return self.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sources
+
+    def __iter__(self):
+        return iter(self._sources)
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+
+REGISTRY = RegexRegistry()
+
+REGISTRY.register("REGEX_NEWLINE", r"(\r\n|[\n\v])+", flags=re.UNICODE | re.IGNORECASE)
+REGISTRY.register("REGEX_NONBREAKING_SPACE", r"[^\S\n\v]+", flags=re.UNICODE)
+REGISTRY.register("REGEX_MULTIPLE_SPACES_BYTES", rb" {2,}")
+REGISTRY.register("REGEX_OWNERSHIP", r"(\w|\s)\'s$", flags=re.UNICODE | re.IGNORECASE)
+REGISTRY.register("REGEX_CONSECUTIVE_PUNCTUATION", f"([{ENGLISH_PUNCTUATIONS}])[{ENGLISH_PUNCTUATIONS}]+")
+REGISTRY.register("REGEX_STOCK_TICKER", r"\$\w*")
+REGISTRY.register("REGEX_RETWEET_PREFIX", r"^RT[\s]+")
+REGISTRY.register("REGEX_HYPERLINK", r"https?:\/\/.*[\r\n]*")
+REGISTRY.register("REGEX_HASHTAG_SIGN", r"#")
+REGISTRY.register(
+    "REGEX_HYPHENATED_WORD", r"(\w{2,}(?<!\d))\s+-\s+((?!\d)\w{2,})", flags=re.UNICODE | re.IGNORECASE
+)
+REGISTRY.register(
+    "REGEX_URL",
+    r"\b(http(s)?:\/\/.)?(www\.)?[-a-zA-Z0-9@:%._\+~#=]{2,256}\.[a-z]{2,6}\b([-a-zA-Z0-9@:%_\+.~#?&//=]*)\b",
 )
-REGEX_EMAIL = re.compile(
+REGISTRY.register(
+    "REGEX_EMAIL",
     r"(?:mailto:)?" r"(?:^|(?<=[^\w@.)]))([\w+-](\.(?!\.))?)*?[\w+-]@(?:\w-?)*?\w+(\.([a-z]{2,})){1,3}" r"(?:$|(?=\b))",
     flags=re.UNICODE | re.IGNORECASE,
 )
-REGEX_VALID_EMAIL = re.compile(r"\b[\w.!#$%&’*+\/=?^`{|}~-]+@[\w-]+(?:\.[\w-]+)*\b", flags=re.UNICODE | re.IGNORECASE)
-REGEX_PASSWORD = re.compile(
-    r"(?=^.{6,}$)((?=.*\w)(?=.*[A-Z])(?=.*[a-z])(?=.*[0-9])(?=.*[|!$%&\/\(\)\?\^\'\\\+\-\*]))^.*"
+REGISTRY.register(
+    "REGEX_VALID_EMAIL", r"\b[\w.!#$%&’*+\/=?^`{|}~-]+@[\w-]+(?:\.[\w-]+)*\b", flags=re.UNICODE | re.IGNORECASE
 )
-REGEX_IPV4_ADDRESS = re.complie(
-    r"\b(?:(?:25[0-5]|2[0-4]\d|[01]?\d\d?)\.){3}(?:25[0-5]|2[0-4]\d|[01]?\d\d?)\b", flags=re.UNICODE | re.IGNORECASE
+REGISTRY.register(
+    "REGEX_PASSWORD", r"(?=^.{6,}$)((?=.*\w)(?=.*[A-Z])(?=.*[a-z])(?=.*[0-9])(?=.*[|!$%&\/\(\)\?\^\'\\\+\-\*]))^.*"
 )
-REGEX_SSN_SIMPLE = re.complie(r"^((?<area>[\d]{3})[-][\d]{2}[-][\d]{4})$", flags=re.UNICODE | re.IGNORECASE)
+REGISTRY.register(
+    "REGEX_IPV4_ADDRESS",
+    r"\b(?:(?:25[0-5]|2[0-4]\d|[01]?\d\d?)\.){3}(?:25[0-5]|2[0-4]\d|[01]?\d\d?)\b",
+    flags=re.UNICODE | re.IGNORECASE,
+)
+REGISTRY.register("REGEX_SSN_SIMPLE", r"^((?P<area>[\d]{3})[-][\d]{2}[-][\d]{4})$", flags=re.UNICODE | re.IGNORECASE)
+# unanchored REGEX_SSN_SIMPLE, to find SSNs inside running text
+REGISTRY.register("REGEX_SSN", r"\b((?P<area>[\d]{3})[-][\d]{2}[-][\d]{4})\b", flags=re.UNICODE | re.IGNORECASE)
 # from _regex.py
-REGEX_DIV = re.compile(
-    ".*[career|careers|jobs|job|description|responsibility|experience|skill|qualification]-.*", re.IGNORECASE
+REGISTRY.register(
+    "REGEX_DIV",
+    ".*[career|careers|jobs|job|description|responsibility|experience|skill|qualification]-.*",
+    re.IGNORECASE,
 )
-REGEX_JOB_KEYWORDS = re.compile(
-    r"[career|careers|jobs|job|description|responsibility|experience|skill|qualification]", re.IGNORECASE
+REGISTRY.register(
+    "REGEX_JOB_KEYWORDS",
+    r"[career|careers|jobs|job|description|responsibility|experience|skill|qualification]",
+    re.IGNORECASE,
 )
 
 
-REGEX_DIGITA_AROUND_COMMON = re.compile(r"(\d)[?,:;!](\d)", flags=re.UNICODE | re.IGNORECASE)
+REGISTRY.register("REGEX_DIGITA_AROUND_COMMON", r"(\d)[?,:;!](\d)", flags=re.UNICODE | re.IGNORECASE)
+
+REGISTRY.register("REGEX_NON_ALPHA", "^[^a-zA-Z0-9].*$")
+
+
+def __getattr__(name: str) -> Pattern:
+    # PEP 562: resolve `REGEX_*` module attributes through the registry, then bind them so the
+    # next lookup is a plain module attribute access
+    if name in REGISTRY:
+        compiled = REGISTRY.get(name)
+        globals()[name] = compiled
+        return compiled
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-REGEX_NON_ALPHA = re.compile("^[^a-zA-Z0-9].*$")
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(REGISTRY))
@@ -1,23 +1,142 @@
 # coding: utf-8
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+import gc
+import logging
+import threading
+import time
 from spacy.tokens import Token, Span, Doc
 from spacy.language import Language as SpacyModelType
 from spacy.cli.download import download as spacy_download
 
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
-def get_spacy_model(spacy_model_name: str, pipeline_disabled=["vectors", "textcat"]):
+logger = logging.getLogger(__name__)
+
+ModelKey = Tuple[str, Tuple[str, ...]]
+# components disabled when a model is asked for by name alone; every such request must share this key
+DEFAULT_DISABLED_PIPES = ("vectors", "textcat")
+
+
+class SpacyModelStat(NamedTuple):
+    name: str
+    disabled: Tuple[str, ...]
+    load_seconds: float
+    # growth of the process peak RSS while loading, in KiB; an upper bound of the model's footprint
+    # that reads 0 when an earlier, larger allocation already set the peak
+    maxrss_delta_kb: Optional[int]
+    hits: int
+
+
+def _maxrss_kb() -> Optional[int]:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None
+
+
+def _load_spacy_model(spacy_model_name: str, pipeline_disabled: Iterable[str]) -> SpacyModelType:
+    disabled = list(pipeline_disabled)
     try:
         import spacy
 
-        spacy_model = spacy.load(spacy_model_name, disable=pipeline_disabled)
-    except (ImportError, OSError) as e:
+        spacy_model = spacy.load(spacy_model_name, disable=disabled)
+    except (ImportError, OSError):
         logger.error("spaCy is not installed or the model is unavailale.")
         spacy_download(spacy_model_name)
         # Import the downloaded model module directly and load from there
         spacy_model_module = __import__(spacy_model_name)
-        spacy_model = spacy_model_module.load(disable=disable)
+        spacy_model = spacy_model_module.load(disable=disabled)
     return spacy_model
 
 
+class SpacyModelRegistry:
+    """Load each spaCy pipeline once per process, keyed by model name and disabled components,
+    and hand the same ``Language`` object to every component asking for it."""
+
+    def __init__(self):
+        self._models: Dict[ModelKey, SpacyModelType] = {}
+        self._stats: Dict[ModelKey, SpacyModelStat] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def key(spacy_model_name: str, pipeline_disabled: Iterable[str] = ()) -> ModelKey:
+        return spacy_model_name, tuple(sorted(set(pipeline_disabled)))
+
+    def get(self, spacy_model_name: str, pipeline_disabled: Iterable[str] = ()) -> SpacyModelType:
+        key = self.key(spacy_model_name, pipeline_disabled)
+        with self._lock:
+            spacy_model = self._models.get(key)
+            if spacy_model is not None:
+                self._stats[key] = self._stats[key]._replace(hits=self._stats[key].hits + 1)
+                return spacy_model
+            maxrss = _maxrss_kb()
+            started = time.perf_counter()
+            spacy_model = _load_spacy_model(*key)
+            load_seconds = time.perf_counter() - started
+            maxrss_delta = _maxrss_kb() - maxrss if maxrss is not None else None
+            logger.info(f"Loaded spaCy model {key[0]} (disabled={list(key[1])}) in {load_seconds:.2f}s")
+            self._models[key] = spacy_model
+            self._stats[key] = SpacyModelStat(key[0], key[1], load_seconds, maxrss_delta, 0)
+            return spacy_model
+
+    def preload(
+        self, specs: Iterable[Union[str, Tuple[str, Iterable[str]]]], freeze: bool = True
+    ) -> List[SpacyModelType]:
+        """Load models ahead of time, e.g. in a parent process before forking workers. ``specs`` are model
+        names or ``(name, disabled)`` pairs. With ``freeze``, the loaded objects are moved to the permanent
+        generation (``gc.freeze``) so the collector never writes to their pages and forked workers keep
+        sharing them copy-on-write."""
+        models = [self.get(spec) if isinstance(spec, str) else self.get(*spec) for spec in specs]
+        if freeze:
+            gc.collect()
+            gc.freeze()
+        return models
+
+    def evict(self, spacy_model_name: Optional[str] = None, pipeline_disabled: Optional[Iterable[str]] = None) -> int:
+        """Drop cached models and return how many were dropped: every model when no name is given, every
+        variant of ``spacy_model_name`` when ``pipeline_disabled`` is None, otherwise that exact key.
+        Components that still hold a reference keep their model alive."""
+        with self._lock:
+            if spacy_model_name is None:
+                keys = list(self._models)
+            elif pipeline_disabled is None:
+                keys = [key for key in self._models if key[0] == spacy_model_name]
+            else:
+                keys = [self.key(spacy_model_name, pipeline_disabled)]
+            evicted = 0
+            for key in keys:
+                if self._models.pop(key, None) is not None:
+                    del self._stats[key]
+                    evicted += 1
+            return evicted
+
+    def stats(self) -> List[SpacyModelStat]:
+        with self._lock:
+            return list(self._stats.values())
+
+    def __contains__(self, key: ModelKey) -> bool:
+        return self.key(*key) in self._models
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+
+SPACY_MODELS = SpacyModelRegistry()
+
+
+def get_spacy_model(spacy_model_name: str, pipeline_disabled=DEFAULT_DISABLED_PIPES) -> SpacyModelType:
+    """Return the process-wide shared pipeline for ``spacy_model_name``, loading it on first use."""
+    return SPACY_MODELS.get(spacy_model_name, pipeline_disabled)
+
+
+def resolve_spacy_model(nlp: Union[str, SpacyModelType]) -> SpacyModelType:
+    """Accept either a loaded pipeline or a model name, which is looked up in ``SPACY_MODELS`` with the
+    same ``DEFAULT_DISABLED_PIPES`` as ``get_spacy_model``, so both return the same object."""
+    if isinstance(nlp, str):
+        return get_spacy_model(nlp)
+    return nlp
+
+
 def is_alphanum(token: Token, valid_punctuation_marks="-") -> bool:
     """Check whether token contains only alpha-numeric characters and valid punctuation. Expand from spacy's
     `Token.is_digit` and `Token.is_alpha` attributes.
@@ -1,8 +1,18 @@
 # coding: utf-8
 from __future__ import unicode_literals
-from typing import List, Optional
-from nlp_utils.normalize import remove_punctuation, expand_contractions
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Tuple, Union
+from array import array
+from itertools import chain
+import json
+import mmap
+import os
+from nlp_utils.normalize import get_contraction_expander
+from nlp_utils.regex import ENGLISH_PUNCTUATIONS
+from nlp_utils.word_splitter import DEFAULT_BATCH_SIZE
 from common.types import WordToken
+from utils.parallel import chunked, imap_ordered
+
+_PUNCTUATION_TABLE = str.maketrans("", "", ENGLISH_PUNCTUATIONS)
 
 
 class WordTokenizer:
@@ -17,13 +27,9 @@ class WordTokenizer:
         end_tokens: Optional[List[WordToken]] = None,
     ):
         self._word_splitter = word_splitter
-        self._start_tokens = start_tokens or []
-        # We reverse the tokens here because we're going to insert them with `insert(0)` later;
-        # this makes sure they show up in the right order.
-        self._start_tokens.reverse()
-        self._end_tokens = end_tokens or []
+        self._start_tokens = list(start_tokens or [])
+        self._end_tokens = list(end_tokens or [])
 
-    @classmethod
     def tokenize(self, text: str, with_contraction: bool = False, with_punc: bool = True) -> List[WordToken]:
         """
         with_punc: (optional) whether to include punctuation as separate tokens.
@@ -32,24 +38,188 @@ class WordTokenizer:
         Returns: list of word tokens.
         """
         if with_contraction:
-            # TODO: not yet implemented
-            text = expand_contractions(text)
+            text = get_contraction_expander().expand(text)
         tokens = self._word_splitter.split_words(text)
         return self._sanitize(tokens, with_punc)
 
     def _sanitize(self, tokens: List[str], with_punc: bool = False) -> List[WordToken]:
-        if not with_punc:
-            tokens = [
-                word if word.startswith("'") else remove_punctuation(word)
-                for word in tokens
-                if remove_punctuation(word)
-            ]
-        for start_token in self._start_tokens:
-            tokens.insert(0, start_token)
-        for end_token in self._end_tokens:
-            tokens.append(end_token)
-        return tokens
-
-    @classmethod
-    def batch_tokenize(self, texts: List[str]) -> List[List[WordToken]]:
-        return [self.tokenize(text) for text in texts]
+        return self._sanitize_batch([tokens], with_punc)[0]
+
+    def _sanitize_batch(self, batch: List[List[str]], with_punc: bool = False) -> List[List[WordToken]]:
+        """Sanitize a whole batch in one pass over its flattened tokens: punctuation is stripped once
+        per distinct token and start/end tokens are attached when slicing the batch back apart."""
+        start_tokens, end_tokens = self._start_tokens, self._end_tokens
+        if with_punc:
+            return [start_tokens + tokens + end_tokens for tokens in batch]
+        stripped: Dict[str, str] = {}
+        for token in chain.from_iterable(batch):
+            if token not in stripped:
+                stripped[token] = token.translate(_PUNCTUATION_TABLE)
+        return [
+            start_tokens
+            + [token if token.startswith("'") else stripped[token] for token in tokens if stripped[token]]
+            + end_tokens
+            for tokens in batch
+        ]
+
+    def iter_tokenize(
+        self,
+        texts: Iterable[str],
+        batch_size: Optional[int] = None,
+        n_process: Optional[int] = None,
+        with_contraction: bool = False,
+        with_punc: bool = True,
+    ) -> Iterator[List[WordToken]]:
+        """Lazily tokenize `texts` in order, handing them to the word splitter's batch API and
+        sanitizing `batch_size` results at a time, so memory stays bounded for any corpus size.
+        `batch_size` and `n_process` default to the splitter's own settings."""
+        if with_contraction:
+            texts = map(get_contraction_expander().expand, texts)
+        token_lists = self._word_splitter.iter_split_words(texts, batch_size=batch_size, n_process=n_process)
+        sanitize_size = batch_size or getattr(self._word_splitter, "batch_size", DEFAULT_BATCH_SIZE)
+        for batch in chunked(token_lists, sanitize_size):
+            yield from self._sanitize_batch(batch, with_punc)
+
+    def batch_tokenize(
+        self,
+        texts: Iterable[str],
+        batch_size: Optional[int] = None,
+        n_process: Optional[int] = None,
+        with_contraction: bool = False,
+        with_punc: bool = True,
+        lazy: bool = False,
+    ) -> Union[List[List[WordToken]], Iterator[List[WordToken]]]:
+        """Tokenize many texts, see `iter_tokenize`. Returns a list, or the lazy iterator if `lazy`."""
+        token_lists = self.iter_tokenize(
+            texts, batch_size=batch_size, n_process=n_process, with_contraction=with_contraction, with_punc=with_punc
+        )
+        return token_lists if lazy else list(token_lists)
+
+
+def iter_line_ranges(path: Union[str, os.PathLike], chunk_bytes: int = 1 << 24) -> Iterator[Tuple[int, int]]:
+    """Yield `(start, end)` byte ranges of about `chunk_bytes` covering the file, each ending on a line break."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            start = 0
+            while start < size:
+                end = min(start + chunk_bytes, size)
+                if end < size:
+                    newline = buffer.find(b"\n", end - 1)
+                    end = size if newline == -1 else newline + 1
+                yield start, end
+                start = end
+
+
+_WORKER_FILES: Dict[str, mmap.mmap] = {}
+_WORKER_FILE_TOKENIZER: Optional[Tuple[object, Optional[str]]] = None
+
+
+def _init_file_worker(splitter, field: Optional[str]):
+    global _WORKER_FILE_TOKENIZER
+    _WORKER_FILE_TOKENIZER = (splitter, field)
+
+
+def _read_range(path: str, start: int, end: int) -> bytes:
+    buffer = _WORKER_FILES.get(path)
+    if buffer is None:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _WORKER_FILES[path] = buffer
+    return buffer[start:end]
+
+
+def _tokenize_range(task: Tuple[str, int, int]) -> List[List[WordToken]]:
+    splitter, field = _WORKER_FILE_TOKENIZER
+    return _tokenize_lines(_read_range(*task), splitter, field)
+
+
+def _tokenize_lines(data: bytes, splitter, field: Optional[str]) -> List[List[WordToken]]:
+    lines = data.decode("utf-8").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    if field is not None:
+        lines = [json.loads(line)[field] for line in lines if line.strip()]
+    else:
+        lines = [line.rstrip("\r") for line in lines]
+    if splitter is None:
+        return [line.split() for line in lines]
+    return [splitter.split_words(line) for line in lines]
+
+
+def tokenize_file(
+    path: Union[str, os.PathLike],
+    field: Optional[str] = None,
+    splitter=None,
+    n_jobs: int = 1,
+    chunk_bytes: int = 1 << 24,
+) -> Iterator[List[WordToken]]:
+    """Tokenize a plain-text (one document per line) or JSONL file, yielding the tokens of each
+    document in file order. The file is memory-mapped and split into line-aligned chunks which
+    workers read and tokenize by themselves, so only a bounded number of chunks is ever in memory.
+
+    Args:
+        path: the file to tokenize.
+        field (str, optional): read JSONL and tokenize `record[field]`; blank lines are skipped.
+        splitter (WordSplitter, optional): splits each document; defaults to splitting on whitespace.
+            It must be picklable when `n_jobs > 1`.
+        n_jobs (int): worker processes; 1 tokenizes in-process.
+        chunk_bytes (int): approximate size of the chunk handed to a worker.
+    """
+    path = os.fspath(path)
+    if n_jobs == 1:
+        # a map of its own rather than the worker globals, so generators open at once don't interfere
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                for start, end in iter_line_ranges(path, chunk_bytes):
+                    yield from _tokenize_lines(buffer[start:end], splitter, field)
+        return
+    tasks = ((path, start, end) for start, end in iter_line_ranges(path, chunk_bytes))
+    chunks = imap_ordered(
+        _tokenize_range, tasks, n_jobs=n_jobs, initializer=_init_file_worker, initargs=(splitter, field)
+    )
+    for chunk in chunks:
+        yield from chunk
+
+
+def write_tokens(
+    token_lists: Iterable[List[str]], output: IO, output_format: str = "tokens", vocab: Optional[Dict[str, int]] = None
+) -> int:
+    """Write tokenized documents to a file object opened in binary mode and return the number written.
+
+    output_format:
+        "tokens": one document per line, tokens separated by a space (UTF-8).
+        "ids": a compact stream of uint32 values; each document is its token count followed by the
+            token ids. Ids come from `vocab` (token -> id), which is extended with unseen tokens.
+    """
+    if output_format not in {"tokens", "ids"}:
+        raise ValueError(f"output_format={output_format} is invalid; expected 'tokens' or 'ids'")
+    if output_format == "ids" and vocab is None:
+        raise ValueError("output_format='ids' needs a `vocab` mapping to assign token ids")
+    num_docs = 0
+    for tokens in token_lists:
+        if output_format == "tokens":
+            output.write((" ".join(tokens) + "\n").encode("utf-8"))
+        else:
+            record = array("I", [len(tokens)])
+            record.extend(vocab.setdefault(token, len(vocab)) for token in tokens)
+            record.tofile(output)
+        num_docs += 1
+    return num_docs
+
+
+def read_token_ids(input: IO) -> Iterator[array]:
+    """Read back the documents written by `write_tokens(..., output_format="ids")`."""
+    while True:
+        header = array("I")
+        try:
+            header.fromfile(input, 1)
+        except EOFError:
+            return
+        ids = array("I")
+        ids.fromfile(input, header[0])
+        yield ids
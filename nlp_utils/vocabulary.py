@@ -0,0 +1,171 @@
+# coding: utf-8
+"""Compact storage for tokenized corpora: a `Vocabulary` interns tokens into integer ids, and a
+`TokenizedCorpus` keeps all documents as one flat uint32 id buffer plus uint64 document offsets,
+about 4 bytes per token instead of a Python `str` object each.
+Examples
+---------
+>>> corpus = TokenizedCorpus.from_token_lists([["to", "be", "or"], ["not", "to", "be"]])
+>>> len(corpus), corpus.num_tokens, len(corpus.vocab)
+(2, 6, 4)
+>>> corpus[1]
+['not', 'to', 'be']
+>>> corpus.counts().most_common(2)
+[('to', 2), ('be', 2)]
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from array import array
+from collections import Counter
+import json
+import os
+import numpy
+
+
+class Vocabulary:
+    """Bidirectional token <-> id mapping, ids assigned in order of first appearance."""
+
+    def __init__(self, tokens: Iterable[str] = ()):
+        self._token_to_id: Dict[str, int] = {}
+        self._id_to_token: List[str] = []
+        for token in tokens:
+            self.add(token)
+
+    def add(self, token: str) -> int:
+        """Return the id of `token`, assigning the next id if it is new."""
+        token_id = self._token_to_id.get(token)
+        if token_id is None:
+            token_id = self._token_to_id[token] = len(self._id_to_token)
+            self._id_to_token.append(token)
+        return token_id
+
+    def setdefault(self, token: str, default: Optional[int] = None) -> int:
+        """dict-style alias of `add`, so a `Vocabulary` can stand in for a token -> id dict
+        (e.g. in `nlp_utils.tokenizer.write_tokens`); `default` is ignored, ids stay dense."""
+        return self.add(token)
+
+    def get(self, token: str, default: Optional[int] = None) -> Optional[int]:
+        return self._token_to_id.get(token, default)
+
+    def token(self, token_id: int) -> str:
+        return self._id_to_token[token_id]
+
+    def encode(self, tokens: Iterable[str], add: bool = True) -> array:
+        """Map tokens to an `array('I')` of ids. With `add=False`, unknown tokens raise a `KeyError`."""
+        lookup = self.add if add else self._token_to_id.__getitem__
+        return array("I", map(lookup, tokens))
+
+    def decode(self, token_ids: Iterable[int]) -> List[str]:
+        id_to_token = self._id_to_token
+        return [id_to_token[token_id] for token_id in token_ids]
+
+    @property
+    def tokens(self) -> List[str]:
+        return self._id_to_token
+
+    def __getitem__(self, token: str) -> int:
+        return self._token_to_id[token]
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._token_to_id
+
+    def __len__(self) -> int:
+        return len(self._id_to_token)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._id_to_token)
+
+    def save(self, path: Union[str, os.PathLike]) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self._id_to_token, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike]) -> "Vocabulary":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+
+class TokenizedCorpus:
+    """Documents stored as token ids in one flat buffer, with `offsets[i]:offsets[i + 1]` delimiting
+    document `i`. Buffers are growable `array`s while building, or (memory-mapped) NumPy arrays
+    after `load`, in which case the corpus is read-only."""
+
+    IDS_FILE = "ids.npy"
+    OFFSETS_FILE = "offsets.npy"
+    VOCAB_FILE = "vocab.json"
+
+    def __init__(self, vocab: Optional[Vocabulary] = None, ids=None, offsets=None):
+        self.vocab = vocab if vocab is not None else Vocabulary()
+        self.ids = ids if ids is not None else array("I")
+        self.offsets = offsets if offsets is not None else array("Q", [0])
+
+    @classmethod
+    def from_token_lists(
+        cls, token_lists: Iterable[List[str]], vocab: Optional[Vocabulary] = None
+    ) -> "TokenizedCorpus":
+        corpus = cls(vocab)
+        corpus.extend(token_lists)
+        return corpus
+
+    @property
+    def read_only(self) -> bool:
+        return not isinstance(self.ids, array)
+
+    def append(self, tokens: Iterable[str]) -> None:
+        if self.read_only:
+            raise ValueError("a loaded TokenizedCorpus is read-only; build a new one to add documents")
+        self.ids.extend(self.vocab.encode(tokens))
+        self.offsets.append(len(self.ids))
+
+    def extend(self, token_lists: Iterable[List[str]]) -> None:
+        for tokens in token_lists:
+            self.append(tokens)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def num_tokens(self) -> int:
+        return int(self.offsets[-1])
+
+    def doc_ids(self, index: int):
+        """Token ids of document `index`, without decoding them."""
+        if index < 0:
+            index += len(self)
+        return self.ids[self.offsets[index] : self.offsets[index + 1]]
+
+    def __getitem__(self, index: int) -> List[str]:
+        return self.vocab.decode(self.doc_ids(index))
+
+    def __iter__(self) -> Iterator[List[str]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def id_array(self) -> numpy.ndarray:
+        """The id buffer as a NumPy array, without copying."""
+        return numpy.frombuffer(self.ids, dtype=numpy.uint32) if isinstance(self.ids, array) else self.ids
+
+    def token_counts(self) -> numpy.ndarray:
+        """Occurrences of every vocabulary id over the whole corpus, computed with one `bincount`."""
+        return numpy.bincount(self.id_array(), minlength=len(self.vocab))
+
+    def counts(self, to_lower: bool = False) -> Counter:
+        """Token frequencies as a `Counter`, optionally merging tokens that only differ in case."""
+        counts = self.token_counts()
+        counter = Counter()
+        for token_id in numpy.flatnonzero(counts):
+            token = self.vocab.token(token_id)
+            counter[token.lower() if to_lower else token] += int(counts[token_id])
+        return counter
+
+    def save(self, directory: Union[str, os.PathLike]) -> None:
+        os.makedirs(directory, exist_ok=True)
+        numpy.save(os.path.join(directory, self.IDS_FILE), numpy.asarray(self.id_array(), dtype=numpy.uint32))
+        numpy.save(os.path.join(directory, self.OFFSETS_FILE), numpy.asarray(self.offsets, dtype=numpy.uint64))
+        self.vocab.save(os.path.join(directory, self.VOCAB_FILE))
+
+    @classmethod
+    def load(cls, directory: Union[str, os.PathLike], mmap_mode: Optional[str] = "r") -> "TokenizedCorpus":
+        """Load a saved corpus; with the default `mmap_mode="r"` the id and offset buffers are memory-mapped."""
+        vocab = Vocabulary.load(os.path.join(directory, cls.VOCAB_FILE))
+        ids = numpy.load(os.path.join(directory, cls.IDS_FILE), mmap_mode=mmap_mode)
+        offsets = numpy.load(os.path.join(directory, cls.OFFSETS_FILE), mmap_mode=mmap_mode)
+        return cls(vocab, ids, offsets)
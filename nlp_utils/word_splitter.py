@@ -1,10 +1,27 @@
-from typing import List
+from typing import Iterable, Iterator, List, Optional
 import re
 import jieba
 from overrides import overrides
-from nltk import word_tokenizer
-from commom.types import Token, WordToken
-from nlp_utils.spacy_utils import get_spacy_model
+from nltk import word_tokenize
+from spacy.tokens import Token
+from common.types import WordToken
+from nlp_utils.spacy_utils import DEFAULT_DISABLED_PIPES, get_spacy_model
+from utils.parallel import chunked, imap_ordered
+
+
+# sentences per batch when neither the call nor the splitter sets one
+DEFAULT_BATCH_SIZE = 1000
+
+_WORKER_SPLITTER: Optional["WordSplitter"] = None
+
+
+def _init_split_worker(word_splitter: "WordSplitter"):
+    global _WORKER_SPLITTER
+    _WORKER_SPLITTER = word_splitter
+
+
+def _split_chunk(sentences: List[str]) -> List[List[WordToken]]:
+    return [_WORKER_SPLITTER.split_words(sentence) for sentence in sentences]
 
 
 class WordSplitter:
@@ -18,14 +35,39 @@ class WordSplitter:
         """
         raise NotImplementedError
 
-    def batch_split_words(self, sentences: List[str]) -> List[List[WordToken]]:
+    def batch_split_words(
+        self, sentences: Iterable[str], batch_size: Optional[int] = None, n_process: Optional[int] = None
+    ) -> List[List[WordToken]]:
         """
         Spacy needs to do batch processing, or it can be really slow.  This method lets you take
         advantage of that if you want.  Default implementation is to just iterate of the sentences
         and call ``split_words``, but the ``SpacyWordSplitter`` will actually do batched
         processing.
         """
-        return [self.split_words(sentence) for sentence in sentences]
+        return list(self.iter_split_words(sentences, batch_size=batch_size, n_process=n_process))
+
+    def iter_split_words(
+        self, sentences: Iterable[str], batch_size: Optional[int] = None, n_process: Optional[int] = None
+    ) -> Iterator[List[WordToken]]:
+        """
+        Lazily split ``sentences`` in order. With ``n_process > 1``, batches of ``batch_size``
+        sentences are split by a pool of worker processes, each holding a copy of this splitter.
+        ``None`` means ``DEFAULT_BATCH_SIZE`` sentences and a single process.
+        """
+        batch_size = batch_size or DEFAULT_BATCH_SIZE
+        if n_process is None or n_process == 1:
+            for sentence in sentences:
+                yield self.split_words(sentence)
+            return
+        batches = imap_ordered(
+            _split_chunk,
+            chunked(sentences, batch_size),
+            n_jobs=n_process,
+            initializer=_init_split_worker,
+            initargs=(self,),
+        )
+        for batch in batches:
+            yield from batch
 
 
 class WhiteSpaceSplitter(WordSplitter):
@@ -41,12 +83,22 @@ class WhiteSpaceSplitter(WordSplitter):
 class NLTKSplitter(WordSplitter):
     @overrides
     def split_words(self, sentence: str) -> List[WordToken]:
-        return [token for token in word_tokenizer(sentence)]
+        return [token for token in word_tokenize(sentence)]
+
+
+# pipes that change token boundaries; they and the components whose annotations they read still run
+RETOKENIZING_PIPES = ("merge_noun_chunks", "merge_entities", "merge_subtokens")
 
 
 class SpacyWordSplitter(WordSplitter):
     """
     A ``WordSplitter`` that uses spaCy's tokenizer.
+
+    When only token texts are returned (``keep_spacy_tokens=False``) and ``disabled`` is not given, the
+    pipeline components that token boundaries do not depend on are skipped on every call: all of them,
+    unless the pipeline retokenizes (``RETOKENIZING_PIPES``), in which case the retokenizing pipes and
+    the components they depend on still run. ``tokens_only=True`` goes further and runs the bare ``nlp.tokenizer``, returning token texts.
+    ``batch_size`` and ``n_process`` are the defaults handed to ``nlp.pipe`` in ``batch_split_words``.
     """
 
     def __init__(
@@ -55,8 +107,42 @@ class SpacyWordSplitter(WordSplitter):
         lang_model: str = "en_core_web_sm",
         disabled: List[str] = None,
         keep_spacy_tokens: bool = False,
+        tokens_only: bool = False,
+        batch_size: int = 1000,
+        n_process: int = 1,
     ) -> None:
-        self.nlp = get_spacy_model(language, disabled)
+        self.nlp = get_spacy_model(lang_model, DEFAULT_DISABLED_PIPES if disabled is None else disabled)
+        self._keep_spacy_tokens = keep_spacy_tokens and not tokens_only
+        self._tokens_only = tokens_only
+        self.batch_size = batch_size
+        self.n_process = n_process
+        if disabled is None and not self._keep_spacy_tokens:
+            self._skipped_pipes = self.unneeded_pipes(self.nlp)
+        else:
+            self._skipped_pipes = []
+
+    @staticmethod
+    def unneeded_pipes(nlp) -> List[str]:
+        """Names of the components of ``nlp`` that can be skipped when only token boundaries matter.
+
+        Walking the pipeline backwards from the retokenizing pipes, a component is kept when it assigns
+        an attribute that a kept component ``requires``, when it is a ``tok2vec`` a kept component
+        listens to, or when it declares no ``assigns`` at all (e.g. ``attribute_ruler``, which sets POS),
+        since what it sets is then unknown."""
+        needed, listened, kept = set(), set(), set()
+        for name, pipe in reversed(nlp.pipeline):
+            meta = nlp.get_pipe_meta(name)
+            if name in RETOKENIZING_PIPES or name in listened or (needed and not meta.assigns):
+                kept.add(name)
+            elif needed.intersection(meta.assigns):
+                kept.add(name)
+            else:
+                continue
+            needed.update(meta.requires)
+            for tok2vec_name, tok2vec in nlp.pipeline:
+                if name in getattr(tok2vec, "listening_components", ()):
+                    listened.add(tok2vec_name)
+        return [name for name in nlp.pipe_names if name not in kept]
 
     def _sanitize(self, tokens: List[Token]) -> List[WordToken]:
         if self._keep_spacy_tokens:
@@ -65,12 +151,34 @@ class SpacyWordSplitter(WordSplitter):
             return [token.text for token in tokens]
 
     @overrides
-    def batch_split_words(self, sentences: List[str]) -> List[List[WordToken]]:
-        return [self._sanitize(tokens) for tokens in self.nlp.pipe(sentences, n_threads=-1)]
+    def iter_split_words(
+        self, sentences: Iterable[str], batch_size: Optional[int] = None, n_process: Optional[int] = None
+    ) -> Iterator[List[WordToken]]:
+        batch_size = batch_size or self.batch_size
+        n_process = n_process or self.n_process
+        if self._tokens_only:
+            if n_process == 1:
+                docs = self.nlp.tokenizer.pipe(sentences, batch_size=batch_size)
+            else:
+                # the tokenizer has no process pool of its own
+                yield from super().iter_split_words(sentences, batch_size=batch_size, n_process=n_process)
+                return
+        else:
+            docs = self.nlp.pipe(sentences, batch_size=batch_size, n_process=n_process, disable=self._skipped_pipes)
+        for tokens in docs:
+            yield self._sanitize(tokens)
+
+    @overrides
+    def batch_split_words(
+        self, sentences: Iterable[str], batch_size: Optional[int] = None, n_process: Optional[int] = None
+    ) -> List[List[WordToken]]:
+        return list(self.iter_split_words(sentences, batch_size=batch_size, n_process=n_process))
 
     @overrides
     def split_words(self, sentence: str) -> List[WordToken]:
-        return self._sanitize(self.nlp(sentence))
+        if self._tokens_only:
+            return self._sanitize(self.nlp.make_doc(sentence))
+        return self._sanitize(self.nlp(sentence, disable=self._skipped_pipes))
 
 
 def CamelCaseSplitter(WordSplitter):
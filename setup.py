@@ -21,7 +21,7 @@ BASIC_DEPENDENCIES = ["python-dotenv>=1.0.0", "pandas>=1.2.5", "overrides>=7.4.0
 
 SIMILARITY_DEPENDENCIES = ["Metaphone==0.6"]
 
-LANGUAGE_DEPENDENCIES = ["nltk>=3.3", "spacy>=3.0.0,<3.1.0"]
+LANGUAGE_DEPENDENCIES = ["nltk>=3.3", "spacy>=3.0.0,<3.1.0", "scipy>=1.5.0"]
 
 LLM_DEPENDENCIES = ["openai>=0.27.0", "tiktokens>=0.3.3", "tenacity>=8.2.3"]
 
@@ -0,0 +1,316 @@
+# coding: utf-8
+"""Near-duplicate detection with MinHash signatures and LSH banding, for corpora far too large for exact
+pairwise Jaccard: each text is reduced to ``num_perm`` minimum hash values over its word shingles (the
+share of equal values estimates the Jaccard similarity of the shingle sets), and signatures agreeing on
+all rows of at least one band land in a common bucket and become candidates.
+
+With ``b`` bands of ``r`` rows, two texts of Jaccard similarity ``s`` become candidates with probability
+``1 - (1 - s ** r) ** b``; more rows per band favour precision, more bands recall.
+Examples
+---------
+>>> hasher = MinHasher(num_perm=128, shingle_size=1)
+>>> index = LSHIndex(num_perm=128, bands=32)
+>>> signatures = hasher.signatures(["acme corp new york", "Acme Corp, New York!", "globex inc"])
+>>> [result.duplicate_of for result in index.dedupe(signatures, threshold=0.8)]
+[None, 0, None]
+>>> index.query(hasher.signature("globex inc"), threshold=0.8)
+[2]
+"""
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+import os
+import zlib
+import numpy
+from similarity.name_match import name_tokens
+from nlp_utils.word_splitter import WordSplitter, WhiteSpaceSplitter
+from utils.parallel import chunked
+
+MERSENNE_PRIME = (1 << 61) - 1
+# signature value of a text without shingles; such signatures match nothing, as two empty token sets
+# have a similarity of 0.0 in `token_set_similarity`
+EMPTY_HASH = numpy.iinfo(numpy.uint64).max
+# shingles hashed per vectorized step; (num_perm, shingles) intermediates of a few MB stay in cache
+_MAX_STEP_SHINGLES = 512
+_PRIME = numpy.uint64(MERSENNE_PRIME)
+_LOW_31_BITS = numpy.uint64((1 << 31) - 1)
+
+
+def _mod_prime(x: numpy.ndarray, scratch: numpy.ndarray) -> numpy.ndarray:
+    """``x mod (2**61 - 1)`` in place for ``x < 2**63``, by folding the bits above 61 back in (cheaper than
+    ``%``); ``scratch`` is a buffer of the same shape."""
+    numpy.right_shift(x, numpy.uint64(61), out=scratch)
+    x &= _PRIME
+    x += scratch
+    numpy.subtract(x, _PRIME, out=x, where=x >= _PRIME)
+    return x
+
+
+def _universal_hash(a_high: numpy.ndarray, a_low: numpy.ndarray, b: numpy.ndarray, x: numpy.ndarray) -> numpy.ndarray:
+    """``(a * x + b) mod (2**61 - 1)`` for ``a = a_high * 2**30 + a_low < 2**61`` and 32-bit ``x``, in uint64
+    without overflow: ``a_high * x`` is reduced, then multiplied by ``2**30`` as a 61-bit rotation
+    (``2**61`` is 1 modulo the Mersenne prime)."""
+    high = a_high * x
+    scratch = numpy.empty_like(high)
+    _mod_prime(high, scratch)
+    numpy.right_shift(high, numpy.uint64(31), out=scratch)
+    high &= _LOW_31_BITS
+    high <<= numpy.uint64(30)
+    high |= scratch
+    low = a_low * x
+    high += _mod_prime(low, scratch)
+    high += b
+    return _mod_prime(high, scratch)
+
+
+class MinHasher:
+    """MinHash signatures of word shingles. Shingles are the ``shingle_size``-grams of the lowercased
+    alphanumeric tokens (the whole text if it is shorter), hashed with CRC-32, then permuted by ``num_perm``
+    universal hashes ``(a * x + b) mod (2**61 - 1)``."""
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        shingle_size: int = 3,
+        seed: int = 1,
+        word_splitter: WordSplitter = WhiteSpaceSplitter(),
+    ):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.word_splitter = word_splitter
+        rng = numpy.random.RandomState(seed)
+        a = rng.randint(1, MERSENNE_PRIME, size=(num_perm, 1), dtype=numpy.int64).astype(numpy.uint64)
+        self._a_high, self._a_low = a >> numpy.uint64(30), a & numpy.uint64((1 << 30) - 1)
+        self._b = rng.randint(0, MERSENNE_PRIME, size=(num_perm, 1), dtype=numpy.int64).astype(numpy.uint64)
+
+    def shingles(self, text: str) -> List[str]:
+        tokens = name_tokens(text, self.word_splitter)
+        if len(tokens) <= self.shingle_size:
+            return [" ".join(tokens)] if tokens else []
+        size = self.shingle_size
+        return [" ".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)]
+
+    def shingle_hashes(self, text: str) -> numpy.ndarray:
+        return numpy.unique(
+            numpy.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in self.shingles(text)), numpy.uint64)
+        )
+
+    def signature(self, text: str) -> numpy.ndarray:
+        return self.signatures([text])[0]
+
+    def signatures(self, texts: Iterable[str]) -> numpy.ndarray:
+        """``(len(texts), num_perm)`` uint64 signatures. The shingle hashes of consecutive texts are
+        permuted together and reduced per text with ``numpy.minimum.reduceat``."""
+        hashes = [self.shingle_hashes(text) for text in texts]
+        signatures = numpy.full((len(hashes), self.num_perm), EMPTY_HASH, dtype=numpy.uint64)
+        start = 0
+        while start < len(hashes):
+            end, num_shingles = start, 0
+            while end < len(hashes) and (end == start or num_shingles + len(hashes[end]) <= _MAX_STEP_SHINGLES):
+                num_shingles += len(hashes[end])
+                end += 1
+            rows = [row for row in range(start, end) if len(hashes[row])]
+            if rows:
+                step = numpy.concatenate([hashes[row] for row in rows])
+                permuted = _universal_hash(self._a_high, self._a_low, self._b, step)
+                offsets = numpy.cumsum([0] + [len(hashes[row]) for row in rows[:-1]])
+                signatures[rows] = numpy.minimum.reduceat(permuted, offsets, axis=1).T
+            start = end
+        return signatures
+
+    def iter_signatures(self, texts: Iterable[str], batch_size: int = 1000) -> Iterator[numpy.ndarray]:
+        """Lazily yield the signature of each of ``texts``, hashing ``batch_size`` texts at a time."""
+        for batch in chunked(texts, batch_size):
+            yield from self.signatures(batch)
+
+
+def jaccard_estimate(signature: numpy.ndarray, signatures: numpy.ndarray) -> numpy.ndarray:
+    """Estimated Jaccard similarity of ``signature`` with each row of ``signatures``; 0.0 when either is the
+    signature of a text without shingles."""
+    return ((signatures == signature) & (signatures != EMPTY_HASH)).mean(axis=-1)
+
+
+class SignatureStore:
+    """Append-only ``(n, num_perm)`` uint64 signature rows in a raw file, read through ``numpy.memmap``, so
+    signatures persist between runs and only the rows being read are paged in. Appends collect in a buffer
+    of ``buffer_rows`` rows that is written (and the file re-mapped) when full, on ``flush`` or ``close``.
+    ``path=None`` keeps the rows in memory."""
+
+    def __init__(self, num_perm: int, path: Optional[Union[str, os.PathLike]] = None, buffer_rows: int = 4096):
+        self.num_perm = num_perm
+        self.path = path
+        self._buffer = numpy.empty((buffer_rows, num_perm), dtype=numpy.uint64)
+        self._buffered = 0
+        self._flushed = 0
+        self._mapped: Optional[numpy.ndarray] = None
+        self._memory = numpy.empty((0, num_perm), dtype=numpy.uint64)
+        if path is not None and os.path.exists(path):
+            size, row_bytes = os.path.getsize(path), num_perm * numpy.dtype(numpy.uint64).itemsize
+            if size % row_bytes:
+                raise ValueError(f"{path} does not hold signatures of {num_perm} values")
+            self._flushed = size // row_bytes
+
+    def append(self, signatures: numpy.ndarray) -> range:
+        """Store ``signatures`` (one row or a 2-D block) and return their row ids."""
+        signatures = numpy.asarray(signatures, dtype=numpy.uint64).reshape(-1, self.num_perm)
+        ids = range(len(self), len(self) + len(signatures))
+        start = 0
+        while start < len(signatures):
+            count = min(len(signatures) - start, len(self._buffer) - self._buffered)
+            self._buffer[self._buffered : self._buffered + count] = signatures[start : start + count]
+            self._buffered += count
+            start += count
+            if self._buffered == len(self._buffer):
+                self.flush()
+        return ids
+
+    def flush(self) -> None:
+        if not self._buffered:
+            return
+        block = self._buffer[: self._buffered]
+        if self.path is None:
+            if self._flushed + self._buffered > len(self._memory):
+                capacity = max(2 * len(self._memory), self._flushed + self._buffered)
+                grown = numpy.empty((capacity, self.num_perm), dtype=numpy.uint64)
+                grown[: self._flushed] = self._memory[: self._flushed]
+                self._memory = grown
+            self._memory[self._flushed : self._flushed + self._buffered] = block
+        else:
+            with open(self.path, "ab") as f:
+                f.write(block.tobytes())
+            self._mapped = None
+        self._flushed += self._buffered
+        self._buffered = 0
+
+    def _flushed_rows(self) -> numpy.ndarray:
+        if self.path is None:
+            return self._memory[: self._flushed]
+        if self._mapped is None:
+            if self._flushed == 0:
+                return numpy.empty((0, self.num_perm), dtype=numpy.uint64)
+            self._mapped = numpy.memmap(self.path, dtype=numpy.uint64, mode="r", shape=(self._flushed, self.num_perm))
+        return self._mapped
+
+    @property
+    def rows(self) -> numpy.ndarray:
+        """All stored rows, after writing the buffered ones."""
+        self.flush()
+        return self._flushed_rows()
+
+    def __getitem__(self, ids) -> numpy.ndarray:
+        """Rows of ``ids`` (an int or a sequence of ints), buffered ones included."""
+        ids = numpy.asarray(ids, dtype=numpy.int64)
+        rows = numpy.empty(ids.shape + (self.num_perm,), dtype=numpy.uint64)
+        flushed = ids < self._flushed
+        rows[flushed] = self._flushed_rows()[ids[flushed]]
+        rows[~flushed] = self._buffer[ids[~flushed] - self._flushed]
+        return rows
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "SignatureStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._flushed + self._buffered
+
+
+class DedupeResult(NamedTuple):
+    signature_id: int
+    duplicate_of: Optional[int]  # id of the most similar earlier signature, None for a new one
+    similarity: float  # estimated Jaccard similarity with `duplicate_of`, 0.0 for a new one
+
+
+class LSHIndex:
+    """LSH banding index over MinHash signatures of ``num_perm`` values: ``bands`` bands of ``rows`` rows
+    (``num_perm // bands`` by default) each hash to a bucket. Signatures are kept in ``store`` so candidates
+    can be checked against an estimated Jaccard threshold; ids are their row in the store. Rebuild an
+    index over a persisted store with ``LSHIndex(..., store=SignatureStore(num_perm, path)).reindex()``.
+    Signatures of texts without shingles are stored but never bucketed, so they have no candidates."""
+
+    def __init__(
+        self, num_perm: int = 128, bands: int = 16, rows: Optional[int] = None, store: Optional[SignatureStore] = None
+    ):
+        rows = rows or num_perm // bands
+        if bands * rows > num_perm:
+            raise ValueError(f"{bands} bands of {rows} rows need more than {num_perm} signature values")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = rows
+        self.store = store if store is not None else SignatureStore(num_perm)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+
+    def _band_keys(self, signature: numpy.ndarray) -> Iterator[bytes]:
+        for band in range(self.bands):
+            yield signature[band * self.rows : (band + 1) * self.rows].tobytes()
+
+    def _add_to_buckets(self, signature_id: int, signature: numpy.ndarray) -> None:
+        if signature[0] == EMPTY_HASH:
+            return
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(key, []).append(signature_id)
+
+    def insert(self, signature: numpy.ndarray) -> int:
+        """Store and index ``signature``; return its id."""
+        signature = numpy.asarray(signature, dtype=numpy.uint64)
+        signature_id = self.store.append(signature)[0]
+        self._add_to_buckets(signature_id, signature)
+        return signature_id
+
+    def reindex(self, dedupe_threshold: Optional[float] = None) -> "LSHIndex":
+        """Rebuild the buckets from the signatures of the store. For a store written by ``dedupe``, pass its
+        ``threshold`` as ``dedupe_threshold``: the rows are replayed in order and the duplicates left out
+        again, so the rebuilt index behaves as the one that wrote the store."""
+        self._buckets = [{} for _ in range(self.bands)]
+        for signature_id, signature in enumerate(self.store.rows):
+            if dedupe_threshold is None or self._best_match(signature, dedupe_threshold)[0] is None:
+                self._add_to_buckets(signature_id, signature)
+        return self
+
+    def candidates(self, signature: numpy.ndarray) -> List[int]:
+        """Ids sharing at least one band bucket with ``signature``."""
+        signature = numpy.asarray(signature, dtype=numpy.uint64)
+        if signature[0] == EMPTY_HASH:
+            return []
+        candidates = set()
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(buckets.get(key, ()))
+        return sorted(candidates)
+
+    def query(self, signature: numpy.ndarray, threshold: Optional[float] = None) -> List[int]:
+        """Candidate ids of ``signature``, only those with an estimated Jaccard of at least ``threshold``
+        if one is given."""
+        candidates = self.candidates(signature)
+        if threshold is None or not candidates:
+            return candidates
+        similarities = jaccard_estimate(numpy.asarray(signature, dtype=numpy.uint64), self.store[candidates])
+        return [candidate for candidate, similarity in zip(candidates, similarities) if similarity >= threshold]
+
+    def _best_match(self, signature: numpy.ndarray, threshold: float) -> Tuple[Optional[int], float]:
+        """The most similar candidate of ``signature`` and its similarity if it reaches ``threshold``,
+        otherwise ``(None, 0.0)``."""
+        candidates = self.candidates(signature)
+        if candidates:
+            similarities = jaccard_estimate(signature, self.store[candidates])
+            best_index = int(similarities.argmax())
+            if similarities[best_index] >= threshold:
+                return candidates[best_index], float(similarities[best_index])
+        return None, 0.0
+
+    def dedupe(self, signatures: Iterable[numpy.ndarray], threshold: float = 0.8) -> Iterator[DedupeResult]:
+        """Stream over ``signatures``, storing each one and telling whether it duplicates an earlier one (the
+        most similar candidate at ``threshold`` or above). Only new signatures enter the buckets, so buckets
+        do not fill up with copies."""
+        for signature in signatures:
+            signature = numpy.asarray(signature, dtype=numpy.uint64)
+            duplicate_of, best = self._best_match(signature, threshold)
+            signature_id = self.store.append(signature)[0]
+            if duplicate_of is None:
+                self._add_to_buckets(signature_id, signature)
+            yield DedupeResult(signature_id, duplicate_of, best)
+
+    def __len__(self) -> int:
+        return len(self.store)
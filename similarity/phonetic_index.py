@@ -0,0 +1,96 @@
+# coding: utf-8
+"""Bulk phonetic matching: the double metaphone keys of each name are computed once and the names are
+bucketed by primary and by alternate key, so finding the names that ``double_metaphone_compare`` would
+accept for a query is a dictionary lookup instead of a scan of every name.
+
+Unlike ``double_metaphone_compare``, an empty key means "no key" and matches nothing: most names have no
+alternate key, and a bucket of all of them would turn every WEAK lookup back into a scan.
+Examples
+---------
+>>> index = PhoneticIndex().build(["Smith", "Schmidt", "Catherine", "Kathryn"])
+>>> index.candidates("Smyth", Threshold.STRONG)
+['Smith']
+>>> index.candidates("Smith", Threshold.NORMAL)
+['Schmidt']
+"""
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from itertools import chain
+import os
+import pickle
+from similarity.name_match import Threshold, double_metaphone
+from utils.parallel import chunked, imap_ordered
+
+
+def _phonetic_keys(names: List[str]) -> List[Tuple[str, Tuple[str, str]]]:
+    return [(name, double_metaphone(name)) for name in names]
+
+
+class PhoneticIndex:
+    """Names bucketed by their double metaphone keys. Names keep the id of their insertion order, so
+    duplicates (e.g. the rows of a table) are all returned."""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.keys: List[Tuple[str, str]] = []
+        self._primary: Dict[str, List[int]] = {}
+        self._alternate: Dict[str, List[int]] = {}
+
+    def _insert(self, name: str, keys: Tuple[str, str]) -> int:
+        name_id = len(self.names)
+        self.names.append(name)
+        self.keys.append(keys)
+        # empty keys are not bucketed, see the module docstring
+        if keys[0]:
+            self._primary.setdefault(keys[0], []).append(name_id)
+        if keys[1]:
+            self._alternate.setdefault(keys[1], []).append(name_id)
+        return name_id
+
+    def add(self, name: str) -> int:
+        """Index ``name`` and return its id."""
+        return self._insert(name, double_metaphone(name))
+
+    def build(self, names: Iterable[str], n_jobs: Optional[int] = 1, chunk_size: int = 10000) -> "PhoneticIndex":
+        """Index all of ``names``; with ``n_jobs`` other than 1 the keys are computed in a process pool,
+        ``chunk_size`` names per task."""
+        if n_jobs == 1:
+            for name in names:
+                self.add(name)
+            return self
+        for keyed_names in imap_ordered(_phonetic_keys, chunked(names, chunk_size), n_jobs=n_jobs):
+            for name, keys in keyed_names:
+                self._insert(name, keys)
+        return self
+
+    def candidate_ids(self, name: str, threshold: float = Threshold.NORMAL) -> List[int]:
+        """Ids, in insertion order, of the indexed names that ``double_metaphone_compare`` matches with
+        ``name`` at ``threshold``: equal alternate keys (WEAK), one's primary key equal to the other's
+        alternate key (NORMAL), equal primary keys (STRONG). Keys only match when they are not empty."""
+        primary, alternate = double_metaphone(name)
+        if threshold == Threshold.WEAK:
+            return list(self._alternate.get(alternate, ())) if alternate else []
+        elif threshold == Threshold.NORMAL:
+            by_primary = self._alternate.get(primary, ()) if primary else ()
+            by_alternate = self._primary.get(alternate, ()) if alternate else ()
+            return sorted(set(chain(by_primary, by_alternate)))
+        return list(self._primary.get(primary, ())) if primary else []
+
+    def candidates(self, name: str, threshold: float = Threshold.NORMAL) -> List[str]:
+        return [self.names[name_id] for name_id in self.candidate_ids(name, threshold)]
+
+    def to_disk(self, path: Union[str, os.PathLike]) -> None:
+        # the buckets are rebuilt on load from the keys, which are the costly part
+        with open(path, "wb") as f:
+            pickle.dump((self.names, self.keys), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def from_disk(cls, path: Union[str, os.PathLike]) -> "PhoneticIndex":
+        with open(path, "rb") as f:
+            names, keys = pickle.load(f)
+        index = cls()
+        for name, name_keys in zip(names, keys):
+            index._insert(name, name_keys)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.names)
@@ -0,0 +1,181 @@
+# coding: utf-8
+"""Fuzzy record linkage of two name lists with blocking: the right-hand names are indexed by one or more
+blocking keys (phonetic key, first token, prefix of the sorted tokens, or any callable), each left-hand
+name is only scored against the names sharing one of its keys, and the pairs scoring above a threshold
+are streamed out.
+Examples
+---------
+>>> linker = RecordLinker(blocking=("phonetic", "first_token"))
+>>> list(linker.link(["Acme Corp", "Globex Inc"], ["ACME Corporation", "Acme Corp.", "Initech"], threshold=0.5))
+[LinkMatch(left_id=0, right_id=1, left='Acme Corp', right='Acme Corp.', score=1.0)]
+>>> linker.stats
+LinkageStats(left=2, right=3, pairs_compared=2, matches=1)
+"""
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from functools import partial
+from similarity.name_match import double_metaphone, name_tokens, token_set_similarity
+from nlp_utils.word_splitter import WordSplitter, WhiteSpaceSplitter
+from utils.parallel import chunked, imap_ordered
+
+BlockingKey = Callable[[List[str]], Iterable[str]]
+
+
+def phonetic_key(tokens: List[str]) -> List[str]:
+    """Primary and alternate double metaphone keys of the whole name."""
+    primary, alternate = double_metaphone(" ".join(tokens))
+    return [key for key in {primary, alternate} if key]
+
+
+def first_token_key(tokens: List[str]) -> List[str]:
+    return tokens[:1]
+
+
+def sorted_token_prefix_key(tokens: List[str], length: int = 6) -> List[str]:
+    """First ``length`` characters of the tokens sorted and joined, so word order does not matter."""
+    return ["".join(sorted(tokens))[:length]] if tokens else []
+
+
+BLOCKING_KEYS: Dict[str, BlockingKey] = {
+    "phonetic": phonetic_key,
+    "first_token": first_token_key,
+    "sorted_prefix": sorted_token_prefix_key,
+}
+
+
+class LinkMatch(NamedTuple):
+    left_id: int
+    right_id: int
+    left: str
+    right: str
+    score: float
+
+
+class LinkageStats(NamedTuple):
+    left: int
+    right: int
+    pairs_compared: int
+    matches: int
+
+    @property
+    def total_pairs(self) -> int:
+        return self.left * self.right
+
+    @property
+    def reduction_ratio(self) -> float:
+        """Share of all possible pairs that blocking spared from scoring."""
+        return 1.0 - self.pairs_compared / self.total_pairs if self.total_pairs else 0.0
+
+
+_WORKER_LINKER: Optional["RecordLinker"] = None
+
+
+def _init_link_worker(linker: "RecordLinker"):
+    global _WORKER_LINKER
+    _WORKER_LINKER = linker
+
+
+def _link_chunk(chunk: List[Tuple[int, str]], threshold: float) -> Tuple[List[LinkMatch], int, int]:
+    return _WORKER_LINKER._link_chunk(chunk, threshold)
+
+
+class RecordLinker:
+    """Link names to an indexed list of names. ``blocking`` names entries of ``BLOCKING_KEYS`` or gives
+    callables from the name tokens to keys; two names are compared when they share a key of the same
+    blocking. Blocks holding more than ``max_block_size`` right-hand names (e.g. a first token like "the")
+    are not used. ``scorer(left, right)`` defaults to the token overlap of ``similarity_token_count``,
+    computed on tokens split once per name."""
+
+    def __init__(
+        self,
+        blocking: Sequence[Union[str, BlockingKey]] = ("phonetic", "first_token", "sorted_prefix"),
+        scorer: Optional[Callable[[str, str], float]] = None,
+        word_splitter: WordSplitter = WhiteSpaceSplitter(),
+        max_block_size: Optional[int] = None,
+    ):
+        self.blocking = [BLOCKING_KEYS[key] if isinstance(key, str) else key for key in blocking]
+        self.scorer = scorer
+        self.word_splitter = word_splitter
+        self.max_block_size = max_block_size
+        self.stats = LinkageStats(0, 0, 0, 0)
+        self._right: List[str] = []
+        self._right_tokens: List[frozenset] = []
+        self._blocks: Dict[Tuple[int, str], List[int]] = {}
+
+    def _block_keys(self, tokens: List[str]) -> Iterator[Tuple[int, str]]:
+        for blocking_id, blocking_key in enumerate(self.blocking):
+            for key in blocking_key(tokens):
+                yield blocking_id, key
+
+    def index(self, names: Iterable[str]) -> "RecordLinker":
+        """Index the right-hand ``names``, replacing any previous ones."""
+        self._right, self._right_tokens, self._blocks = [], [], {}
+        for right_id, name in enumerate(names):
+            tokens = name_tokens(name, self.word_splitter)
+            self._right.append(name)
+            self._right_tokens.append(frozenset(tokens))
+            for block_key in set(self._block_keys(tokens)):
+                self._blocks.setdefault(block_key, []).append(right_id)
+        if self.max_block_size is not None:
+            self._blocks = {key: ids for key, ids in self._blocks.items() if len(ids) <= self.max_block_size}
+        return self
+
+    def candidate_ids(self, name: str) -> List[int]:
+        """Ids of the indexed names sharing a blocking key with ``name``."""
+        tokens = name_tokens(name, self.word_splitter)
+        return self._candidates(tokens)
+
+    def _candidates(self, tokens: List[str]) -> List[int]:
+        candidates = set()
+        for block_key in self._block_keys(tokens):
+            candidates.update(self._blocks.get(block_key, ()))
+        return sorted(candidates)
+
+    def _link_chunk(self, chunk: List[Tuple[int, str]], threshold: float) -> Tuple[List[LinkMatch], int, int]:
+        """Matches of a chunk of ``(left_id, name)``, with the number of names and of pairs scored."""
+        matches = []
+        pairs_compared = 0
+        for left_id, name in chunk:
+            tokens = name_tokens(name, self.word_splitter)
+            candidates = self._candidates(tokens)
+            pairs_compared += len(candidates)
+            token_set = frozenset(tokens)
+            for right_id in candidates:
+                if self.scorer is None:
+                    score = token_set_similarity(token_set, self._right_tokens[right_id])
+                else:
+                    score = self.scorer(name, self._right[right_id])
+                if score >= threshold:
+                    matches.append(LinkMatch(left_id, right_id, name, self._right[right_id], score))
+        return matches, len(chunk), pairs_compared
+
+    def link(
+        self,
+        left: Iterable[str],
+        right: Optional[Iterable[str]] = None,
+        threshold: float = 0.5,
+        n_jobs: Optional[int] = 1,
+        chunk_size: int = 10000,
+    ) -> Iterator[LinkMatch]:
+        """Lazily yield the matches of the ``left`` names, in order, against ``right`` (indexed first) or the
+        names already indexed. With ``n_jobs`` other than 1, chunks of ``chunk_size`` left names are scored
+        in a process pool. ``stats`` is updated as the matches stream out."""
+        if right is not None:
+            self.index(right)
+        self.stats = LinkageStats(0, len(self._right), 0, 0)
+        chunks = chunked(enumerate(left), chunk_size)
+        if n_jobs == 1:
+            results = (self._link_chunk(chunk, threshold) for chunk in chunks)
+        else:
+            results = imap_ordered(
+                partial(_link_chunk, threshold=threshold),
+                chunks,
+                n_jobs=n_jobs,
+                initializer=_init_link_worker,
+                initargs=(self,),
+            )
+        for matches, num_left, pairs_compared in results:
+            stats = self.stats
+            self.stats = LinkageStats(
+                stats.left + num_left, stats.right, stats.pairs_compared + pairs_compared, stats.matches + len(matches)
+            )
+            yield from matches
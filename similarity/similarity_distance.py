@@ -1,6 +1,130 @@
 #!/usr/bin/env python
+from typing import Iterator, Optional, Tuple
 from math import *
 from decimal import Decimal
+import numpy
+
+METRICS = ("euclidean", "manhattan", "minkowski", "cosine")
+# bytes of the largest intermediate array of a block; bounds memory whatever the input sizes
+BLOCK_BYTES = 1 << 26
+
+
+def _as_matrix(x, dtype=None) -> numpy.ndarray:
+    """2-D float array of ``x`` (a vector is one row): float32 input stays float32 unless ``dtype`` says
+    otherwise, anything else becomes float64."""
+    x = numpy.asarray(x)
+    if dtype is None:
+        dtype = x.dtype if x.dtype in (numpy.float32, numpy.float64) else numpy.float64
+    x = numpy.asarray(x, dtype=dtype)
+    if x.ndim == 1:
+        x = x[None, :]
+    if x.ndim != 2:
+        raise ValueError(f"expected a vector or a 2-D array, got {x.ndim} dimensions")
+    return x
+
+
+def _normalized_rows(x: numpy.ndarray) -> numpy.ndarray:
+    norms = numpy.sqrt(numpy.einsum("ij,ij->i", x, x))
+    norms[norms == 0] = 1  # zero vectors stay zero, with a cosine similarity of 0 to anything
+    return x / norms[:, None]
+
+
+def _minkowski_block(x: numpy.ndarray, y: numpy.ndarray, p: float, y_rows: int) -> numpy.ndarray:
+    result = numpy.empty((len(x), len(y)), dtype=x.dtype)
+    for start in range(0, len(y), y_rows):
+        diff = numpy.abs(x[:, None, :] - y[None, start : start + y_rows, :])
+        if p == 1:
+            result[:, start : start + y_rows] = diff.sum(axis=-1)
+        else:
+            result[:, start : start + y_rows] = (diff ** p).sum(axis=-1) ** (1.0 / p)
+    return result
+
+
+def iter_pairwise_blocks(
+    x, y=None, metric: str = "euclidean", p: float = 2, dtype=None, block_size: Optional[int] = None
+) -> Iterator[Tuple[int, numpy.ndarray]]:
+    """Yield ``(start, block)`` where ``block`` holds the ``metric`` values of rows ``start:start + len(block)``
+    of ``x`` against every row of ``y`` (``x`` itself by default). "cosine" gives similarities, the other
+    metrics distances. Blocks hold ``block_size`` rows, by default as many as keep the largest
+    intermediate within ``BLOCK_BYTES``, so a matrix too large for memory can be streamed to disk.
+
+    "euclidean" expands ``|x - y|^2`` as ``|x|^2 + |y|^2 - 2 x.y``, accumulated in float64 whatever the
+    input dtype. The cancellation leaves an absolute error of about ``1e-8 * |x|`` (more for very long
+    rows), so near-duplicate rows of large norm come out a little apart; "minkowski" with ``p=2`` computes
+    the differences directly when such small distances matter."""
+    if metric not in METRICS:
+        raise ValueError(f"unknown metric {metric!r}, expected one of {METRICS}")
+    x = _as_matrix(x, dtype)
+    y = x if y is None else _as_matrix(y, x.dtype)
+    if x.shape[1] != y.shape[1]:
+        raise ValueError(f"x and y have {x.shape[1]} and {y.shape[1]} columns")
+    itemsize = x.dtype.itemsize
+    num_y, num_columns = y.shape
+    if metric == "euclidean":
+        # float64 copies of the rows keep the expansion's cancellation error small for float32 input
+        x64, y64 = x.astype(numpy.float64, copy=False), y.astype(numpy.float64, copy=False)
+        itemsize = numpy.dtype(numpy.float64).itemsize
+    if metric in ("euclidean", "cosine"):
+        # a matrix product per block; the block result is the only intermediate
+        rows = block_size or max(1, BLOCK_BYTES // max(1, num_y * itemsize))
+        y_rows = num_y
+    else:
+        # the broadcast difference of a block of x and a slice of y is the intermediate
+        y_rows = max(1, min(num_y, BLOCK_BYTES // max(1, num_columns * itemsize)))
+        rows = block_size or max(1, BLOCK_BYTES // max(1, y_rows * num_columns * itemsize))
+    if metric == "euclidean":
+        y_squared = numpy.einsum("ij,ij->i", y64, y64)
+    elif metric == "cosine":
+        y_normalized = _normalized_rows(y)
+    for start in range(0, len(x), rows):
+        x_block = x[start : start + rows]
+        if metric == "euclidean":
+            x64_block = x64[start : start + rows]
+            block = x64_block @ y64.T
+            block *= -2
+            block += numpy.einsum("ij,ij->i", x64_block, x64_block)[:, None]
+            block += y_squared[None, :]
+            numpy.maximum(block, 0, out=block)
+            block = numpy.sqrt(block, out=block).astype(x.dtype, copy=False)
+            if y is x:
+                # the expansion leaves rounding noise where a row meets itself
+                diagonal = numpy.arange(len(block))
+                block[diagonal, start + diagonal] = 0
+        elif metric == "cosine":
+            block = _normalized_rows(x_block) @ y_normalized.T
+        else:
+            block = _minkowski_block(x_block, y, 1 if metric == "manhattan" else p, y_rows)
+        yield start, block
+
+
+def pairwise(
+    x, y=None, metric: str = "euclidean", p: float = 2, dtype=None, block_size: Optional[int] = None, out=None
+) -> numpy.ndarray:
+    """Full ``len(x) x len(y)`` matrix of ``metric`` (see ``iter_pairwise_blocks``), computed block by block
+    into ``out`` if given (e.g. a ``numpy.memmap``)."""
+    x = _as_matrix(x, dtype)
+    num_y = len(x) if y is None else len(_as_matrix(y))
+    if out is None:
+        out = numpy.empty((len(x), num_y), dtype=x.dtype)
+    for start, block in iter_pairwise_blocks(x, y, metric, p, x.dtype, block_size):
+        out[start : start + len(block)] = block
+    return out
+
+
+def euclidean_distances(x, y=None, dtype=None, block_size: Optional[int] = None) -> numpy.ndarray:
+    return pairwise(x, y, "euclidean", dtype=dtype, block_size=block_size)
+
+
+def manhattan_distances(x, y=None, dtype=None, block_size: Optional[int] = None) -> numpy.ndarray:
+    return pairwise(x, y, "manhattan", dtype=dtype, block_size=block_size)
+
+
+def minkowski_distances(x, y=None, p: float = 2, dtype=None, block_size: Optional[int] = None) -> numpy.ndarray:
+    return pairwise(x, y, "minkowski", p=p, dtype=dtype, block_size=block_size)
+
+
+def cosine_similarities(x, y=None, dtype=None, block_size: Optional[int] = None) -> numpy.ndarray:
+    return pairwise(x, y, "cosine", dtype=dtype, block_size=block_size)
 
 
 def analogy(model, x1, x2, y1):
@@ -14,17 +138,32 @@ class Similarity:
 
     """ Five similarity measures function """
 
+    @staticmethod
+    def _paired(x, y) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """``x`` and ``y`` cut to the shorter length, as pairing them with ``zip`` does."""
+        x, y = numpy.asarray(x), numpy.asarray(y)
+        length = min(len(x), len(y))
+        return x[:length], y[:length]
+
     def euclidean_distance(self, x, y):
         """ return euclidean distance between two lists """
-        return sqrt(sum(pow(a - b, 2) for a, b in zip(x, y)))
+        # one pair is computed from its differences; the matrix kernel's expansion would cancel out small
+        # distances between large vectors
+        x, y = self._paired(x, y)
+        return float(numpy.sqrt(((_as_matrix(x, numpy.float64) - _as_matrix(y, numpy.float64)) ** 2).sum()))
 
     def manhattan_distance(self, x, y):
         """ return manhattan distance between two lists """
-        return sum(abs(a - b) for a, b in zip(x, y))
+        x, y = self._paired(x, y)
+        if x.dtype.kind in "iub" and y.dtype.kind in "iub":
+            # integer input keeps an integer distance
+            return int(manhattan_distances(x, y, dtype=numpy.int64)[0, 0])
+        return float(manhattan_distances(x, y, dtype=numpy.float64)[0, 0])
 
     def minkowski_distance(self, x, y, p_value):
         """ return minkowski distance between two lists """
-        return self.nth_root(sum(pow(abs(a - b), p_value) for a, b in zip(x, y)), p_value)
+        distance = minkowski_distances(*self._paired(x, y), p_value, dtype=numpy.float64)[0, 0]
+        return round(Decimal(float(distance)), 3)
 
     def nth_root(self, value, n_root):
         """ returns the n_root of an value """
@@ -33,9 +172,7 @@ class Similarity:
 
     def cosine_similarity(self, x, y):
         """ return cosine similarity between two lists """
-        numerator = sum(a * b for a, b in zip(x, y))
-        denominator = self.square_rooted(x) * self.square_rooted(y)
-        return round(numerator / float(denominator), 3)
+        return round(float(cosine_similarities(*self._paired(x, y), dtype=numpy.float64)[0, 0]), 3)
 
     def square_rooted(self, x):
         """ return 3 rounded square rooted value """
@@ -0,0 +1,128 @@
+# coding: utf-8
+"""Batch version of ``similarity_token_count``: every string is tokenized once, its token set becomes a
+binary row of a sparse CSR matrix over a shared vocabulary, and Jaccard similarities of many pairs, of a
+whole query-by-corpus matrix or of each query's top-k corpus rows come from sparse products
+(``|A & B|`` is the dot product of two binary rows) without a dense result.
+Examples
+---------
+>>> token_matrix = TokenMatrix()
+>>> corpus = token_matrix.encode(["Acme Corp", "Globex Inc", "Acme Inc"])
+>>> queries = token_matrix.encode(["acme corp.", "Initech Inc"], add=False)
+>>> jaccard_matrix(queries, corpus).toarray().round(3)
+array([[1.   , 0.   , 0.333],
+       [0.   , 0.333, 0.333]])
+>>> [(rows.tolist(), scores.round(3).tolist()) for rows, scores in top_k_jaccard(queries, corpus, k=1)]
+[([0], [1.0]), ([1], [0.333])]
+"""
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+import numpy
+from scipy import sparse
+from similarity.name_match import name_tokens
+from nlp_utils.vocabulary import Vocabulary
+from nlp_utils.word_splitter import WordSplitter, WhiteSpaceSplitter
+
+
+class TokenSets(NamedTuple):
+    matrix: sparse.csr_matrix  # binary rows over the vocabulary
+    sizes: numpy.ndarray  # distinct tokens of each row, out-of-vocabulary ones included
+
+    @property
+    def num_rows(self) -> int:
+        return self.matrix.shape[0]
+
+
+class TokenMatrix:
+    """Encode strings as token sets over a growing ``Vocabulary``, tokenized as ``similarity_token_count``
+    does (lowercased, non-alphanumeric characters as spaces, split by ``word_splitter``)."""
+
+    def __init__(self, word_splitter: WordSplitter = WhiteSpaceSplitter(), vocab: Optional[Vocabulary] = None):
+        self.word_splitter = word_splitter
+        self.vocab = vocab if vocab is not None else Vocabulary()
+
+    def encode(self, texts: Iterable[str], add: bool = True) -> TokenSets:
+        """Token sets of ``texts``. With ``add=False`` unknown tokens get no column but still count in
+        ``sizes``, so they lower the similarity as they would pairwise."""
+        lookup = self.vocab.add if add else self.vocab.get
+        indptr = [0]
+        indices: List[int] = []
+        sizes: List[int] = []
+        for text in texts:
+            tokens = set(name_tokens(text, self.word_splitter))
+            known = sorted(token_id for token_id in map(lookup, tokens) if token_id is not None)
+            indices.extend(known)
+            indptr.append(len(indices))
+            sizes.append(len(tokens))
+        matrix = sparse.csr_matrix(
+            (numpy.ones(len(indices), dtype=numpy.int32), numpy.array(indices, dtype=numpy.int64), indptr),
+            shape=(len(sizes), len(self.vocab)),
+        )
+        return TokenSets(matrix, numpy.array(sizes, dtype=numpy.int64))
+
+
+def _aligned(left: sparse.csr_matrix, right: sparse.csr_matrix) -> Tuple[sparse.csr_matrix, sparse.csr_matrix]:
+    """Give both matrices the wider column count; rows encoded before the vocabulary grew are narrower."""
+    num_columns = max(left.shape[1], right.shape[1])
+
+    def widened(matrix):
+        if matrix.shape[1] == num_columns:
+            return matrix
+        return sparse.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], num_columns))
+
+    return widened(left), widened(right)
+
+
+def _jaccard(intersections: numpy.ndarray, left_sizes: numpy.ndarray, right_sizes: numpy.ndarray) -> numpy.ndarray:
+    unions = left_sizes + right_sizes - intersections
+    scores = numpy.zeros(len(intersections))
+    numpy.divide(intersections, unions, out=scores, where=unions > 0)
+    return scores
+
+
+def paired_jaccard(left: TokenSets, right: TokenSets) -> numpy.ndarray:
+    """Jaccard similarity of row ``i`` of ``left`` with row ``i`` of ``right``, for every ``i``."""
+    if left.num_rows != right.num_rows:
+        raise ValueError(f"paired token sets must have as many rows, got {left.num_rows} and {right.num_rows}")
+    left_matrix, right_matrix = _aligned(left.matrix, right.matrix)
+    intersections = numpy.asarray(left_matrix.multiply(right_matrix).sum(axis=1)).ravel()
+    return _jaccard(intersections, left.sizes, right.sizes)
+
+
+def jaccard_matrix(queries: TokenSets, corpus: TokenSets) -> sparse.csr_matrix:
+    """Sparse ``queries x corpus`` Jaccard similarities; pairs without a common token are not stored."""
+    query_matrix, corpus_matrix = _aligned(queries.matrix, corpus.matrix)
+    intersections = (query_matrix @ corpus_matrix.T).tocsr()
+    intersections.sort_indices()
+    rows = numpy.repeat(numpy.arange(intersections.shape[0]), numpy.diff(intersections.indptr))
+    data = _jaccard(intersections.data, queries.sizes[rows], corpus.sizes[intersections.indices])
+    return sparse.csr_matrix((data, intersections.indices, intersections.indptr), shape=intersections.shape)
+
+
+def top_k_jaccard(
+    queries: TokenSets, corpus: TokenSets, k: int, batch_size: int = 1024
+) -> List[Tuple[numpy.ndarray, numpy.ndarray]]:
+    """For each query, the corpus rows of its ``k`` highest non-zero similarities and the scores, best first
+    (ties by row). Queries are scored ``batch_size`` at a time, so memory is bounded by the non-zeros of a
+    batch."""
+    results = []
+    for start in range(0, queries.num_rows, batch_size):
+        batch = TokenSets(queries.matrix[start : start + batch_size], queries.sizes[start : start + batch_size])
+        scores = jaccard_matrix(batch, corpus)
+        for row in range(scores.shape[0]):
+            row_start, row_end = scores.indptr[row], scores.indptr[row + 1]
+            columns, row_scores = scores.indices[row_start:row_end], scores.data[row_start:row_end]
+            if len(row_scores) > k:
+                keep = numpy.argpartition(-row_scores, k - 1)[:k]
+                # keep every row tied with the k-th score so ties resolve by row, not by partition order
+                keep = row_scores >= row_scores[keep].min()
+                columns, row_scores = columns[keep], row_scores[keep]
+            order = numpy.lexsort((columns, -row_scores))[:k]
+            results.append((columns[order], row_scores[order]))
+    return results
+
+
+def similarity_token_counts(
+    texts1: Iterable[str], texts2: Iterable[str], word_splitter: WordSplitter = WhiteSpaceSplitter()
+) -> numpy.ndarray:
+    """``similarity_token_count`` of each pair of ``zip(texts1, texts2)``, tokenizing each string once."""
+    token_matrix = TokenMatrix(word_splitter)
+    return paired_jaccard(token_matrix.encode(texts1), token_matrix.encode(texts2))
@@ -0,0 +1,37 @@
+import pytest
+import spacy
+from spacy.language import Language
+from spacy.tokens import Doc
+
+
+@Language.component("test_chain_parser")
+def chain_parser(doc):
+    """Tag words longer than three letters as nouns and chain every sentence of eight tokens."""
+    num_tokens = len(doc)
+    heads = [i + 1 if (i + 1) % 8 and i + 1 < num_tokens else i for i in range(num_tokens)]
+    return Doc(
+        doc.vocab,
+        words=[token.text for token in doc],
+        spaces=[bool(token.whitespace_) for token in doc],
+        heads=heads,
+        deps=["ROOT" if head == i else "dep" for i, head in enumerate(heads)],
+        tags=["NN" if len(token.text) > 3 else "DT" for token in doc],
+    )
+
+
+@pytest.fixture(scope="module")
+def chain_nlp():
+    """A blank English pipeline with a toy tagger/parser, enough for graph based extractors."""
+    nlp = spacy.blank("en")
+    nlp.add_pipe("test_chain_parser")
+    return nlp
+
+
+@pytest.fixture
+def texts():
+    return [
+        "quarterly revenue growth beat market estimates while operating costs rose",
+        "the central bank kept interest rates unchanged amid slowing growth",
+        "",
+        "quarterly revenue growth beat market estimates while operating costs rose",
+    ]
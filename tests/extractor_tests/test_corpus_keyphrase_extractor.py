@@ -0,0 +1,31 @@
+import math
+import pytest
+from extractor.corpus_keyphrase_extractor import CorpusKeyphraseExtractor, DocumentFrequencyStore
+from extractor.phrase_extractor import PhraseExtractor
+
+
+def test_store_counts_documents_incrementally(tmp_path):
+    path = tmp_path / "df.sqlite3"
+    with DocumentFrequencyStore(path) as store:
+        assert store.update([["data", "data", "team"], ["data"]]) == 2
+        store.add_document(["growth"])
+    with DocumentFrequencyStore(path) as store:
+        assert store.n_docs == 3 and len(store) == 3
+        assert store.dfs(["data", "team", "unseen"]) == {"data": 2, "team": 1, "unseen": 0}
+        assert store.idf(["data"])["data"] == pytest.approx(math.log(4 / 3) + 1)
+
+
+def test_rerank_by_document_frequency(chain_nlp, texts):
+    store = DocumentFrequencyStore()
+    extractor = CorpusKeyphraseExtractor(PhraseExtractor(chain_nlp), store)
+    results = list(extractor.extract_many(texts, batch_size=2))
+    assert store.n_docs == len(texts)
+    for keyphrases in results:
+        assert [s.score for s in keyphrases] == sorted((s.score for s in keyphrases), reverse=True)
+    # a later, frozen pass weighs the same document against the full history
+    frozen = CorpusKeyphraseExtractor(PhraseExtractor(chain_nlp), store, update=False)
+    reranked = frozen.extract(texts[0], top_n=1)
+    assert store.n_docs == len(texts) and len(reranked) == 1
+    scored = PhraseExtractor(chain_nlp).extract_scored_from_doc(chain_nlp(texts[0]))
+    idf = store.idf(s.phrase.text_lemma for s in scored)
+    assert reranked[0].score == max(s.score * idf[s.phrase.text_lemma] for s in scored)
@@ -14,3 +14,57 @@ def extract_entity_from_sentence(sentence, expected):
     entities = extractor.extract(sentence)
     assert len(entities) == len(expected)
     assert all([ent.text in expected for ent in entities])
+
+
+@pytest.mark.parametrize("batch_size, n_process", [(1, 1), (2, 1), (2, 2)])
+def test_extract_many_matches_extract(batch_size, n_process):
+    extractor = EntityExtractor(nlp)
+    texts = [sent_text1, "", "Nothing to see here .", sent_text1]
+    expected = [[(ent.text, ent.label_) for ent in extractor.extract(text)] for text in texts]
+    extracted = extractor.extract_many(texts, batch_size=batch_size, n_process=n_process)
+    assert [[(ent.text, ent.label_) for ent in entities] for entities in extracted] == expected
+
+
+@pytest.mark.parametrize("phrase_backend", ["matcher", "trie"])
+def test_rule_set_round_trip(tmp_path, phrase_backend):
+    extractor = EntityExtractor(nlp, phrase_backend=phrase_backend)
+    extractor.set_entity_patterns(["Q4", "Bank of America"], "ORG_OR_DATE")
+    extractor.set_entity_rules([{"IS_DIGIT": True}, {"LOWER": "million"}], "SHORT_MONEY")
+    extractor.to_disk(tmp_path)
+    restored = EntityExtractor.from_disk(nlp, tmp_path)
+    assert restored.phrase_backend == phrase_backend
+    assert len(restored.ruler) == len(extractor.ruler)
+    doc = nlp(sent_text1)
+    # the rules are applied to a copy of `doc`, so spans are compared by position and label
+    spans = [(ent.start, ent.end, ent.label_) for ent in extractor.extract_from_doc(doc)]
+    assert [(ent.start, ent.end, ent.label_) for ent in restored.extract_from_doc(doc)] == spans
+
+
+def test_compile_freezes_rules_and_leaves_the_pipeline_alone():
+    extractor = EntityExtractor(nlp)
+    extractor.set_entity_rules([{"IS_DIGIT": True}, {"LOWER": "million"}], "SHORT_MONEY")
+    pipe_names = list(nlp.pipe_names)
+    assert extractor.compile() is extractor.compile()
+    assert extractor.is_compiled
+    first = [(ent.text, ent.label_) for ent in extractor.extract(sent_text1)]
+    assert [(ent.text, ent.label_) for ent in extractor.extract(sent_text1)] == first
+    assert nlp.pipe_names == pipe_names
+    with pytest.raises(RuntimeError):
+        extractor.set_entity_patterns(["Q4"], "DATE")
+    with pytest.raises(RuntimeError):
+        extractor.set_entity_rules(["Bank of America"], "ORG")
+
+
+def test_extractors_sharing_a_model_keep_their_own_rules():
+    fruit = EntityExtractor("blank:en")
+    fruit.set_entity_rules(["apple"], "FRUIT")
+    org = EntityExtractor("blank:en")
+    org.set_entity_rules(["acme"], "ORG")
+    assert fruit.nlp is org.nlp
+    org.compile()
+    assert [(ent.text, ent.label_) for ent in fruit.extract("apple and acme")] == [("apple", "FRUIT")]
+    assert [(ent.text, ent.label_) for ent in org.extract("apple and acme")] == [("acme", "ORG")]
+    assert fruit.nlp.pipe_names == []
+    doc = fruit.nlp("apple and acme")
+    fruit.extract_from_doc(doc)
+    assert doc.ents == ()
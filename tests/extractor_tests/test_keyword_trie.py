@@ -0,0 +1,40 @@
+import pytest
+from extractor.keyword_trie import KeywordMatch, KeywordTrie
+
+
+@pytest.fixture
+def trie():
+    trie = KeywordTrie()
+    trie.add_phrases(["New York", "New York Times", "York"], "ORG")
+    trie.add_phrases(["C++", ".NET"], "SKILL")
+    return trie
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("the new york times said", [("ORG", "new york times")]),
+        ("New Yorker", []),
+        ("in New York, and York", [("ORG", "New York"), ("ORG", "York")]),
+        ("C++ and .NET developers", [("SKILL", "C++"), ("SKILL", ".NET")]),
+        ("", []),
+    ],
+)
+def test_extract_longest_whole_word_matches(trie, text, expected):
+    assert [(match.label, match.text) for match in trie.extract(text)] == expected
+
+
+def test_offsets_and_lookup(trie):
+    assert trie.extract("Visit York") == [KeywordMatch("ORG", 6, 10, "York")]
+    assert "new YORK" in trie and "New" not in trie
+    assert len(trie) == 5
+
+
+def test_case_sensitive_and_round_trip(tmp_path):
+    trie = KeywordTrie(case_sensitive=True)
+    trie.add("Apple", "ORG")
+    assert trie.extract("apple Apple") == [KeywordMatch("ORG", 6, 11, "Apple")]
+    trie.to_disk(tmp_path / "trie.pkl")
+    restored = KeywordTrie.from_disk(tmp_path / "trie.pkl")
+    assert restored.case_sensitive and len(restored) == 1
+    assert restored.extract("apple Apple") == trie.extract("apple Apple")
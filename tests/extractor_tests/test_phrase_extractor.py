@@ -0,0 +1,39 @@
+from functools import partial
+import multiprocessing
+import pytest
+from extractor.phrase_extractor import PhraseExtractor
+from nlp_utils.doc_cache import DocCache
+from utils import parallel
+
+@pytest.mark.parametrize("backend", ["scipy", "networkx"])
+def test_extract_is_stateless(chain_nlp, texts, backend):
+    extractor = PhraseExtractor(chain_nlp, backend=backend)
+    first = extractor.extract(texts[0])
+    extractor.extract(texts[1])
+    assert extractor.extract(texts[0]) == first
+    assert not hasattr(extractor, "graph")
+
+
+@pytest.mark.parametrize("n_process, n_threads", [(1, 1), (1, 4), (2, 1)])
+def test_extract_many_matches_extract(chain_nlp, texts, n_process, n_threads):
+    extractor = PhraseExtractor(chain_nlp)
+    expected = [extractor.extract(text) for text in texts]
+    assert list(extractor.extract_many(texts, batch_size=2, n_process=n_process, n_threads=n_threads)) == expected
+
+
+def test_scored_phrases_are_ranked(chain_nlp, texts):
+    extractor = PhraseExtractor(chain_nlp)
+    doc = chain_nlp(texts[0])
+    scored = extractor.extract_scored_from_doc(doc)
+    assert sorted(s.phrase for s in scored) == sorted(extractor.extract_from_doc(doc))
+    assert [s.score for s in scored] == sorted((s.score for s in scored), reverse=True)
+    assert all(s.score > 0 for s in scored)
+
+
+def test_extract_many_with_doc_cache_under_spawn(chain_nlp, texts, monkeypatch):
+    # spawn (the macOS default) pickles the extractor, doc cache included, for every worker
+    spawn_pool = partial(parallel.ProcessPoolExecutor, mp_context=multiprocessing.get_context("spawn"))
+    monkeypatch.setattr(parallel, "ProcessPoolExecutor", spawn_pool)
+    extractor = PhraseExtractor(chain_nlp, doc_cache=DocCache(chain_nlp))
+    expected = [extractor.extract(text) for text in texts]
+    assert list(extractor.extract_many(texts, batch_size=2, n_process=2)) == expected
@@ -0,0 +1,72 @@
+import random
+import networkx as nx
+import pytest
+import spacy
+from nltk.metrics.distance import edit_distance
+from spacy.tokens import Doc
+from common.types import Word
+from extractor.textrank import build_word_graph, graph_components, levenshtein, pagerank
+
+VALID_TAGS = {"NN", "NNS", "NNP", "JJ"}
+WORDS = ["market", "markets", "price", "data", "team", "growth", "new", "report", "sale", "rate", "risk", "store"]
+TAGS = ["NN", "NNS", "NNP", "JJ", "VB", "DT", "IN"]
+
+nlp = spacy.blank("en")
+
+
+def make_nodes(num_tokens, seed):
+    rng = random.Random(seed)
+    words = [rng.choice(WORDS) for _ in range(num_tokens)]
+    heads, start = [], 0
+    while start < num_tokens:
+        length = min(rng.randint(4, 20), num_tokens - start)
+        root = start + rng.randrange(length)
+        heads.extend(i + 1 if i < root else (i - 1 if i > root else i) for i in range(start, start + length))
+        start += length
+    deps = ["ROOT" if head == i else "dep" for i, head in enumerate(heads)]
+    tags = [rng.choice(TAGS) for _ in range(num_tokens)]
+    doc = Doc(nlp.vocab, words=words, heads=heads, deps=deps, tags=tags, lemmas=[w.rstrip("s") for w in words])
+    return [(Word(i, token.i, token), token.tag_ in VALID_TAGS) for i, sent in enumerate(doc.sents) for token in sent]
+
+
+def networkx_graph(nodes, window, normalize):
+    """The graph `PhraseExtractor` builds with the networkx backend."""
+    node_stat = (lambda tok: tok.lemma_) if normalize else (lambda tok: tok.text)
+    graph = nx.Graph()
+    graph.add_nodes_from(node_stat(node.token) for node, is_valid in nodes if is_valid)
+    for i, (node, is_valid) in enumerate(nodes):
+        if not is_valid:
+            continue
+        start = max([abs(i - window), node.token.left_edge.i])
+        end = min([i + window, len(nodes), node.token.right_edge.i + 1])
+        for j in range(start, end):
+            neighbor, is_neighbor_valid = nodes[j]
+            if is_neighbor_valid and node != neighbor:
+                a, b = node_stat(node.token), node_stat(neighbor.token)
+                graph.add_edge(a, b, weight=edit_distance(a, b))
+    return graph
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("window, normalize", [(2, False), (3, True), (5, False)])
+def test_sparse_graph_matches_networkx(seed, window, normalize):
+    nodes = make_nodes(random.Random(seed).randint(1, 150), seed)
+    graph = networkx_graph(nodes, window, normalize)
+    word_graph = build_word_graph(nodes, window, normalize)
+    assert word_graph.keys == list(graph)
+    expected = nx.pagerank(graph, alpha=0.85, tol=0.0001, weight="weight")
+    assert dict(zip(word_graph.keys, pagerank(word_graph.adjacency, alpha=0.85, tol=0.0001).tolist())) == expected
+    components = [{word_graph.keys[node] for node in component} for component in graph_components(word_graph)]
+    assert components == list(nx.connected_components(graph))
+
+
+def test_empty_graph():
+    word_graph = build_word_graph([], window=3, normalize=False)
+    assert word_graph.num_nodes == 0
+    assert len(pagerank(word_graph.adjacency)) == 0
+    assert graph_components(word_graph) == []
+
+
+@pytest.mark.parametrize("source, target", [("", ""), ("", "abc"), ("kitten", "sitting"), ("flaw", "lawn")])
+def test_levenshtein_matches_nltk(source, target):
+    assert levenshtein(source, target) == edit_distance(source, target)
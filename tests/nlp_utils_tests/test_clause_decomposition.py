@@ -0,0 +1,167 @@
+import gc
+import weakref
+import pytest
+import spacy
+from spacy.language import Language
+from spacy.tokens import Doc
+from common.types import ClauseRecord
+from nlp_utils.clause_decomposition import (
+    SentComponents,
+    clause_record,
+    has_known_ext_copular,
+    has_known_non_ext_copular,
+    has_potentially_complex_transitive,
+    verb_lemma,
+)
+
+LEMMAS = {"seemed": "seem", "walked": "walk", "put": "put", "saw": "see", "is": "be", "are": "be"}
+# heads, deps and pos of the sentences the template parser knows
+PARSES = {
+    "The dog put the cat there .": (
+        [1, 2, 2, 4, 2, 2, 2],
+        ["det", "nsubj", "ROOT", "det", "dobj", "advmod", "punct"],
+        ["DET", "NOUN", "VERB", "DET", "NOUN", "ADV", "PUNCT"],
+    ),
+    "Sam , my brother .": (
+        [0, 0, 3, 0, 0],
+        ["ROOT", "punct", "poss", "appos", "punct"],
+        ["PROPN", "PUNCT", "PRON", "NOUN", "PUNCT"],
+    ),
+    "The man sitting there .": (
+        [1, 1, 1, 2, 1],
+        ["det", "ROOT", "acl", "advmod", "punct"],
+        ["DET", "NOUN", "VERB", "ADV", "PUNCT"],
+    ),
+    "The men proud of it .": (
+        [1, 1, 1, 2, 3, 1],
+        ["det", "ROOT", "acl", "prep", "pobj", "punct"],
+        ["DET", "NOUN", "ADJ", "ADP", "PRON", "PUNCT"],
+    ),
+}
+
+
+@Language.component("test_lookup_lemmatizer")
+def lookup_lemmatizer(doc):
+    for token in doc:
+        token.lemma_ = LEMMAS.get(token.lower_, token.lower_)
+    return doc
+
+
+@Language.component("test_template_parser")
+def template_parser(doc):
+    if doc.text not in PARSES:
+        return doc
+    heads, deps, pos = PARSES[doc.text]
+    return Doc(doc.vocab, words=[token.text for token in doc], heads=heads, deps=deps, pos=pos)
+
+
+@pytest.fixture(scope="module")
+def parser_nlp():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("test_template_parser")
+    nlp.add_pipe("test_lookup_lemmatizer")
+    return nlp
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("test_lookup_lemmatizer")
+    return nlp
+
+
+def parsed(nlp, verb, lemma):
+    """ "The dog <verb> the cat there ." as parsed by a model; `lemma=None` for a Doc without lemmas."""
+    words = ["The", "dog", verb, "the", "cat", "there", "."]
+    lemmas = [lemma if word == verb else word.lower() for word in words] if lemma else None
+    return Doc(
+        nlp.vocab,
+        words=words,
+        heads=[1, 2, 2, 4, 2, 2, 2],
+        deps=["det", "nsubj", "ROOT", "det", "dobj", "advmod", "punct"],
+        pos=["DET", "NOUN", "VERB", "DET", "NOUN", "ADV", "PUNCT"],
+        lemmas=lemmas,
+    )
+
+
+def clause_of(nlp, doc):
+    components = SentComponents(nlp, appos_mapping={})
+    return components.clause_token(doc[1], components.empty_clause())
+
+
+@pytest.mark.parametrize(
+    "verb, lemma, non_ext_copular, ext_copular, complex_transitive",
+    [
+        ("seemed", "seem", False, True, False),
+        ("walked", "walk", True, False, False),
+        ("put", "put", False, False, True),
+        ("saw", "see", False, False, False),
+    ],
+)
+def test_predicates_read_the_doc_lemma(nlp, verb, lemma, non_ext_copular, ext_copular, complex_transitive):
+    clause = clause_of(nlp, parsed(nlp, verb, lemma))
+    assert has_known_non_ext_copular(nlp, clause) is non_ext_copular
+    assert has_known_ext_copular(nlp, clause) is ext_copular
+    assert has_potentially_complex_transitive(nlp, clause) is complex_transitive
+
+
+def test_doc_lemma_wins_over_the_pipeline(nlp):
+    # the parse in context says "kept" is "keep", whatever the pipeline makes of the word alone
+    doc = parsed(nlp, "kept", "keep")
+    assert verb_lemma(nlp, doc[2]) == nlp.vocab.strings["keep"]
+    assert has_potentially_complex_transitive(nlp, clause_of(nlp, doc))
+
+
+def test_doc_without_lemmas_falls_back_to_the_pipeline(nlp):
+    doc = parsed(nlp, "seemed", None)
+    assert not doc.has_annotation("LEMMA")
+    assert verb_lemma(nlp, doc[2]) == nlp.vocab.strings["seem"]
+    assert has_known_ext_copular(nlp, clause_of(nlp, doc))
+
+
+def test_define_clause_type(nlp):
+    components = SentComponents(nlp, appos_mapping={})
+    assert components.define_clause_type(clause_of(nlp, parsed(nlp, "put", "put"))) == "SVOA"
+    assert SentComponents(nlp, {}, conservative=False).define_clause_type(
+        clause_of(nlp, parsed(nlp, "saw", "see"))
+    ) == "SVO"
+
+
+def test_decompose_many(parser_nlp):
+    components = SentComponents(parser_nlp)
+    assert list(components.decompose_many(PARSES, batch_size=2)) == [
+        [ClauseRecord("SVOA", ("dog",), ("put",), ("cat",), (), (), (), ("there",))],
+        [
+            # the verbless sentence reads "There is Sam, my brother"
+            ClauseRecord("SV", ("Sam",), ("is",), (), (), (), (), ()),
+            ClauseRecord("SVO", ("I",), ("have",), ("brother",), (), (), (), ()),
+            ClauseRecord("SVC", ("Sam",), ("is",), (), (), (), ("brother",), ()),
+        ],
+        [
+            ClauseRecord("SV", ("man",), ("is",), (), (), (), (), ()),
+            ClauseRecord("SV", ("man",), ("sitting",), (), (), (), (), ()),
+        ],
+        [
+            ClauseRecord("SV", ("men",), ("is",), (), (), (), (), ()),
+            ClauseRecord("SV", ("men",), ("are",), (), (), (), (), ()),
+        ],
+    ]
+
+
+def test_synthetic_tokens_are_parsed_once(parser_nlp):
+    components = SentComponents(parser_nlp, appos_mapping={})
+    clauses = components.decompose_clause("Sam , my brother .")
+    assert [clause["V"][0].text for clause in clauses] == ["is", "have", "is"]
+    assert clauses[0]["V"][0] is clauses[2]["V"][0]
+    assert set(components.appos_mapping) == {"is", "I", "have"}
+    assert [clause_record(clause) for clause in clauses][1].subject == ("I",)
+
+
+def test_lemma_fallback_does_not_keep_pipelines_alive():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("test_lookup_lemmatizer")
+    verb_lemma(nlp, parsed(nlp, "seemed", None)[2])
+    pipeline = weakref.ref(nlp)
+    del nlp
+    gc.collect()
+    assert pipeline() is None
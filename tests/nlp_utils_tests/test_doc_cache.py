@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+import pickle
+import pytest
+import spacy
+from nlp_utils.doc_cache import DocCache, DocCacheStats, check_doc_cache
+
+
+@pytest.fixture
+def nlp():
+    return spacy.blank("en")
+
+
+def test_memory_tier_is_lru(nlp):
+    doc_cache = DocCache(nlp, maxsize=2)
+    first = doc_cache("one")
+    doc_cache("two")
+    assert doc_cache("one") is first
+    doc_cache("three")  # evicts "two", the least recently used
+    assert doc_cache.get("two") is None
+    assert doc_cache.get("one") is first
+    assert doc_cache.stats == DocCacheStats(memory_hits=2, disk_hits=0, misses=3, size=2)
+
+
+def test_disk_tier_survives_the_process(nlp, tmp_path):
+    doc = DocCache(nlp, directory=tmp_path)("Cached on disk, once.")
+    reloaded = DocCache(nlp, directory=tmp_path)
+    restored = reloaded("Cached on disk, once.")
+    assert [t.text for t in restored] == [t.text for t in doc]
+    assert reloaded.stats == DocCacheStats(memory_hits=0, disk_hits=1, misses=0, size=1)
+
+
+def test_pipe_keeps_order_and_parses_repeats_once(nlp):
+    doc_cache = DocCache(nlp)
+    doc_cache("b")
+    texts = ["a", "b", "a", "c"]
+    docs = list(doc_cache.pipe(texts, batch_size=3))
+    assert [doc.text for doc in docs] == texts
+    assert docs[0] is docs[2]
+    assert doc_cache.stats.misses == 3  # "b" up front, then "a" and "c"
+
+
+def test_key_tracks_the_pipeline(nlp):
+    doc_cache = DocCache(nlp)
+    key = doc_cache.key("text")
+    nlp.add_pipe("sentencizer")
+    assert doc_cache.key("text") != key
+    with pytest.raises(ValueError):
+        check_doc_cache(spacy.blank("en"), doc_cache)
+
+
+def test_threads_share_one_cache(nlp, tmp_path):
+    doc_cache = DocCache(nlp, maxsize=4, directory=tmp_path)
+    texts = [f"text {i % 12}" for i in range(600)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        docs = list(pool.map(doc_cache, texts))
+    assert [doc.text for doc in docs] == texts
+    stats = doc_cache.stats
+    assert stats.memory_hits + stats.disk_hits + stats.misses == len(texts)
+    assert stats.size == 4
+    assert not list(tmp_path.glob("*/*.tmp"))
+
+
+def test_pickled_copy_has_its_own_lock_and_memory(nlp, tmp_path):
+    doc_cache = DocCache(nlp, directory=tmp_path)
+    doc_cache("Parsed before pickling.")
+    copy = pickle.loads(pickle.dumps(doc_cache))
+    assert len(copy) == 0 and copy._lock is not doc_cache._lock
+    assert [t.text for t in copy("Parsed before pickling.")] == ["Parsed", "before", "pickling", "."]
+    assert copy.stats.disk_hits == 1
@@ -0,0 +1,117 @@
+import random
+import pytest
+from nlp_utils.normalize import (
+    ContractionExpander,
+    Normalizer,
+    expand_contractions,
+    get_contraction_expander,
+    normalize_corpus,
+    normalize_hyphenated_words,
+    normalize_unicode_to_ascii,
+    normalize_unicode_to_ascii_batch,
+    normalize_unicode_to_ascii_bytes,
+    process_tweet,
+    remove_consecutive_punctuation,
+    remove_consecutive_spaces,
+    remove_nonascii_bytes,
+    remove_nonascii_chars,
+    remove_nonascii_chars_batch,
+    remove_punctuations,
+)
+
+CLEANING_CHAIN = [
+    ("remove_consecutive_spaces", remove_consecutive_spaces),
+    ("remove_punctuations", remove_punctuations),
+    ("remove_consecutive_punctuation", remove_consecutive_punctuation),
+    ("normalize_hyphenated_words", normalize_hyphenated_words),
+    ("remove_nonascii_chars", remove_nonascii_chars),
+    ("process_tweet", process_tweet),
+]
+TEXT_PIECES = list("aRTbc $#!.-:/\t\n\r\x0b\xa0éü漢") + ["http://", "https://x.co/", "RT ", "$GE", " - ", "...", "\r\n"]
+
+
+def random_texts(num_texts, seed=7):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(TEXT_PIECES) for _ in range(rng.randint(0, 30))) for _ in range(num_texts)]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("He hasn't called", "He has not called"),
+        ("I'D rather not", "I would rather not"),
+        ("you can't've known", "you cannot have known"),
+        ("Y'all'd've liked it", "You all would have liked it"),
+        ("no contraction here", "no contraction here"),
+        ("", ""),
+    ],
+)
+def test_expand_contractions(text, expected):
+    assert expand_contractions(text) == expected
+
+
+def test_contraction_expander_is_cached_per_mapping():
+    mapping = {"gonna": "going to"}
+    assert get_contraction_expander() is get_contraction_expander()
+    assert get_contraction_expander(mapping) is get_contraction_expander(mapping)
+    assert get_contraction_expander(mapping) is not get_contraction_expander()
+    assert expand_contractions("Gonna win", mapping) == "Going to win"
+
+
+def test_expand_batch_preserves_order():
+    expander = ContractionExpander()
+    texts = ["it's late", "we're here", "they've left"]
+    assert expander.expand_batch(texts) == [expander.expand(text) for text in texts]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_normalizer_matches_sequential_functions(seed):
+    rng = random.Random(seed)
+    chain = CLEANING_CHAIN if seed == 0 else [rng.choice(CLEANING_CHAIN) for _ in range(rng.randint(1, 6))]
+    normalizer = Normalizer([name for name, _ in chain])
+    for text in random_texts(200, seed):
+        expected = text
+        for _, func in chain:
+            expected = func(expected)
+        assert normalizer.normalize(text) == expected
+
+
+def test_normalizer_folds_translate_steps():
+    normalizer = Normalizer(["remove_punctuations", "normalize_hyphenated_words", "remove_nonascii_chars"])
+    assert normalizer.num_passes == 1
+    assert normalizer.normalize(" état-civil, ok ") == "tatcivilok"
+
+
+def test_normalizer_accepts_step_kwargs_and_callables():
+    normalizer = Normalizer([("remove_punctuations", {"punctuations": "!"}), str.upper])
+    assert list(normalizer.normalize_iter(["hi!", "a.b!"])) == ["HI", "A.B"]
+    with pytest.raises(ValueError):
+        Normalizer(["not_a_step"])
+
+
+@pytest.mark.parametrize("n_jobs, chunksize", [(1, 10), (2, 1000), (2, 16)])
+def test_normalize_corpus_keeps_order(n_jobs, chunksize):
+    steps = [name for name, _ in CLEANING_CHAIN]
+    texts = random_texts(100)
+    normalizer = Normalizer(steps)
+    results = normalize_corpus(iter(texts), steps, n_jobs=n_jobs, chunksize=chunksize)
+    assert list(results) == [normalizer.normalize(text) for text in texts]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [("Crème Brûlée!", "creme brulee "), ("ﬁnance 2024", "finance 2024"), ("東京 Tokyo", " tokyo"), ("", "")],
+)
+def test_normalize_unicode_to_ascii(text, expected):
+    assert normalize_unicode_to_ascii(text) == expected
+
+
+def test_bulk_ascii_folding_matches_single_text_functions():
+    texts = random_texts(300) + ["Straße\nnaïve", "😀 done", ""]
+    assert remove_nonascii_chars_batch(texts) == [remove_nonascii_chars(text) for text in texts]
+    assert normalize_unicode_to_ascii_batch(texts) == [normalize_unicode_to_ascii(text) for text in texts]
+
+
+def test_byte_buffer_ascii_folding():
+    assert remove_nonascii_bytes("naïve 東京\n".encode("utf-8")) == b"na ve   \n"
+    assert normalize_unicode_to_ascii_bytes("Déjà  Vu!\nÜber".encode("utf-8")) == b"deja vu \nuber"
@@ -0,0 +1,48 @@
+import random
+import pytest
+from nlp_utils.pii_scanner import PIIScanner, PIISpan
+
+PAGE_PIECES = [
+    "Contact ",
+    "john.smith@example.org",
+    " or visit https://www.example.com/path?x=1 ",
+    "from 192.168.1.20 ",
+    "ssn 078-05-1120 ",
+    "lorem ipsum ",
+    "\n",
+]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("write to jane@corp.com today", [("EMAIL", "jane@corp.com")]),
+        ("server 10.0.0.255 is up", [("IPV4", "10.0.0.255")]),
+        ("SSN: 123-45-6789", [("SSN", "123-45-6789")]),
+        ("see www.example.com for details", [("URL", "www.example.com")]),
+        ("nothing to see here", []),
+    ],
+)
+def test_scan_returns_typed_spans(text, expected):
+    spans = PIIScanner().scan(text)
+    assert [(span.label, span.text) for span in spans] == expected
+    assert all(text[span.start : span.end] == span.text for span in spans)
+
+
+def test_redact_and_label_subset():
+    text = "mail jane@corp.com from 10.0.0.1"
+    assert PIIScanner().redact(text) == "mail [EMAIL] from [IPV4]"
+    assert PIIScanner(labels=["IPV4"]).redact(text, replacement=lambda span: "*" * len(span.text)) == (
+        "mail jane@corp.com from ********"
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [1, 13, 100, 4096])
+def test_streaming_matches_whole_text(chunk_size):
+    rng = random.Random(chunk_size)
+    text = "".join(rng.choice(PAGE_PIECES) for _ in range(300))
+    chunks = [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
+    scanner = PIIScanner(max_match_length=128)
+    assert list(scanner.scan_stream(chunks)) == scanner.scan(text)
+    assert "".join(scanner.redact_stream(chunks)) == scanner.redact(text)
+    assert isinstance(scanner.scan(text)[0], PIISpan)
@@ -0,0 +1,24 @@
+import re
+import pytest
+import nlp_utils.regex as regex_module
+from nlp_utils.regex import RegexRegistry, REGISTRY
+
+
+def test_registry_compiles_on_first_use_only():
+    registry = RegexRegistry()
+    registry.register("DIGITS", r"\d+")
+    assert registry.stats()[0].compiled is False
+    pattern = registry.get("DIGITS")
+    assert registry.get("DIGITS") is pattern
+    stat = registry.stats()[0]
+    assert stat.compiled and stat.compile_seconds >= 0
+
+
+def test_precompile_and_module_attributes():
+    REGISTRY.precompile(["REGEX_IPV4_ADDRESS", "REGEX_SSN_SIMPLE"])
+    assert all(stat.compiled for stat in REGISTRY.stats() if stat.name in {"REGEX_IPV4_ADDRESS", "REGEX_SSN_SIMPLE"})
+    assert regex_module.REGEX_IPV4_ADDRESS.search("host 10.0.0.255 up").group() == "10.0.0.255"
+    assert regex_module.REGEX_SSN_SIMPLE.match("123-45-6789").group("area") == "123"
+    assert isinstance(regex_module.REGEX_URL, re.Pattern)
+    with pytest.raises(AttributeError):
+        regex_module.REGEX_DOES_NOT_EXIST
@@ -0,0 +1,36 @@
+import pytest
+from nlp_utils.spacy_utils import SpacyModelRegistry, get_spacy_model, resolve_spacy_model, SPACY_MODELS
+
+
+@pytest.fixture
+def registry():
+    return SpacyModelRegistry()
+
+
+def test_registry_loads_each_key_once(registry):
+    nlp = registry.get("blank:en", ["textcat", "vectors"])
+    assert registry.get("blank:en", ("vectors", "textcat")) is nlp
+    assert registry.get("blank:en") is not nlp
+    assert len(registry) == 2
+    assert ("blank:en", ["vectors", "textcat"]) in registry
+    stats = {stat.disabled: stat for stat in registry.stats()}
+    assert stats[("textcat", "vectors")].hits == 1
+    assert stats[()].hits == 0
+    assert stats[()].load_seconds > 0
+
+
+def test_registry_evict(registry):
+    registry.preload(["blank:en", ("blank:en", ["ner"]), "blank:de"], freeze=False)
+    assert registry.evict("blank:en", ["ner"]) == 1
+    assert registry.evict("blank:en") == 1
+    assert registry.evict("blank:en") == 0
+    assert registry.evict() == 1
+    assert len(registry) == 0 and registry.stats() == []
+
+
+def test_resolve_spacy_model_shares_by_name():
+    nlp = resolve_spacy_model("blank:en")
+    assert resolve_spacy_model("blank:en") is nlp
+    assert resolve_spacy_model(nlp) is nlp
+    assert get_spacy_model("blank:en") is nlp
+    SPACY_MODELS.evict("blank:en")
@@ -1,6 +1,12 @@
+import io
+import json
+import os
+import tempfile
 import unittest
 from typing import List
-from nlp_utils.tokenizer import NLTKSplitter
+from unittest import mock
+from nlp_utils.tokenizer import WordTokenizer, read_token_ids, tokenize_file, write_tokens
+from nlp_utils.word_splitter import NLTKSplitter, SpacyWordSplitter, WhiteSpaceSplitter
 
 
 # Define a test class that inherits from unittest.TestCase
@@ -37,5 +43,111 @@ class NLTKSplitterTestCase(unittest.TestCase):
         self.assertEqual(actual_tokens, expected_tokens)
 
 
+class WordTokenizerBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tokenizer = WordTokenizer(WhiteSpaceSplitter(), start_tokens=["<s>"], end_tokens=["</s>"])
+        self.texts = ["Hello , world !", "it's 'tis fine ...", "", "we aren't done"]
+
+    def test_batch_tokenize_matches_tokenize(self):
+        for with_punc in (True, False):
+            expected = [self.tokenizer.tokenize(text, with_punc=with_punc) for text in self.texts]
+            actual = self.tokenizer.batch_tokenize(self.texts, batch_size=3, with_punc=with_punc)
+            self.assertEqual(actual, expected)
+
+    def test_batch_tokenize_lazy_with_processes(self):
+        texts = self.texts * 50
+        expected = [self.tokenizer.tokenize(text, with_contraction=True) for text in texts]
+        actual = self.tokenizer.batch_tokenize(iter(texts), batch_size=16, n_process=2, with_contraction=True, lazy=True)
+        self.assertNotIsInstance(actual, list)
+        self.assertEqual(list(actual), expected)
+
+    def test_sanitize_without_punctuation(self):
+        self.assertEqual(self.tokenizer.tokenize("Hello , world !", with_punc=False), ["<s>", "Hello", "world", "</s>"])
+
+
+class TokenizeFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.lines = [f"document {i} has a few words" if i % 5 else "" for i in range(500)]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_tokenize_text_file_in_chunks(self):
+        path = self.write("corpus.txt", "\n".join(self.lines) + "\n")
+        expected = [line.split() for line in self.lines]
+        self.assertEqual(list(tokenize_file(path, chunk_bytes=256)), expected)
+        self.assertEqual(list(tokenize_file(path, n_jobs=2, chunk_bytes=256)), expected)
+
+    def test_interleaved_serial_generators_on_one_file(self):
+        path = self.write("corpus.txt", "\n".join(self.lines) + "\n")
+        upper = mock.Mock(split_words=lambda line: line.upper().split())
+        plain, shouted = tokenize_file(path, chunk_bytes=256), tokenize_file(path, splitter=upper, chunk_bytes=64)
+        pairs = list(zip(plain, shouted))
+        self.assertEqual([tokens for tokens, _ in pairs], [line.split() for line in self.lines])
+        self.assertEqual([tokens for _, tokens in pairs], [line.upper().split() for line in self.lines])
+
+    def test_tokenize_jsonl_field_and_write_ids(self):
+        path = self.write("corpus.jsonl", "\n".join(json.dumps({"text": line}) for line in self.lines))
+        token_lists = list(tokenize_file(path, field="text", splitter=WhiteSpaceSplitter(), chunk_bytes=300))
+        self.assertEqual(token_lists, [line.split() for line in self.lines])
+        vocab, output = {}, io.BytesIO()
+        self.assertEqual(write_tokens(token_lists, output, output_format="ids", vocab=vocab), len(self.lines))
+        output.seek(0)
+        tokens_by_id = {token_id: token for token, token_id in vocab.items()}
+        self.assertEqual([[tokens_by_id[i] for i in ids] for ids in read_token_ids(output)], token_lists)
+
+
+class SpacyWordSplitterTestCase(unittest.TestCase):
+    def setUp(self):
+        import spacy
+
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        with mock.patch("nlp_utils.word_splitter.get_spacy_model", return_value=nlp):
+            self.splitter = SpacyWordSplitter()
+            self.full_splitter = SpacyWordSplitter(keep_spacy_tokens=True)
+            self.fast_splitter = SpacyWordSplitter(tokens_only=True, batch_size=2)
+        self.sentences = ["Don't stop now.", "", "U.S. prices rose 3%, again!"]
+
+    def test_unneeded_pipes_are_skipped_for_texts(self):
+        self.assertEqual(self.splitter._skipped_pipes, ["sentencizer"])
+        self.assertEqual(self.full_splitter._skipped_pipes, [])
+        doc = self.full_splitter.split_words("One. Two.")
+        self.assertEqual(len(list(doc.sents)), 2)
+
+    def test_tokens_only_matches_pipeline(self):
+        expected = [[token.text for token in doc] for doc in self.full_splitter.batch_split_words(self.sentences)]
+        self.assertEqual(self.splitter.batch_split_words(self.sentences, batch_size=1), expected)
+        self.assertEqual(self.fast_splitter.batch_split_words(self.sentences), expected)
+        self.assertEqual([self.fast_splitter.split_words(s) for s in self.sentences], expected)
+        self.assertEqual(self.fast_splitter.batch_split_words(self.sentences, n_process=2), expected)
+
+    def test_word_tokenizer_keeps_splitter_defaults(self):
+        tokenizer = WordTokenizer(self.fast_splitter)
+        with mock.patch.object(self.fast_splitter, "iter_split_words", wraps=self.fast_splitter.iter_split_words) as spy:
+            tokens = tokenizer.batch_tokenize(self.sentences)
+        spy.assert_called_once_with(mock.ANY, batch_size=None, n_process=None)
+        self.assertEqual(tokens, self.fast_splitter.batch_split_words(self.sentences))
+
+    def test_retokenizing_pipes_keep_their_dependencies(self):
+        import spacy
+
+        nlp = spacy.blank("en")
+        nlp.add_pipe("sentencizer")
+        nlp.add_pipe("entity_ruler").add_patterns([{"label": "GPE", "pattern": "New York"}])
+        nlp.add_pipe("merge_entities")
+        self.assertEqual(SpacyWordSplitter.unneeded_pipes(nlp), ["sentencizer"])
+        with mock.patch("nlp_utils.word_splitter.get_spacy_model", return_value=nlp):
+            splitter = SpacyWordSplitter()
+        self.assertEqual(splitter.split_words("I love New York."), ["I", "love", "New York", "."])
+
+
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,47 @@
+from collections import Counter
+import numpy
+import pytest
+from nlp_utils.vocabulary import TokenizedCorpus, Vocabulary
+from utils.utils import count_tokens, filter_counter
+
+DOCS = [["The", "cat", "sat"], ["the", "cat", "ran", "the"], []]
+
+
+def test_vocabulary_encode_decode_round_trip(tmp_path):
+    vocab = Vocabulary()
+    ids = vocab.encode(["b", "a", "b"])
+    assert list(ids) == [0, 1, 0]
+    assert vocab.decode(ids) == ["b", "a", "b"]
+    assert vocab.get("missing") is None
+    assert list(vocab.encode(["a"], add=False)) == [1]
+    with pytest.raises(KeyError):
+        vocab.encode(["missing"], add=False)
+    vocab.save(tmp_path / "vocab.json")
+    assert Vocabulary.load(tmp_path / "vocab.json").tokens == ["b", "a"]
+
+
+def test_corpus_save_load_memory_maps(tmp_path):
+    corpus = TokenizedCorpus.from_token_lists(DOCS)
+    assert (len(corpus), corpus.num_tokens) == (3, 7)
+    corpus.save(tmp_path)
+    loaded = TokenizedCorpus.load(tmp_path)
+    assert loaded.read_only
+    assert isinstance(loaded.ids, numpy.memmap)
+    assert list(loaded) == DOCS
+    with pytest.raises(ValueError):
+        loaded.append(["more"])
+
+
+@pytest.mark.parametrize("to_lower", [False, True])
+def test_count_tokens_matches_token_lists(to_lower):
+    corpus = TokenizedCorpus.from_token_lists(DOCS)
+    flat = [token for doc in DOCS for token in doc]
+    assert count_tokens(corpus, to_lower=to_lower) == count_tokens(flat, to_lower=to_lower)
+    counter = Counter({"dog": 1})
+    assert count_tokens(corpus, counter=counter)["dog"] == 1
+
+
+def test_filter_counter_matches_counter():
+    corpus = TokenizedCorpus.from_token_lists(DOCS)
+    expected = filter_counter(2, "<unk>", count_tokens([token for doc in DOCS for token in doc]))
+    assert filter_counter(2, "<unk>", corpus) == expected == Counter({"cat": 2, "the": 2, "<unk>": 3})
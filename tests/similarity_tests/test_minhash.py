@@ -0,0 +1,118 @@
+import random
+import numpy
+import pytest
+from similarity.minhash import EMPTY_HASH, DedupeResult, LSHIndex, MinHasher, SignatureStore, jaccard_estimate
+
+WORDS = [f"w{i}" for i in range(200)]
+
+
+def shingle_jaccard(hasher, text1, text2):
+    shingles1, shingles2 = set(hasher.shingles(text1)), set(hasher.shingles(text2))
+    return len(shingles1 & shingles2) / len(shingles1 | shingles2)
+
+
+@pytest.fixture
+def hasher():
+    return MinHasher(num_perm=256, shingle_size=2)
+
+
+def test_shingles(hasher):
+    assert hasher.shingles("Acme Corp, New York") == ["acme corp", "corp new", "new york"]
+    assert hasher.shingles("Acme") == ["acme"]
+    assert hasher.shingles(" ! ") == []
+
+
+def test_batched_signatures_match_single_ones(hasher, monkeypatch):
+    rng = random.Random(3)
+    texts = [" ".join(rng.choices(WORDS, k=rng.randint(0, 30))) for _ in range(50)]
+    monkeypatch.setattr("similarity.minhash._MAX_STEP_SHINGLES", 40)
+    signatures = hasher.signatures(texts)
+    assert signatures.shape == (50, 256)
+    for text, signature in zip(texts, signatures):
+        numpy.testing.assert_array_equal(signature, hasher.signature(text))
+    assert (hasher.signature("") == EMPTY_HASH).all()
+    assert numpy.array_equal(numpy.stack(list(hasher.iter_signatures(texts, batch_size=7))), signatures)
+
+
+def test_signatures_estimate_jaccard(hasher):
+    rng = random.Random(5)
+    base = rng.choices(WORDS, k=60)
+    for num_changes in (0, 5, 20, 60):
+        changed = list(base)
+        for position in rng.sample(range(60), num_changes):
+            changed[position] = "x" + changed[position]
+        text1, text2 = " ".join(base), " ".join(changed)
+        estimate = jaccard_estimate(hasher.signature(text1), hasher.signature(text2)[None, :])[0]
+        assert estimate == pytest.approx(shingle_jaccard(hasher, text1, text2), abs=0.12)
+
+
+def test_lsh_insert_query_and_dedupe(hasher):
+    index = LSHIndex(num_perm=256, bands=64)
+    texts = ["the quick brown fox jumps over the lazy dog", "an entirely different sentence about cats"]
+    ids = [index.insert(signature) for signature in hasher.signatures(texts)]
+    assert ids == [0, 1]
+    near = hasher.signature("the quick brown fox jumps over the lazy dog today")
+    assert index.query(near) == [0]
+    assert index.query(near, threshold=0.99) == []
+    results = list(index.dedupe(hasher.signatures(texts + ["the quick brown fox jumps over the lazy dog!"])))
+    assert [(result.signature_id, result.duplicate_of) for result in results] == [(2, 0), (3, 1), (4, 0)]
+    assert results[0] == DedupeResult(2, 0, 1.0)
+    assert len(index) == 5
+
+
+def test_band_configuration():
+    assert LSHIndex(num_perm=128, bands=20).rows == 6
+    with pytest.raises(ValueError):
+        LSHIndex(num_perm=128, bands=20, rows=7)
+
+
+@pytest.mark.parametrize("buffer_rows", [1, 3, 4096])
+def test_signature_store_persists(tmp_path, buffer_rows):
+    path = tmp_path / "signatures.u64"
+    signatures = numpy.arange(7 * 4, dtype=numpy.uint64).reshape(7, 4)
+    with SignatureStore(4, path, buffer_rows=buffer_rows) as store:
+        assert store.append(signatures[:5]) == range(0, 5)
+        assert store.append(signatures[5]) == range(5, 6)
+        numpy.testing.assert_array_equal(store[[4, 0, 5]], signatures[[4, 0, 5]])
+        store.append(signatures[6:])
+    reopened = SignatureStore(4, path)
+    assert len(reopened) == 7
+    numpy.testing.assert_array_equal(reopened.rows, signatures)
+    index = LSHIndex(num_perm=4, bands=2, store=reopened).reindex()
+    assert index.query(signatures[3]) == [3]
+
+
+def test_in_memory_store_grows():
+    store = SignatureStore(2, buffer_rows=2)
+    for value in range(9):
+        store.append(numpy.array([value, value], dtype=numpy.uint64))
+    numpy.testing.assert_array_equal(store[range(9)][:, 0], numpy.arange(9))
+    assert store.rows.shape == (9, 2)
+
+
+def test_corrupt_store_is_rejected(tmp_path):
+    path = tmp_path / "signatures.u64"
+    path.write_bytes(b"\0" * 12)
+    with pytest.raises(ValueError):
+        SignatureStore(4, path)
+
+
+def test_texts_without_shingles_match_nothing(hasher):
+    index = LSHIndex(num_perm=256, bands=64)
+    signatures = hasher.signatures(["", "!!!", "some words", ""])
+    assert jaccard_estimate(signatures[0], signatures[1:]).tolist() == [0.0, 0.0, 0.0]
+    results = list(index.dedupe(signatures))
+    assert [(result.duplicate_of, result.similarity) for result in results] == [(None, 0.0)] * 4
+    assert index.query(signatures[1]) == []
+
+
+def test_reindex_leaves_dedupe_duplicates_out(hasher, tmp_path):
+    path = tmp_path / "signatures.u64"
+    texts = ["the quick brown fox jumps over the lazy dog", "the quick brown fox jumps over the lazy dog!", "cats"]
+    with SignatureStore(256, path) as store:
+        written = LSHIndex(num_perm=256, bands=64, store=store)
+        list(written.dedupe(hasher.signatures(texts), threshold=0.8))
+    probe = hasher.signature("the quick brown fox jumps over the lazy dog")
+    assert written.query(probe) == [0]
+    assert LSHIndex(num_perm=256, bands=64, store=SignatureStore(256, path)).reindex(0.8).query(probe) == [0]
+    assert LSHIndex(num_perm=256, bands=64, store=SignatureStore(256, path)).reindex().query(probe) == [0, 1]
@@ -0,0 +1,53 @@
+import pytest
+from similarity.name_match import Threshold, double_metaphone, double_metaphone_compare
+from similarity.phonetic_index import PhoneticIndex
+
+NAMES = ["Smith", "Schmidt", "Smyth", "Johnson", "Jonson", "John", "Jon", "Catherine", "Kathryn", "", "Smith"]
+
+
+@pytest.fixture
+def index():
+    return PhoneticIndex().build(NAMES)
+
+
+@pytest.mark.parametrize("threshold", [Threshold.WEAK, Threshold.NORMAL, Threshold.STRONG])
+@pytest.mark.parametrize("query", ["Smith", "Schmit", "Jonsen", "Katherine", "Zed", ""])
+def test_candidates_match_pairwise_compare(index, query, threshold):
+    def keys_match(keys1, keys2):
+        # as double_metaphone_compare, except that an empty key matches nothing
+        keys1 = (keys1[0] or "query primary", keys1[1] or "query alternate")
+        return double_metaphone_compare(keys1, keys2, threshold)
+
+    query_keys = double_metaphone(query)
+    expected = [name for name in NAMES if keys_match(query_keys, double_metaphone(name))]
+    assert index.candidates(query, threshold) == expected
+
+
+def test_empty_keys_are_not_bucketed(index):
+    assert "" not in index._primary and "" not in index._alternate
+    assert index.candidates("", Threshold.NORMAL) == []
+    # "Zed" has no alternate key, so it doesn't match every other name without one at WEAK
+    assert index.candidates("Zed", Threshold.WEAK) == []
+
+
+def test_add_and_duplicates(index):
+    assert index.candidate_ids("Smith", Threshold.STRONG) == [0, 2, 10]
+    assert index.add("Smithe") == len(NAMES)
+    assert index.candidates("Smith", Threshold.STRONG) == ["Smith", "Smyth", "Smith", "Smithe"]
+    assert len(index) == len(NAMES) + 1
+
+
+def test_parallel_build_matches_serial(index):
+    parallel = PhoneticIndex().build(iter(NAMES), n_jobs=2, chunk_size=3)
+    assert parallel.names == index.names
+    assert parallel.keys == index.keys
+    assert parallel.candidates("Jonsen", Threshold.NORMAL) == index.candidates("Jonsen", Threshold.NORMAL)
+
+
+def test_round_trip(index, tmp_path):
+    path = tmp_path / "names.pkl"
+    index.to_disk(path)
+    restored = PhoneticIndex.from_disk(path)
+    assert restored.names == index.names
+    for threshold in (Threshold.WEAK, Threshold.NORMAL, Threshold.STRONG):
+        assert restored.candidate_ids("Kathryn", threshold) == index.candidate_ids("Kathryn", threshold)
@@ -0,0 +1,75 @@
+import pytest
+from similarity.name_match import similarity_token_count
+from similarity.record_linkage import (
+    LinkageStats,
+    LinkMatch,
+    RecordLinker,
+    first_token_key,
+    phonetic_key,
+    sorted_token_prefix_key,
+)
+
+LEFT = ["Acme Corp", "Globex Inc", "Corp Acme", "Initech LLC", "", "Umbrella"]
+RIGHT = ["ACME Corporation", "Acme Corp.", "Initech, LLC", "Globex Incorporated", "Stark Industries", "", "Acme"]
+
+
+def brute_force(left, right, threshold):
+    return [
+        LinkMatch(i, j, a, b, similarity_token_count(a, b))
+        for i, a in enumerate(left)
+        for j, b in enumerate(right)
+        if similarity_token_count(a, b) >= threshold
+    ]
+
+
+@pytest.mark.parametrize(
+    "tokens, key, expected",
+    [
+        (["acme", "corp"], first_token_key, ["acme"]),
+        (["corp", "acme"], sorted_token_prefix_key, ["acmeco"]),
+        ([], sorted_token_prefix_key, []),
+        ([], phonetic_key, []),
+    ],
+)
+def test_blocking_keys(tokens, key, expected):
+    assert key(tokens) == expected
+
+
+def test_blocking_finds_the_matches_of_a_full_scan():
+    # every pair with a common token shares one of these blocks, so nothing above the threshold is missed
+    linker = RecordLinker(blocking=[lambda tokens: tokens])
+    assert list(linker.link(LEFT, RIGHT, threshold=0.3)) == brute_force(LEFT, RIGHT, 0.3)
+    assert linker.stats.pairs_compared < linker.stats.total_pairs
+    assert linker.stats == LinkageStats(left=6, right=7, pairs_compared=8, matches=8)
+
+
+def test_default_blocking_and_stats():
+    linker = RecordLinker()
+    matches = list(linker.link(LEFT, RIGHT, threshold=0.99))
+    assert [(match.left, match.right) for match in matches] == [
+        ("Acme Corp", "Acme Corp."),
+        ("Corp Acme", "Acme Corp."),
+        ("Initech LLC", "Initech, LLC"),
+    ]
+    assert linker.stats.left == len(LEFT)
+    assert linker.stats.total_pairs == len(LEFT) * len(RIGHT)
+    assert 0 < linker.stats.reduction_ratio < 1
+
+
+def test_custom_scorer_and_max_block_size():
+    linker = RecordLinker(blocking=["first_token"], scorer=lambda a, b: float(a.lower() == b.lower()), max_block_size=2)
+    linker.index(RIGHT + ["acme"])
+    # the "acme" block now holds four names and is dropped
+    assert linker.candidate_ids("Acme") == []
+    assert list(linker.link(["stark industries"], threshold=1.0)) == [
+        LinkMatch(0, 4, "stark industries", "Stark Industries", 1.0)
+    ]
+
+
+def test_process_pool_matches_serial():
+    left = LEFT * 5
+    serial = RecordLinker()
+    pooled = RecordLinker()
+    expected = list(serial.link(left, RIGHT, threshold=0.3))
+    assert list(pooled.link(iter(left), RIGHT, threshold=0.3, n_jobs=2, chunk_size=4)) == expected
+    assert pooled.stats == serial.stats
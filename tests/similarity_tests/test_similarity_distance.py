@@ -0,0 +1,101 @@
+import numpy
+import pytest
+from scipy.spatial.distance import cdist
+from similarity import similarity_distance
+from similarity.similarity_distance import (
+    Similarity,
+    cosine_similarities,
+    euclidean_distances,
+    iter_pairwise_blocks,
+    manhattan_distances,
+    minkowski_distances,
+    pairwise,
+)
+
+
+@pytest.fixture
+def vectors():
+    rng = numpy.random.RandomState(0)
+    return rng.normal(size=(37, 8)), rng.normal(size=(23, 8))
+
+
+@pytest.mark.parametrize("block_size", [None, 1, 5])
+@pytest.mark.parametrize(
+    "func, expected",
+    [
+        (euclidean_distances, lambda x, y: cdist(x, y, "euclidean")),
+        (manhattan_distances, lambda x, y: cdist(x, y, "cityblock")),
+        (lambda x, y, **kwargs: minkowski_distances(x, y, p=3, **kwargs), lambda x, y: cdist(x, y, "minkowski", p=3)),
+        (cosine_similarities, lambda x, y: 1 - cdist(x, y, "cosine")),
+    ],
+)
+def test_kernels_match_scipy(vectors, func, expected, block_size):
+    x, y = vectors
+    result = func(x, y, block_size=block_size)
+    assert result.dtype == numpy.float64
+    numpy.testing.assert_allclose(result, expected(x, y), rtol=1e-10, atol=1e-10)
+
+
+def test_blocks_respect_the_memory_budget(vectors, monkeypatch):
+    x, y = vectors
+    monkeypatch.setattr(similarity_distance, "BLOCK_BYTES", 8 * 8 * 4)
+    blocks = list(iter_pairwise_blocks(x, y, "manhattan"))
+    assert [start for start, _ in blocks] == list(range(0, 37))
+    numpy.testing.assert_allclose(numpy.vstack([block for _, block in blocks]), cdist(x, y, "cityblock"))
+
+
+def test_float32_and_self_distances(vectors):
+    x = vectors[0].astype(numpy.float32)
+    distances = euclidean_distances(x)
+    assert distances.dtype == numpy.float32
+    assert (numpy.diag(distances) == 0).all()
+    numpy.testing.assert_allclose(distances, cdist(x, x), rtol=1e-3, atol=1e-3)
+    assert euclidean_distances(x, dtype=numpy.float64).dtype == numpy.float64
+
+
+def test_out_and_errors(vectors, tmp_path):
+    x, y = vectors
+    out = numpy.memmap(tmp_path / "distances.f8", dtype=numpy.float64, mode="w+", shape=(37, 23))
+    assert pairwise(x, y, "euclidean", block_size=4, out=out) is out
+    numpy.testing.assert_allclose(out, cdist(x, y))
+    with pytest.raises(ValueError):
+        pairwise(x, y, "chebyshev")
+    with pytest.raises(ValueError):
+        pairwise(x, y[:, :3])
+
+
+def test_zero_vectors_have_zero_cosine():
+    assert cosine_similarities([[0.0, 0.0], [1.0, 0.0]], [[1.0, 1.0]]).tolist() == [[0.0], [pytest.approx(0.7071067811865475)]]
+
+
+def test_scalar_wrappers():
+    similarity = Similarity()
+    assert similarity.euclidean_distance([0, 3], [4, 0]) == 5.0
+    assert similarity.manhattan_distance([1, 2, 3], [4, 0, 3]) == 5.0
+    assert str(similarity.minkowski_distance([0, 3, 4, 5], [7, 6, 3, -1], 3)) == "8.373"
+    assert similarity.cosine_similarity([3, 45, 7, 2], [2, 54, 13, 15]) == 0.972
+
+
+def test_scalar_wrappers_keep_zip_semantics():
+    similarity = Similarity()
+    # vectors of different lengths are cut to the shorter one, as zip did
+    assert similarity.euclidean_distance([0, 3, 99], [4, 0]) == 5.0
+    assert similarity.cosine_similarity([1, 0], [1, 0, 5]) == 1.0
+    manhattan = similarity.manhattan_distance([1, 2, 3], [4, 0])
+    assert manhattan == 5 and isinstance(manhattan, int)
+    assert isinstance(similarity.manhattan_distance([1.5, 2], [4, 0]), float)
+
+
+def test_scalar_euclidean_of_large_nearly_equal_vectors():
+    similarity = Similarity()
+    assert similarity.euclidean_distance([1e8, 1.0], [1e8, 2.0]) == 1.0
+    assert similarity.euclidean_distance([1e4, 1.0], [1e4, 1.001]) == pytest.approx(0.001, rel=1e-9)
+
+
+def test_float32_euclidean_accumulates_in_float64():
+    rows = numpy.random.RandomState(3).normal(size=(20, 384)).astype(numpy.float32) * 10
+    distances = euclidean_distances(rows, rows.copy())
+    assert distances.dtype == numpy.float32
+    # the expansion's cancellation error is about 1e-8 times the row norm (~200 here)
+    assert numpy.abs(numpy.diag(distances)).max() < 1e-4
+    numpy.testing.assert_allclose(distances, cdist(rows, rows), rtol=1e-5, atol=1e-4)
@@ -0,0 +1,56 @@
+import random
+import numpy
+import pytest
+from similarity.name_match import similarity_token_count
+from similarity.token_matrix import TokenMatrix, jaccard_matrix, paired_jaccard, similarity_token_counts, top_k_jaccard
+
+WORDS = ["acme", "corp", "inc", "globex", "initech", "llc", "stark", "co", "Ltd.", "&"]
+
+
+def random_names(rng, count):
+    return [" ".join(rng.choices(WORDS, k=rng.randint(0, 4))) for _ in range(count)]
+
+
+@pytest.fixture
+def names():
+    rng = random.Random(7)
+    return random_names(rng, 60), random_names(rng, 40)
+
+
+def test_similarity_token_counts_match_pairwise(names):
+    left, right = names
+    expected = [similarity_token_count(a, b) for a, b in zip(left, right)]
+    assert similarity_token_counts(left[: len(right)], right).tolist() == expected
+
+
+def test_jaccard_matrix_matches_pairwise_with_unknown_tokens(names):
+    corpus_names, query_names = names
+    token_matrix = TokenMatrix()
+    corpus = token_matrix.encode(corpus_names[:20])
+    # the queries grow the vocabulary; "zeta" only exists in a query and still counts in its union
+    queries = token_matrix.encode(query_names + ["acme zeta"], add=False)
+    more = token_matrix.encode(corpus_names[20:])
+    for corpus_rows, batch in ((corpus, corpus_names[:20]), (more, corpus_names[20:])):
+        scores = jaccard_matrix(queries, corpus_rows).toarray()
+        expected = [[similarity_token_count(q, c) for c in batch] for q in query_names + ["acme zeta"]]
+        numpy.testing.assert_array_equal(scores, expected)
+
+
+def test_paired_jaccard_checks_rows():
+    token_matrix = TokenMatrix()
+    with pytest.raises(ValueError):
+        paired_jaccard(token_matrix.encode(["a"]), token_matrix.encode(["a", "b"]))
+
+
+@pytest.mark.parametrize("k", [1, 3, 100])
+def test_top_k_matches_sorted_dense_scores(names, k):
+    corpus_names, query_names = names
+    token_matrix = TokenMatrix()
+    corpus = token_matrix.encode(corpus_names)
+    queries = token_matrix.encode(query_names, add=False)
+    results = top_k_jaccard(queries, corpus, k, batch_size=7)
+    assert len(results) == len(query_names)
+    for query, (rows, scores) in zip(query_names, results):
+        dense = [(-similarity_token_count(query, name), row) for row, name in enumerate(corpus_names)]
+        expected = [(row, -score) for score, row in sorted(dense) if score < 0][:k]
+        assert list(zip(rows.tolist(), scores.tolist())) == expected
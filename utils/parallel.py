@@ -0,0 +1,91 @@
+# coding: utf-8
+"""Helpers to spread chunked work over a process pool while keeping input order and bounding
+how many chunks are in flight, so arbitrarily long iterables run with flat memory."""
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, TypeVar
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+import os
+import time
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Split any iterable, including generators and file objects, into lists of up to `size` items."""
+    if size < 1:
+        raise ValueError(f"chunk size must be positive, got {size}")
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def resolve_n_jobs(n_jobs: Optional[int]) -> int:
+    """Map `None` or a non-positive `n_jobs` to the number of CPUs (-1 all, -2 all but one, ...)."""
+    cpu_count = os.cpu_count() or 1
+    if n_jobs is None:
+        return cpu_count
+    if n_jobs <= 0:
+        return max(1, cpu_count + 1 + n_jobs)
+    return n_jobs
+
+
+def imap_ordered(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    n_jobs: Optional[int] = None,
+    initializer: Optional[Callable[..., Any]] = None,
+    initargs: Sequence[Any] = (),
+    max_pending: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> Iterator[R]:
+    """Apply `func` to each item in a process pool and yield the results in input order.
+    At most `max_pending` items (default: twice the number of workers) are submitted ahead of
+    the consumer, so neither the input nor the results are ever fully materialized."""
+    n_jobs = resolve_n_jobs(n_jobs)
+    max_pending = max_pending or 2 * n_jobs
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=initializer, initargs=tuple(initargs))
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        if owns_executor:
+            executor.shutdown(wait=True)
+
+
+@dataclass
+class ThroughputMeter:
+    """Count processed documents and report the rate since the meter was (re)started."""
+
+    count: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+
+    def update(self, num_docs: int) -> None:
+        self.count += num_docs
+
+    def stop(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def docs_per_sec(self) -> float:
+        elapsed = self.elapsed
+        return self.count / elapsed if elapsed > 0 else 0.0
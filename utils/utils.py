@@ -1,11 +1,12 @@
 # /usr/bin/env python -u
 # -*- coding: utf-8 -*-
-from typing import Iterable, Set, Any, List
+from typing import Iterable, Set, Any, List, Union
 from collections import Counter
 import numpy
 import string
 import random
 from sklearn.feature_extraction.text import CountVectorizer
+from nlp_utils.vocabulary import TokenizedCorpus
 
 
 def generate_short_id(length: int = 8, digit_only: bool=False) -> str:
@@ -48,11 +49,19 @@ def consecutive(data: Iterable[int], stepsize=1) -> Iterable[List[int]]:
     return numpy.split(data, numpy.where(numpy.diff(data) > stepsize)[0] + 1)
 
 
-def count_tokens(tokens: List[str], to_lower=False, counter=None) -> Counter:
+def count_tokens(tokens: Union[List[str], TokenizedCorpus], to_lower=False, counter=None) -> Counter:
     """
+    tokens: a list of tokens, or a `TokenizedCorpus` counted directly on its id buffer.
     counter: If is None, return a new Counter instance, else update Counter
     instance with the counts of `tokens`..
     """
+    if isinstance(tokens, TokenizedCorpus):
+        counts = tokens.counts(to_lower=to_lower)
+        if counter is None:
+            return counts
+        counter.update(counts)
+        return counter
+
     if to_lower:
         tokens = [t.lower() for t in tokens]
 
@@ -63,16 +72,24 @@ def count_tokens(tokens: List[str], to_lower=False, counter=None) -> Counter:
         return counter
 
 
-def filter_counter(min_freq: int, replaced_token: str) -> Counter:
+def filter_counter(min_freq: int, replaced_token: str, counter: Union[Counter, TokenizedCorpus]) -> Counter:
     """Replace below min_freq tokens into `replaced_token` and aggregate the
-    total counts."""
-    freq = 0
-    filtered = Counter({})
-    for token, count in filtered.items():
-        if count < min_freq:
-            freq += count
-        else:
-            filtered[token] = count
+    total counts. `counter` may also be a `TokenizedCorpus`, filtered on its id counts."""
+    if isinstance(counter, TokenizedCorpus):
+        counts = counter.token_counts()
+        rare = counts < min_freq
+        filtered = Counter(
+            {counter.vocab.token(token_id): int(counts[token_id]) for token_id in numpy.flatnonzero(~rare)}
+        )
+        freq = int(counts[rare].sum())
+    else:
+        freq = 0
+        filtered = Counter({})
+        for token, count in counter.items():
+            if count < min_freq:
+                freq += count
+            else:
+                filtered[token] = count
     filtered[replaced_token] = filtered.get(replaced_token, 0) + freq
     return filtered
 